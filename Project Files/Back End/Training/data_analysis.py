@@ -6,22 +6,65 @@ This script performs comprehensive EDA on the liver cirrhosis dataset.
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import seaborn as sns
-from scipy import stats
 import warnings
+from dataset import load_dataset
+from eda_stats import compute_statistics
+from eda_sketches import summarize_files
+from eda_figures import FIGURES, render_figures, write_index
 warnings.filterwarnings('ignore')
 
 class LiverCirrhosisEDA:
-    def __init__(self, data_path='../Data/liver.csv'):
+    def __init__(self, data_path='../Data/liver.csv', output_dir=None, formats=('png',),
+                 sample_rows=None, n_jobs=None):
+        """With output_dir set, figures are written there (see eda_figures.py) instead of
+        shown; sample_rows limits the rows drawn in the KDE and violin grids."""
         self.data_path = data_path
         self.df = None
+        self.report = None
+        self.output_dir = output_dir
+        self.formats = formats
+        self.sample_rows = sample_rows
+        self.n_jobs = n_jobs
+        self.figure_files = {}
+        self._pending_figures = None
+        if output_dir is not None:
+            plt.switch_backend('Agg')
         
     def load_data(self):
         """Load the dataset"""
         print("Loading dataset...")
-        self.df = pd.read_csv(self.data_path)
+        self.df = load_dataset(self.data_path)
+        self.report = None
         print(f"Dataset loaded successfully. Shape: {self.df.shape}")
         
+    def statistics(self):
+        """Compute every statistic of the report in one pass; reused by the methods below"""
+        if self.report is None:
+            self.report = compute_statistics(self.df)
+        return self.report
+        
+    def streaming_statistics(self, paths=None, chunksize=100_000, n_jobs=None):
+        """Compute the report's statistics from sketches, reading the CSV files in chunks
+        
+        For archives too large to load: quantiles, outlier counts and the class tests are
+        approximate (see eda_sketches.py). paths defaults to data_path.
+        """
+        self.report = summarize_files(paths or [self.data_path], chunksize, n_jobs).report()
+        return self.report
+        
+    def _figure(self, name):
+        """Show the named figure, or write it to output_dir in headless mode"""
+        if self.output_dir is None:
+            FIGURES[name][1](self.df, self.statistics(), self.sample_rows)
+            plt.show()
+        elif self._pending_figures is not None:
+            # generate_complete_report renders these together in a process pool
+            self._pending_figures.append(name)
+        else:
+            self.figure_files.update(render_figures(
+                self.df, self.statistics(), [name], self.output_dir, self.formats, self.sample_rows, n_jobs=1
+            ))
+        
     def basic_info(self):
         """Display basic information about the dataset"""
         print("\n" + "="*50)
@@ -48,18 +91,20 @@ class LiverCirrhosisEDA:
         print("DESCRIPTIVE STATISTICS")
         print("="*50)
         
+        report = self.statistics()
+        
         # Numerical features
-        numerical_cols = self.df.select_dtypes(include=[np.number]).columns
         print("\nNumerical Features Statistics:")
-        print(self.df[numerical_cols].describe())
+        print(report.describe)
         
         # Categorical features
-        categorical_cols = self.df.select_dtypes(include=['object']).columns
-        if len(categorical_cols) > 0:
+        if report.categorical_counts:
             print("\nCategorical Features:")
-            for col in categorical_cols:
+            for col, counts in report.categorical_counts.items():
                 print(f"\n{col} value counts:")
-                print(self.df[col].value_counts())
+                print(counts)
+                
+        return report.describe
                 
     def target_distribution(self):
         """Analyze target variable distribution"""
@@ -71,7 +116,7 @@ class LiverCirrhosisEDA:
         
         if target_col in self.df.columns:
             print(f"\nTarget variable ({target_col}) distribution:")
-            target_counts = self.df[target_col].value_counts()
+            target_counts = self.statistics().target_counts
             print(target_counts)
             
             # Calculate percentages
@@ -80,22 +125,7 @@ class LiverCirrhosisEDA:
             print(target_percentages)
             
             # Visualize target distribution
-            plt.figure(figsize=(12, 5))
-            
-            plt.subplot(1, 2, 1)
-            target_counts.plot(kind='bar', color=['skyblue', 'lightcoral'])
-            plt.title('Target Variable Distribution (Counts)')
-            plt.xlabel('Class')
-            plt.ylabel('Count')
-            plt.xticks(rotation=0)
-            
-            plt.subplot(1, 2, 2)
-            plt.pie(target_counts.values, labels=target_counts.index, autopct='%1.1f%%', 
-                   colors=['skyblue', 'lightcoral'])
-            plt.title('Target Variable Distribution (Percentage)')
-            
-            plt.tight_layout()
-            plt.show()
+            self._figure('target_distribution')
             
     def correlation_analysis(self):
         """Perform correlation analysis"""
@@ -103,68 +133,31 @@ class LiverCirrhosisEDA:
         print("CORRELATION ANALYSIS")
         print("="*50)
         
-        # Select numerical columns
-        numerical_cols = self.df.select_dtypes(include=[np.number]).columns
-        
-        # Calculate correlation matrix
-        correlation_matrix = self.df[numerical_cols].corr()
+        report = self.statistics()
+        correlation_matrix = report.correlation
         
         # Visualize correlation matrix
-        plt.figure(figsize=(12, 10))
-        mask = np.triu(np.ones_like(correlation_matrix, dtype=bool))
-        sns.heatmap(correlation_matrix, mask=mask, annot=True, cmap='coolwarm', 
-                   center=0, square=True, linewidths=0.5)
-        plt.title('Feature Correlation Matrix')
-        plt.tight_layout()
-        plt.show()
-        
-        # Find highly correlated features
-        high_corr_pairs = []
-        for i in range(len(correlation_matrix.columns)):
-            for j in range(i+1, len(correlation_matrix.columns)):
-                if abs(correlation_matrix.iloc[i, j]) > 0.7:
-                    high_corr_pairs.append((
-                        correlation_matrix.columns[i],
-                        correlation_matrix.columns[j],
-                        correlation_matrix.iloc[i, j]
-                    ))
-                    
-        if high_corr_pairs:
+        self._figure('correlation_matrix')
+        
+        # Highly correlated features
+        high_corr_pairs = report.high_correlations
+        if len(high_corr_pairs):
             print("\nHighly correlated feature pairs (|correlation| > 0.7):")
-            for pair in high_corr_pairs:
-                print(f"{pair[0]} - {pair[1]}: {pair[2]:.3f}")
+            for pair in high_corr_pairs.itertuples(index=False):
+                print(f"{pair.feature_1} - {pair.feature_2}: {pair.correlation:.3f}")
         else:
             print("\nNo highly correlated feature pairs found.")
             
+        return high_corr_pairs
+            
     def feature_distributions(self):
         """Analyze feature distributions"""
         print("\n" + "="*50)
         print("FEATURE DISTRIBUTION ANALYSIS")
         print("="*50)
         
-        numerical_cols = self.df.select_dtypes(include=[np.number]).columns
-        
-        # Remove target column if present
-        if 'Dataset' in numerical_cols:
-            numerical_cols = numerical_cols.drop('Dataset')
-            
-        # Create subplots for distributions
-        n_cols = 3
-        n_rows = (len(numerical_cols) + n_cols - 1) // n_cols
-        
-        plt.figure(figsize=(15, 5 * n_rows))
-        
-        for i, col in enumerate(numerical_cols):
-            plt.subplot(n_rows, n_cols, i + 1)
-            
-            # Histogram with KDE
-            sns.histplot(data=self.df, x=col, kde=True, alpha=0.7)
-            plt.title(f'Distribution of {col}')
-            plt.xlabel(col)
-            plt.ylabel('Frequency')
-            
-        plt.tight_layout()
-        plt.show()
+        # Histogram with KDE for each feature
+        self._figure('feature_distributions')
         
     def outlier_analysis(self):
         """Detect and visualize outliers"""
@@ -172,43 +165,17 @@ class LiverCirrhosisEDA:
         print("OUTLIER ANALYSIS")
         print("="*50)
         
-        numerical_cols = self.df.select_dtypes(include=[np.number]).columns
-        
-        # Remove target column if present
-        if 'Dataset' in numerical_cols:
-            numerical_cols = numerical_cols.drop('Dataset')
-            
         # Create box plots
-        n_cols = 3
-        n_rows = (len(numerical_cols) + n_cols - 1) // n_cols
+        self._figure('box_plots')
         
-        plt.figure(figsize=(15, 5 * n_rows))
-        
-        for i, col in enumerate(numerical_cols):
-            plt.subplot(n_rows, n_cols, i + 1)
-            sns.boxplot(y=self.df[col])
-            plt.title(f'Box Plot of {col}')
-            plt.ylabel(col)
-            
-        plt.tight_layout()
-        plt.show()
-        
-        # Calculate outliers using IQR method
-        outlier_summary = {}
-        for col in numerical_cols:
-            Q1 = self.df[col].quantile(0.25)
-            Q3 = self.df[col].quantile(0.75)
-            IQR = Q3 - Q1
-            lower_bound = Q1 - 1.5 * IQR
-            upper_bound = Q3 + 1.5 * IQR
-            
-            outliers = self.df[(self.df[col] < lower_bound) | (self.df[col] > upper_bound)]
-            outlier_summary[col] = len(outliers)
-            
+        # Outliers using IQR method
+        outlier_summary = self.statistics().outliers
         print("\nOutlier count by feature (using IQR method):")
-        for feature, count in outlier_summary.items():
+        for feature, count in outlier_summary['outliers'].items():
             print(f"{feature}: {count} outliers")
             
+        return outlier_summary
+            
     def class_wise_analysis(self):
         """Analyze features by class"""
         print("\n" + "="*50)
@@ -221,41 +188,34 @@ class LiverCirrhosisEDA:
             print("Target column not found. Skipping class-wise analysis.")
             return
             
-        numerical_cols = self.df.select_dtypes(include=[np.number]).columns
-        numerical_cols = numerical_cols.drop(target_col)
-        
         # Create violin plots for each feature by class
-        n_cols = 3
-        n_rows = (len(numerical_cols) + n_cols - 1) // n_cols
-        
-        plt.figure(figsize=(15, 5 * n_rows))
-        
-        for i, col in enumerate(numerical_cols):
-            plt.subplot(n_rows, n_cols, i + 1)
-            sns.violinplot(data=self.df, x=target_col, y=col)
-            plt.title(f'{col} by Class')
-            plt.xlabel('Class')
-            plt.ylabel(col)
-            
-        plt.tight_layout()
-        plt.show()
+        self._figure('class_violins')
         
         # Statistical tests for significant differences
-        print("\nStatistical significance tests (Mann-Whitney U test):")
-        for col in numerical_cols:
-            class_0 = self.df[self.df[target_col] == 0][col]
-            class_1 = self.df[self.df[target_col] == 1][col]
+        class_tests = self.statistics().class_tests
+        if class_tests is None:
+            print("\nFewer than two classes present. Skipping significance tests.")
+            return None
             
-            statistic, p_value = stats.mannwhitneyu(class_0, class_1, alternative='two-sided')
+        print("\nStatistical significance tests (Mann-Whitney U test):")
+        for col, p_value in class_tests['p_value'].items():
             significance = "Significant" if p_value < 0.05 else "Not significant"
-            
             print(f"{col}: p-value = {p_value:.4f} ({significance})")
             
+        return class_tests
+            
     def generate_complete_report(self):
-        """Generate complete EDA report"""
+        """Generate complete EDA report
+        
+        In headless mode (output_dir set) the figures are rendered in parallel once every
+        section has been printed, and output_dir/index.html links them.
+        """
         print("LIVER CIRRHOSIS DATASET - EXPLORATORY DATA ANALYSIS REPORT")
         print("=" * 70)
         
+        if self.output_dir is not None:
+            self._pending_figures = []
+        
         # Load data
         self.load_data()
         
@@ -280,13 +240,38 @@ class LiverCirrhosisEDA:
         # Class-wise analysis
         self.class_wise_analysis()
         
+        # Render the figures and the HTML index
+        if self.output_dir is not None:
+            names, self._pending_figures = self._pending_figures, None
+            self.figure_files.update(render_figures(
+                self.df, self.statistics(), names, self.output_dir, self.formats, self.sample_rows, self.n_jobs,
+                data_path=self.data_path
+            ))
+            print(f"\nReport written to {write_index(self.output_dir, self.statistics(), self.figure_files)}")
+        
         print("\n" + "="*70)
         print("EDA REPORT COMPLETED SUCCESSFULLY!")
         print("="*70)
+        
+        return self.statistics()
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Exploratory data analysis of the liver dataset')
+    parser.add_argument('data_path', nargs='?', default='../Data/liver.csv')
+    parser.add_argument('--output-dir', default=None,
+                        help='Write figures and index.html here instead of showing them')
+    parser.add_argument('--format', dest='formats', action='append', choices=['png', 'svg'],
+                        help='Figure format with --output-dir (repeatable; default png)')
+    parser.add_argument('--sample-rows', type=int, default=None,
+                        help='Rows drawn in the KDE and violin plots')
+    parser.add_argument('--jobs', type=int, default=None, help='Rendering processes (default: one per CPU)')
+    args = parser.parse_args()
+    
     # Initialize EDA class
-    eda = LiverCirrhosisEDA()
+    eda = LiverCirrhosisEDA(args.data_path, output_dir=args.output_dir, formats=tuple(args.formats or ['png']),
+                            sample_rows=args.sample_rows, n_jobs=args.jobs)
     
     # Generate complete report
     eda.generate_complete_report()
\ No newline at end of file
@@ -0,0 +1,219 @@
+"""
+Shared loader for the liver dataset used by the trainer, the EDA report and train_model.py.
+The CSV is parsed once with explicit compact dtypes (float32 lab values, int8 target,
+categorical Gender) by pandas' C parser, or pyarrow's when it is installed. The columns
+are then cached as .npy files in a per-user cache directory ($LIVER_DATASET_CACHE, or
+~/.cache/liver_dataset); later loads memory-map them instead of parsing the text again.
+The cache is rebuilt whenever the CSV's size or mtime changes. as_float64 turns the
+float32 columns back into the float64 values the CSV holds, for the trainer.
+iter_chunks reads the CSV in fixed-size chunks for the out-of-core trainer.
+
+Usage (load time and peak memory on a synthetic expansion of liver.csv):
+    python dataset.py --rows 10000000
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+GENDER_CATEGORIES = ['Female', 'Male']
+TARGET_COLUMN = 'Dataset'
+
+COLUMN_DTYPES = {
+    'Age': 'float32',
+    'Gender': pd.CategoricalDtype(GENDER_CATEGORIES),
+    'Total_Bilirubin': 'float32',
+    'Direct_Bilirubin': 'float32',
+    'Alkaline_Phosphatase': 'float32',
+    'Alamine_Aminotransferase': 'float32',
+    'Aspartate_Aminotransferase': 'float32',
+    'Total_Proteins': 'float32',
+    'Albumin': 'float32',
+    'A/G_Ratio': 'float32',
+    TARGET_COLUMN: 'int8',
+}
+FEATURE_COLUMNS = [column for column in COLUMN_DTYPES if column != TARGET_COLUMN]
+
+CACHE_ENV = 'LIVER_DATASET_CACHE'
+# Bump when the cache layout or the dtypes change; older caches are then rebuilt
+CACHE_VERSION = 1
+MANIFEST = 'manifest.json'
+
+
+def _parser_engine():
+    try:
+        import pyarrow  # noqa: F401
+        return 'pyarrow'
+    except ImportError:
+        return 'c'
+
+
+def read_csv(path):
+    """Parse the CSV with explicit dtypes (no caching)"""
+    return pd.read_csv(path, dtype=COLUMN_DTYPES, engine=_parser_engine())
+
+
+def _source_stamp(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def default_cache_dir():
+    return os.environ.get(CACHE_ENV) or os.path.join(os.path.expanduser('~'), '.cache', 'liver_dataset')
+
+
+def _cache_dir(path, cache_dir=None):
+    # One subdirectory per CSV, named after its absolute path so equally named files don't share it
+    digest = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:12]
+    return os.path.join(cache_dir or default_cache_dir(), f"{os.path.basename(path)}-{digest}")
+
+
+def _column_file(index):
+    # Column names such as 'A/G_Ratio' are not valid file names, so files are numbered
+    return f"{index:02d}.npy"
+
+
+def write_cache(df, path, cache_dir=None):
+    """Store df's columns as .npy files in path's cache directory"""
+    cache_dir = _cache_dir(path, cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    columns = []
+    for index, column in enumerate(df.columns):
+        values = df[column]
+        entry = {'name': column, 'file': _column_file(index)}
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            entry['categories'] = list(values.cat.categories)
+            values = values.cat.codes
+        np.save(os.path.join(cache_dir, entry['file']), values.to_numpy())
+        columns.append(entry)
+
+    # The manifest is written last, so a cache interrupted while writing is never used
+    manifest_path = os.path.join(cache_dir, MANIFEST)
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump({'version': CACHE_VERSION, 'source': _source_stamp(path), 'rows': len(df), 'columns': columns}, f)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+
+def read_cache(path, cache_dir=None):
+    """Memory-map path's cached columns, or return None if the cache is missing or stale"""
+    cache_dir = _cache_dir(path, cache_dir)
+    try:
+        with open(os.path.join(cache_dir, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != CACHE_VERSION or manifest['source'] != _source_stamp(path):
+        return None
+
+    data = {}
+    for entry in manifest['columns']:
+        values = np.load(os.path.join(cache_dir, entry['file']), mmap_mode='r')
+        if 'categories' in entry:
+            values = pd.Categorical.from_codes(values, categories=entry['categories'])
+        data[entry['name']] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def load_dataset(path, cache=True, cache_dir=None):
+    """Load the dataset as a DataFrame with compact dtypes, using the column cache when possible
+
+    cache_dir defaults to default_cache_dir().
+    """
+    if cache:
+        df = read_cache(path, cache_dir)
+        if df is not None:
+            return df
+    df = read_csv(path)
+    if cache:
+        try:
+            write_cache(df, path, cache_dir)
+        except OSError as e:
+            print(f"Could not write dataset cache for {path}: {e}")
+    return df
+
+
+def as_float64(values):
+    """float32 values as the float64 of their shortest decimal form
+
+    For lab values written with at most 6 significant digits, as in liver.csv, that
+    decimal is the one in the CSV, so the result equals a float64 parse of the file.
+    """
+    return np.asarray(values, dtype=np.float32).astype(str).astype(np.float64)
+
+
+def iter_chunks(path, chunksize=100_000):
+    """Yield the CSV as DataFrames of at most chunksize rows with the same dtypes as load_dataset"""
+    # pyarrow's parser cannot read in chunks, so the C parser is used here
+    yield from pd.read_csv(path, dtype=COLUMN_DTYPES, engine='c', chunksize=chunksize)
+
+
+def _measure(loader, path):
+    # Runs in a fresh process so each loader's peak memory is measured on its own
+    import resource
+    import time
+    start = time.perf_counter()
+    df = loader(path)
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return elapsed, peak_mb, df.memory_usage(deep=True).sum() / 1e6
+
+
+def _load_python_engine(path):
+    return pd.read_csv(path, delimiter=None, engine='python')
+
+
+def _load_inferred(path):
+    return pd.read_csv(path)
+
+
+def _load_uncached(path):
+    return load_dataset(path, cache=False)
+
+
+if __name__ == "__main__":
+    import argparse
+    import multiprocessing
+    import shutil
+    import tempfile
+
+    parser = argparse.ArgumentParser(description='Benchmark dataset loading on a synthetic expansion of liver.csv')
+    parser.add_argument('--rows', type=int, default=10_000_000, help='Rows in the synthetic CSV')
+    parser.add_argument('--source', default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                         '..', '..', 'Front end', 'Data', 'liver.csv'))
+    parser.add_argument('--skip-python-engine', action='store_true',
+                        help="Skip the engine='python' baseline, which is slow on large files")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        # Repeat the original rows until the synthetic file has the requested size
+        path = os.path.join(workdir, 'liver_expanded.csv')
+        source = pd.read_csv(args.source)
+        with open(path, 'w') as f:
+            f.write(','.join(source.columns) + '\n')
+            block = source.to_csv(header=False, index=False)
+            remaining = args.rows
+            while remaining > 0:
+                take = min(remaining, len(source))
+                f.write(block if take == len(source) else source.head(take).to_csv(header=False, index=False))
+                remaining -= take
+        print(f"Synthetic CSV: {args.rows:,} rows, {os.path.getsize(path) / 1e6:.0f} MB")
+
+        loaders = [("read_csv (dtype inference)", _load_inferred),
+                   ("load_dataset, no cache", _load_uncached),
+                   ("load_dataset, first load", load_dataset),
+                   ("load_dataset, memory-mapped", load_dataset)]
+        if not args.skip_python_engine:
+            loaders.insert(0, ("read_csv (engine='python')", _load_python_engine))
+
+        context = multiprocessing.get_context('spawn')
+        print(f"\n{'Loader':<30} {'Time (s)':>10} {'Peak RSS (MB)':>14} {'Frame (MB)':>11}")
+        for name, loader in loaders:
+            with context.Pool(1) as pool:
+                elapsed, peak_mb, frame_mb = pool.apply(_measure, (loader, path))
+            print(f"{name:<30} {elapsed:>10.2f} {peak_mb:>14.0f} {frame_mb:>11.0f}")
+    finally:
+        shutil.rmtree(workdir)
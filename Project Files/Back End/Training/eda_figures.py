@@ -0,0 +1,210 @@
+"""
+Figures of the EDA report and headless rendering of them to files.
+Each figure is drawn by a function of (df, report, sample_rows), where report is the
+EDAReport from eda_stats. render_figures writes figures to PNG and/or SVG with the Agg
+backend, in a process pool when there is more than one; write_index links them and the
+report's tables from an index.html. The histogram-with-KDE and violin grids can be drawn
+from a row sample, as the KDE dominates the rendering time on large datasets.
+"""
+
+import html
+import os
+
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+import seaborn as sns
+
+TARGET_COLUMN = 'Dataset'
+GRID_COLUMNS = 3
+
+
+def _feature_columns(df):
+    numerical_cols = df.select_dtypes(include=[np.number]).columns
+    if TARGET_COLUMN in numerical_cols:
+        numerical_cols = numerical_cols.drop(TARGET_COLUMN)
+    return numerical_cols
+
+
+def _sample(df, sample_rows, random_state=42):
+    if sample_rows is None or len(df) <= sample_rows:
+        return df
+    return df.sample(n=sample_rows, random_state=random_state)
+
+
+def _grid(numerical_cols):
+    n_rows = (len(numerical_cols) + GRID_COLUMNS - 1) // GRID_COLUMNS
+    return plt.figure(figsize=(15, 5 * n_rows)), n_rows
+
+
+def target_distribution(df, report, sample_rows=None):
+    target_counts = report.target_counts
+    figure = plt.figure(figsize=(12, 5))
+
+    plt.subplot(1, 2, 1)
+    target_counts.plot(kind='bar', color=['skyblue', 'lightcoral'])
+    plt.title('Target Variable Distribution (Counts)')
+    plt.xlabel('Class')
+    plt.ylabel('Count')
+    plt.xticks(rotation=0)
+
+    plt.subplot(1, 2, 2)
+    plt.pie(target_counts.values, labels=target_counts.index, autopct='%1.1f%%',
+            colors=['skyblue', 'lightcoral'])
+    plt.title('Target Variable Distribution (Percentage)')
+
+    plt.tight_layout()
+    return figure
+
+
+def correlation_matrix(df, report, sample_rows=None):
+    correlation = report.correlation
+    figure = plt.figure(figsize=(12, 10))
+    mask = np.triu(np.ones_like(correlation, dtype=bool))
+    sns.heatmap(correlation, mask=mask, annot=True, cmap='coolwarm',
+                center=0, square=True, linewidths=0.5)
+    plt.title('Feature Correlation Matrix')
+    plt.tight_layout()
+    return figure
+
+
+def feature_distributions(df, report, sample_rows=None):
+    numerical_cols = _feature_columns(df)
+    data = _sample(df, sample_rows)
+    figure, n_rows = _grid(numerical_cols)
+
+    for i, col in enumerate(numerical_cols):
+        plt.subplot(n_rows, GRID_COLUMNS, i + 1)
+
+        # Histogram with KDE
+        sns.histplot(data=data, x=col, kde=True, alpha=0.7)
+        plt.title(f'Distribution of {col}')
+        plt.xlabel(col)
+        plt.ylabel('Frequency')
+
+    plt.tight_layout()
+    return figure
+
+
+def box_plots(df, report, sample_rows=None):
+    numerical_cols = _feature_columns(df)
+    figure, n_rows = _grid(numerical_cols)
+
+    for i, col in enumerate(numerical_cols):
+        plt.subplot(n_rows, GRID_COLUMNS, i + 1)
+        sns.boxplot(y=df[col])
+        plt.title(f'Box Plot of {col}')
+        plt.ylabel(col)
+
+    plt.tight_layout()
+    return figure
+
+
+def class_violins(df, report, sample_rows=None):
+    numerical_cols = _feature_columns(df)
+    data = _sample(df, sample_rows)
+    figure, n_rows = _grid(numerical_cols)
+
+    for i, col in enumerate(numerical_cols):
+        plt.subplot(n_rows, GRID_COLUMNS, i + 1)
+        sns.violinplot(data=data, x=TARGET_COLUMN, y=col)
+        plt.title(f'{col} by Class')
+        plt.xlabel('Class')
+        plt.ylabel(col)
+
+    plt.tight_layout()
+    return figure
+
+
+# In report order, with titles for the HTML index
+FIGURES = {
+    'target_distribution': ('Target Variable Distribution', target_distribution),
+    'feature_distributions': ('Feature Distributions', feature_distributions),
+    'correlation_matrix': ('Feature Correlation Matrix', correlation_matrix),
+    'box_plots': ('Box Plots', box_plots),
+    'class_violins': ('Features by Class', class_violins),
+}
+
+# The grids take longest, so they are submitted to the pool first
+_SLOWEST_FIRST = ['feature_distributions', 'class_violins', 'box_plots',
+                  'correlation_matrix', 'target_distribution']
+
+_worker_state = {}
+
+
+def _init_worker(df, report, sample_rows, output_dir, formats, data_path=None):
+    matplotlib.use('Agg', force=True)
+    if data_path is not None:
+        # Memory-map the parent's column cache; the CSV is only parsed if there is none
+        from dataset import read_cache, read_csv
+        df = read_cache(data_path)
+        if df is None:
+            df = read_csv(data_path)
+    _worker_state.update(df=df, report=report, sample_rows=sample_rows,
+                         output_dir=output_dir, formats=formats)
+
+
+def _render(name, df=None, report=None, sample_rows=None, output_dir=None, formats=None):
+    if df is None:
+        df, report, sample_rows = _worker_state['df'], _worker_state['report'], _worker_state['sample_rows']
+        output_dir, formats = _worker_state['output_dir'], _worker_state['formats']
+    figure = FIGURES[name][1](df, report, sample_rows)
+    paths = []
+    for fmt in formats:
+        path = os.path.join(output_dir, f"{name}.{fmt}")
+        figure.savefig(path, format=fmt)
+        paths.append(path)
+    plt.close(figure)
+    return name, paths
+
+
+def render_figures(df, report, names, output_dir, formats=('png',), sample_rows=None, n_jobs=None,
+                   data_path=None):
+    """Write the named figures to output_dir; returns {name: [paths]}
+
+    Several figures are rendered in a pool of n_jobs processes (default: one per CPU,
+    at most one per figure); n_jobs=1 renders them in this process. If df is
+    load_dataset(data_path), unmodified, pass data_path: the workers then memory-map
+    its column cache instead of each being sent a pickled copy of df.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    names = [name for name in _SLOWEST_FIRST if name in names]
+    n_jobs = min(n_jobs or os.cpu_count() or 1, len(names))
+    if n_jobs <= 1:
+        return dict(_render(name, df, report, sample_rows, output_dir, formats) for name in names)
+
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+    # spawn, so workers start without the parent's (possibly interactive) matplotlib state
+    with ProcessPoolExecutor(max_workers=n_jobs, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker,
+                             initargs=(None if data_path else df, report, sample_rows, output_dir, formats,
+                                       data_path)) as pool:
+        return dict(pool.map(_render, names))
+
+
+def write_index(output_dir, report, figure_files, title='Liver Cirrhosis Dataset - EDA Report'):
+    """Write index.html with the report's tables and the rendered figures; returns its path"""
+    tables = [('Descriptive Statistics', report.describe),
+              ('Outliers (IQR method)', report.outliers),
+              ('Highly Correlated Feature Pairs', report.high_correlations)]
+    if report.class_tests is not None:
+        tables.append(('Mann-Whitney U Tests by Class', report.class_tests))
+
+    parts = [f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title></head><body>",
+             f"<h1>{html.escape(title)}</h1>",
+             f"<p>{report.shape[0]:,} rows, {report.shape[1]} columns</p>"]
+    for heading, table in tables:
+        parts.append(f"<h2>{html.escape(heading)}</h2>")
+        parts.append(table.to_html(float_format=lambda value: f"{value:.4g}"))
+    for name, (heading, _) in FIGURES.items():
+        if name in figure_files:
+            source = os.path.basename(figure_files[name][0])
+            parts.append(f"<h2>{html.escape(heading)}</h2>")
+            parts.append(f"<img src=\"{html.escape(source)}\" alt=\"{html.escape(heading)}\">")
+    parts.append("</body></html>")
+
+    path = os.path.join(output_dir, 'index.html')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(parts))
+    return path
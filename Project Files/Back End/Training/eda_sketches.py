@@ -0,0 +1,399 @@
+"""
+Streaming EDA statistics from mergeable sketches, for lab archives too large to load.
+StreamingEDA consumes the CSV chunk by chunk and keeps, per numeric column:
+
+- count, mean, variance, min and max (Welford/Chan updates): exact up to rounding
+- a KLL quantile sketch: a quantile's rank is within about 1.65% of n of the requested
+  rank for the default k=200 (DataSketches' bound at 99% confidence); the 25/50/75%
+  rows of describe(), the IQR bounds and the outlier counts, read off the sketch's
+  CDF (within about 2 * 1.65% of n), carry this error
+- pairwise co-moment sums for the correlation matrix: exact up to rounding, over the
+  rows where both columns are present, as DataFrame.corr() does
+- per-class histograms on log-spaced bins 1% wide, for the Mann-Whitney U tests:
+  values sharing a bin count as ties, so U is off by at most half the pairs that share
+  a bin, reported as u_error_bound; values of the same lab precision rarely share one
+
+Memory does not depend on the number of rows, apart from the KLL sketches, which grow
+with log(n). Sketches of separate files, chunks or processes combine with merge(), so
+summarize_files can sketch several files in parallel and merge the results.
+
+Usage:
+    python eda_sketches.py archive_1.csv archive_2.csv --jobs 2
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from dataset import iter_chunks
+from eda_stats import EDAReport, QUANTILES, high_correlation_pairs
+
+TARGET_COLUMN = 'Dataset'
+
+# Rank histograms: bins 1% wide in |x| between HIST_MIN and HIST_MAX, mirrored for
+# negative values around one bin for |x| < HIST_MIN
+HIST_RATIO = 1.01
+HIST_MIN = 1e-4
+HIST_MAX = 1e6
+_HALF_BINS = int(math.log(HIST_MAX / HIST_MIN) / math.log(HIST_RATIO)) + 2
+HIST_BINS = 2 * _HALF_BINS + 1
+
+
+def histogram_bins(values):
+    """Rank-histogram bin of each (non-NaN) value; bins are ordered like the values"""
+    magnitude = np.clip(np.abs(values), HIST_MIN, HIST_MAX)
+    index = np.floor(np.log(magnitude / HIST_MIN) / math.log(HIST_RATIO)).astype(np.int64) + 1
+    index[np.abs(values) < HIST_MIN] = 0
+    return np.where(values < 0, _HALF_BINS - index, _HALF_BINS + index)
+
+
+class MomentSketch:
+    """Count, mean, sum of squared deviations, min and max of each column"""
+
+    def __init__(self, n_columns):
+        self.count = np.zeros(n_columns)
+        self.mean = np.zeros(n_columns)
+        self.m2 = np.zeros(n_columns)
+        self.min = np.full(n_columns, np.inf)
+        self.max = np.full(n_columns, -np.inf)
+
+    def update(self, values):
+        present = ~np.isnan(values)
+        count = present.sum(axis=0).astype(float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, np.nansum(values, axis=0) / count, 0.0)
+        m2 = np.nansum((values - mean) ** 2, axis=0)
+        chunk = MomentSketch(len(count))
+        chunk.count, chunk.mean, chunk.m2 = count, mean, m2
+        if len(values):
+            chunk.min = np.fmin(chunk.min, np.nanmin(np.where(present, values, np.inf), axis=0))
+            chunk.max = np.fmax(chunk.max, np.nanmax(np.where(present, values, -np.inf), axis=0))
+        self.merge(chunk)
+
+    def merge(self, other):
+        # Chan et al.'s parallel update of mean and M2
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = np.where(count > 0, other.count / count, 0.0)
+        self.mean = self.mean + delta * weight
+        self.m2 = self.m2 + other.m2 + delta ** 2 * self.count * weight
+        self.count = count
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+
+    def std(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 1, np.sqrt(self.m2 / (self.count - 1)), np.nan)
+
+
+class KLLSketch:
+    """KLL quantile sketch of one column (Karnin, Lang and Liberty, 2016)
+
+    Level h holds items that each stand for 2**h values. A level over its capacity is
+    sorted and every other item, from a random offset, moves up a level; capacities
+    shrink by c per level below the top, so the sketch keeps O(k log(n / k)) items.
+    """
+
+    def __init__(self, k=200, c=2 / 3, seed=None):
+        self.k = k
+        self.c = c
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * self.c ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays behind, so no weight is lost
+                keep = items[:1] if len(items) % 2 else items[:0]
+                items = items[len(keep):]
+                promoted = items[self.rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                # Capacities depend on the number of levels, so recheck from the bottom
+                level = 0
+                continue
+            level += 1
+
+    def update(self, values):
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.n += len(values)
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+
+    def _weighted_items(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(items)
+        return items[order], np.cumsum(weights[order])
+
+    def quantiles(self, qs):
+        """Approximate quantiles; NaN for an empty sketch"""
+        if self.n == 0:
+            return np.full(len(qs), np.nan)
+        items, cumulative = self._weighted_items()
+        ranks = np.asarray(qs) * cumulative[-1]
+        return items[np.minimum(np.searchsorted(cumulative, ranks, side='left'), len(items) - 1)]
+
+    def cdf(self, points, strict=True):
+        """Approximate fraction of values < point (<= point with strict=False)"""
+        if self.n == 0:
+            return np.full(len(points), np.nan)
+        items, cumulative = self._weighted_items()
+        index = np.searchsorted(items, points, side='left' if strict else 'right')
+        below = np.where(index > 0, cumulative[np.maximum(index - 1, 0)], 0)
+        return below / cumulative[-1]
+
+
+class CovarianceSketch:
+    """Pairwise co-moment sums of every pair of columns, over rows where both are present
+
+    Values are shifted by the first chunk's column means before summing, which keeps
+    the sums small enough for float64 to hold the covariances accurately.
+    """
+
+    def __init__(self, n_columns):
+        self.shift = None
+        self.n = np.zeros((n_columns, n_columns))
+        self.sum = np.zeros((n_columns, n_columns))       # sum[i, j]: sum of x_i where x_j present
+        self.sum_sq = np.zeros((n_columns, n_columns))    # sum_sq[i, j]: sum of x_i ** 2 where x_j present
+        self.cross = np.zeros((n_columns, n_columns))     # cross[i, j]: sum of x_i * x_j
+
+    def update(self, values):
+        present = ~np.isnan(values)
+        if self.shift is None:
+            self.shift = np.where(present.any(axis=0), np.nanmean(np.where(present, values, np.nan), axis=0), 0.0)
+        shifted = np.where(present, values - self.shift, 0.0)
+        mask = present.astype(float)
+        self.n += mask.T @ mask
+        self.sum += shifted.T @ mask
+        self.sum_sq += (shifted ** 2).T @ mask
+        self.cross += shifted.T @ shifted
+
+    def merge(self, other):
+        if other.shift is None:
+            return
+        if self.shift is None:
+            self.shift = other.shift
+        # Re-express other's sums around this sketch's shift
+        d = (other.shift - self.shift)[:, None]
+        self.n += other.n
+        self.sum += other.sum + other.n * d
+        self.sum_sq += other.sum_sq + 2 * d * other.sum + other.n * d ** 2
+        self.cross += other.cross + d.T * other.sum + d * other.sum.T + other.n * d * d.T
+
+    def correlation(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            covariance = self.n * self.cross - self.sum * self.sum.T
+            variance = self.n * self.sum_sq - self.sum ** 2
+            return covariance / np.sqrt(variance * variance.T)
+
+
+class StreamingEDA:
+    """Mergeable sketches of the EDA statistics; feed chunks with update()"""
+
+    def __init__(self, kll_k=200, seed=42, target_col=TARGET_COLUMN):
+        self.kll_k = kll_k
+        self.seed = seed
+        self.target_col = target_col
+        self.columns = None
+        self.dtypes = None
+        self.rows = 0
+        self.missing = None
+        self.categorical_counts = {}
+        self.target_counts = None
+        self.moments = None
+        self.quantiles = None
+        self.covariance = None
+        self.class_histograms = {}
+
+    def _start(self, chunk):
+        self.columns = chunk.select_dtypes(include=[np.number]).columns
+        self.dtypes = chunk.dtypes
+        self.missing = pd.Series(0, index=chunk.columns)
+        self.moments = MomentSketch(len(self.columns))
+        self.quantiles = [KLLSketch(self.kll_k, seed=self.seed + i) for i in range(len(self.columns))]
+        self.covariance = CovarianceSketch(len(self.columns))
+
+    @property
+    def features(self):
+        return self.columns.drop(self.target_col) if self.target_col in self.columns else self.columns
+
+    def update(self, chunk):
+        if self.columns is None:
+            self._start(chunk)
+        self.rows += len(chunk)
+        self.missing += chunk.isnull().sum()
+        for column in chunk.select_dtypes(include=['object', 'category']).columns:
+            counts = chunk[column].value_counts()
+            self.categorical_counts[column] = counts.add(self.categorical_counts.get(column, 0), fill_value=0)
+
+        values = chunk[self.columns].to_numpy(dtype=np.float64)
+        self.moments.update(values)
+        self.covariance.update(values)
+        for j, sketch in enumerate(self.quantiles):
+            sketch.update(values[:, j])
+
+        if self.target_col in chunk.columns:
+            counts = chunk[self.target_col].value_counts()
+            self.target_counts = counts if self.target_counts is None else self.target_counts.add(counts, fill_value=0)
+            features = chunk[self.features].to_numpy(dtype=np.float64)
+            target = chunk[self.target_col].to_numpy()
+            for label in np.unique(target[~pd.isnull(target)]):
+                rows = features[target == label]
+                histogram = self.class_histograms.setdefault(label.item(), np.zeros((rows.shape[1], HIST_BINS), dtype=np.int64))
+                for j in range(rows.shape[1]):
+                    column = rows[:, j]
+                    histogram[j] += np.bincount(histogram_bins(column[~np.isnan(column)]), minlength=HIST_BINS)
+        return self
+
+    def merge(self, other):
+        """Combine another sketch of the same columns into this one"""
+        if other.columns is None:
+            return self
+        if self.columns is None:
+            self._start(pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in other.dtypes.items()}))
+        self.rows += other.rows
+        self.missing = self.missing.add(other.missing, fill_value=0).astype(int)
+        for column, counts in other.categorical_counts.items():
+            self.categorical_counts[column] = counts.add(self.categorical_counts.get(column, 0), fill_value=0)
+        self.moments.merge(other.moments)
+        self.covariance.merge(other.covariance)
+        for sketch, other_sketch in zip(self.quantiles, other.quantiles):
+            sketch.merge(other_sketch)
+        if other.target_counts is not None:
+            self.target_counts = other.target_counts if self.target_counts is None else \
+                self.target_counts.add(other.target_counts, fill_value=0)
+        for label, histogram in other.class_histograms.items():
+            self.class_histograms[label] = self.class_histograms.get(label, 0) + histogram
+        return self
+
+    def _class_tests(self):
+        labels = sorted(self.class_histograms)
+        if len(labels) < 2:
+            return None
+        first, second = self.class_histograms[labels[0]], self.class_histograms[labels[1]]
+        results = []
+        for j in range(first.shape[0]):
+            c1, c2 = first[j].astype(float), second[j].astype(float)
+            n1, n2 = c1.sum(), c2.sum()
+            n = n1 + n2
+            if n1 == 0 or n2 == 0:
+                results.append((np.nan, np.nan, np.nan))
+                continue
+            # Pairs x1 > x2 plus half the pairs in the same bin
+            u1 = (c1 * (np.cumsum(c2) - c2 + 0.5 * c2)).sum()
+            u = max(u1, n1 * n2 - u1)
+            ties = c1 + c2
+            sigma = math.sqrt(n1 * n2 / 12 * ((n + 1) - (ties ** 3 - ties).sum() / (n * (n - 1))))
+            p_value = 1.0 if sigma == 0 else min(1.0, 2 * stats.norm.sf((u - n1 * n2 / 2 - 0.5) / sigma))
+            results.append((u1, p_value, 0.5 * (c1 * c2).sum()))
+        return pd.DataFrame(results, columns=['statistic', 'p_value', 'u_error_bound'], index=self.features)
+
+    def report(self, correlation_threshold=0.7):
+        """The EDA statistics as an EDAReport, like eda_stats.compute_statistics"""
+        if self.columns is None:
+            raise ValueError("No data has been added to the sketch")
+        quantiles = np.column_stack([sketch.quantiles(QUANTILES[1:4]) for sketch in self.quantiles])
+        describe = pd.DataFrame(
+            np.vstack([self.moments.count, self.moments.mean, self.moments.std(),
+                       self.moments.min, quantiles, self.moments.max]),
+            index=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'], columns=self.columns
+        )
+        describe.loc[:, self.moments.count == 0] = np.nan
+
+        # IQR outliers, estimated from the quantile sketches' CDFs
+        outliers = {}
+        for j, column in enumerate(self.columns):
+            if column == self.target_col:
+                continue
+            q1, q3 = quantiles[0, j], quantiles[2, j]
+            lower, upper = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+            sketch = self.quantiles[j]
+            below = sketch.cdf([lower])[0]
+            above = 1 - sketch.cdf([upper], strict=False)[0]
+            outliers[column] = (lower, upper, int(round((below + above) * sketch.n)))
+        outliers = pd.DataFrame.from_dict(outliers, orient='index', columns=['lower_bound', 'upper_bound', 'outliers'])
+
+        correlation = pd.DataFrame(self.covariance.correlation(), index=self.columns, columns=self.columns)
+        target_counts = None
+        if self.target_counts is not None:
+            target_counts = self.target_counts.astype(int).sort_values(ascending=False)
+        return EDAReport(
+            shape=(self.rows, len(self.dtypes)),
+            dtypes=self.dtypes,
+            missing=self.missing,
+            describe=describe,
+            categorical_counts=dict(self.categorical_counts),
+            target_counts=target_counts,
+            correlation=correlation,
+            high_correlations=high_correlation_pairs(correlation, correlation_threshold),
+            outliers=outliers,
+            class_tests=self._class_tests(),
+        )
+
+
+def summarize_csv(path, chunksize=100_000, **kwargs):
+    """Sketch one CSV file chunk by chunk"""
+    sketch = StreamingEDA(**kwargs)
+    for chunk in iter_chunks(path, chunksize):
+        sketch.update(chunk)
+    return sketch
+
+
+def summarize_files(paths, chunksize=100_000, n_jobs=None, **kwargs):
+    """Sketch several CSV files, in parallel processes when n_jobs > 1, and merge them"""
+    if n_jobs is None or n_jobs <= 1 or len(paths) <= 1:
+        sketches = [summarize_csv(path, chunksize, **kwargs) for path in paths]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        from functools import partial
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(paths))) as pool:
+            sketches = list(pool.map(partial(summarize_csv, chunksize=chunksize, **kwargs), paths))
+    merged = StreamingEDA(**kwargs)
+    for sketch in sketches:
+        merged.merge(sketch)
+    return merged
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Streaming EDA statistics of one or more CSV files')
+    parser.add_argument('paths', nargs='+', help='CSV files with the liver dataset columns')
+    parser.add_argument('--chunksize', type=int, default=100_000, help='Rows read at a time')
+    parser.add_argument('--jobs', type=int, default=None, help='Files sketched in parallel')
+    args = parser.parse_args()
+
+    report = summarize_files(args.paths, args.chunksize, args.jobs).report()
+    print(f"Rows: {report.shape[0]:,}")
+    print("\nNumerical Features Statistics (approximate quantiles):")
+    print(report.describe)
+    print("\nOutliers (IQR method, approximate):")
+    print(report.outliers)
+    print("\nHighly correlated feature pairs (|correlation| > 0.7):")
+    print(report.high_correlations)
+    if report.class_tests is not None:
+        print("\nMann-Whitney U tests (approximate):")
+        print(report.class_tests)
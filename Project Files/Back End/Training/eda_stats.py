@@ -0,0 +1,238 @@
+"""
+Vectorized statistics for the EDA report.
+compute_statistics converts the numeric columns to one float matrix and sorts every
+column in a single argsort; every statistic the report prints is derived from that:
+the describe() quantiles and the IQR bounds are read off the sorted columns, outliers
+are counted on a boolean matrix, high correlations are read from the upper triangle of
+the correlation matrix, and the Mann-Whitney U tests use the ranks the sort implies.
+
+Usage (timings against the per-column implementation on a synthetic dataset):
+    python eda_stats.py --rows 1000000
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+TARGET_COLUMN = 'Dataset'
+QUANTILES = [0.0, 0.25, 0.5, 0.75, 1.0]
+
+
+class EDAReport:
+    """Statistics computed by compute_statistics; tables are DataFrames indexed by feature"""
+
+    def __init__(self, shape, dtypes, missing, describe, categorical_counts, target_counts,
+                 correlation, high_correlations, outliers, class_tests):
+        self.shape = shape
+        self.dtypes = dtypes
+        self.missing = missing
+        self.describe = describe
+        self.categorical_counts = categorical_counts
+        self.target_counts = target_counts
+        self.correlation = correlation
+        self.high_correlations = high_correlations
+        self.outliers = outliers
+        self.class_tests = class_tests
+
+    def to_dict(self):
+        """Plain-Python form of the report, e.g. for json.dump"""
+        return {
+            'shape': list(self.shape),
+            'dtypes': {column: str(dtype) for column, dtype in self.dtypes.items()},
+            'missing': self.missing.to_dict(),
+            'describe': self.describe.to_dict(),
+            'categorical_counts': {column: counts.to_dict() for column, counts in self.categorical_counts.items()},
+            'target_counts': None if self.target_counts is None else self.target_counts.to_dict(),
+            'correlation': self.correlation.to_dict(),
+            'high_correlations': self.high_correlations.to_dict(orient='records'),
+            'outliers': self.outliers.to_dict(orient='index'),
+            'class_tests': None if self.class_tests is None else self.class_tests.to_dict(orient='index'),
+        }
+
+
+def sorted_quantiles(sorted_values, count, quantiles=QUANTILES):
+    """Linearly interpolated quantiles (numpy's default) of columns sorted with NaNs last"""
+    result = np.full((len(quantiles), sorted_values.shape[1]), np.nan)
+    for j, n in enumerate(count):
+        if n == 0:
+            continue
+        position = np.asarray(quantiles) * (n - 1)
+        lower = np.floor(position).astype(int)
+        upper = np.minimum(lower + 1, n - 1)
+        fraction = position - lower
+        column = sorted_values[:, j]
+        result[:, j] = column[lower] + (column[upper] - column[lower]) * fraction
+    return result
+
+
+def describe_table(values, columns, sorted_values):
+    """describe() for a float matrix whose columns are also given sorted"""
+    count = np.sum(~np.isnan(values), axis=0)
+    quantiles = sorted_quantiles(sorted_values, count)
+    return pd.DataFrame(
+        np.vstack([count, np.nanmean(values, axis=0), np.nanstd(values, axis=0, ddof=1), quantiles]),
+        index=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'], columns=columns
+    ), quantiles
+
+
+def outlier_table(values, columns, q1, q3):
+    """Outliers per feature by the 1.5 * IQR rule"""
+    iqr = q3 - q1
+    lower, upper = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+    # NaN compares False on both sides, so missing values are never outliers
+    outside = (values < lower) | (values > upper)
+    return pd.DataFrame({'lower_bound': lower, 'upper_bound': upper,
+                         'outliers': outside.sum(axis=0)}, index=columns)
+
+
+def high_correlation_pairs(correlation, threshold=0.7):
+    """Feature pairs with |correlation| > threshold, from the upper triangle"""
+    rows, cols = np.triu_indices(len(correlation.columns), k=1)
+    values = correlation.to_numpy()[rows, cols]
+    keep = np.abs(values) > threshold
+    names = correlation.columns.to_numpy()
+    return pd.DataFrame({'feature_1': names[rows[keep]], 'feature_2': names[cols[keep]],
+                         'correlation': values[keep]})
+
+
+def _mannwhitneyu_sorted(sorted_column, in_first):
+    """Two-sided Mann-Whitney U test from one sorted column (NaNs removed) and a mask of
+    which sorted entries belong to the first class; normal approximation with tie and
+    continuity correction, as scipy.stats.mannwhitneyu uses for large samples"""
+    n = len(sorted_column)
+    n1 = int(in_first.sum())
+    n2 = n - n1
+    # Tied values share the average of the ranks they span
+    starts = np.flatnonzero(np.r_[True, sorted_column[1:] != sorted_column[:-1]])
+    sizes = np.diff(np.r_[starts, n])
+    ranks = np.repeat(starts + (sizes + 1) / 2, sizes)
+    u1 = ranks[in_first].sum() - n1 * (n1 + 1) / 2
+    u = max(u1, n1 * n2 - u1)
+    tie_term = (sizes ** 3 - sizes).sum() / (n * (n - 1))
+    sigma = np.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term))
+    if sigma == 0:
+        return u1, 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / sigma
+    return u1, min(1.0, 2 * stats.norm.sf(z))
+
+
+def class_tests(values, columns, target, order=None, sorted_values=None):
+    """Two-sided Mann-Whitney U test of every feature between the first two classes
+
+    order and sorted_values are values' column-wise argsort and sorted columns, reused
+    when every row is in one of the two classes.
+    """
+    classes = np.unique(target)
+    if len(classes) < 2:
+        return None
+    in_pair = np.isin(target, classes[:2])
+    if order is None or sorted_values is None or not in_pair.all():
+        values, target = values[in_pair], target[in_pair]
+        order = np.argsort(values, axis=0)
+        sorted_values = np.take_along_axis(values, order, axis=0)
+
+    statistic, p_value = np.full(len(columns), np.nan), np.full(len(columns), np.nan)
+    for j in range(len(columns)):
+        column = sorted_values[:, j]
+        valid = ~np.isnan(column)
+        in_first = target[order[:, j]][valid] == classes[0]
+        n1 = int(in_first.sum())
+        n2 = len(in_first) - n1
+        if n1 == 0 or n2 == 0:
+            continue
+        if min(n1, n2) <= 8:
+            # Small samples get scipy's exact test
+            first, second = column[valid][in_first], column[valid][~in_first]
+            statistic[j], p_value[j] = stats.mannwhitneyu(first, second, alternative='two-sided')
+        else:
+            statistic[j], p_value[j] = _mannwhitneyu_sorted(column[valid], in_first)
+    return pd.DataFrame({'statistic': statistic, 'p_value': p_value}, index=columns)
+
+
+def compute_statistics(df, target_col=TARGET_COLUMN, correlation_threshold=0.7):
+    """Compute every statistic of the EDA report in one vectorized pass"""
+    numerical_cols = df.select_dtypes(include=[np.number]).columns
+    # Column-major, so each column is sorted and scanned contiguously
+    numeric = np.asfortranarray(df[numerical_cols].to_numpy(dtype=np.float64))
+    # One sort of every column (NaNs last) serves the quantiles and the ranks
+    order = np.argsort(numeric, axis=0)
+    sorted_values = np.take_along_axis(numeric, order, axis=0)
+    describe, quantiles = describe_table(numeric, numerical_cols, sorted_values)
+
+    # Outliers and class tests are computed on the features only
+    features = [i for i, column in enumerate(numerical_cols) if column != target_col]
+    feature_cols = numerical_cols[features]
+    outliers = outlier_table(numeric[:, features], feature_cols, quantiles[1, features], quantiles[3, features])
+
+    has_target = target_col in df.columns
+    target_counts = df[target_col].value_counts() if has_target else None
+    tests = class_tests(numeric[:, features], feature_cols, df[target_col].to_numpy(),
+                        order[:, features], sorted_values[:, features]) if has_target else None
+
+    correlation = df[numerical_cols].corr()
+    categorical_cols = df.select_dtypes(include=['object', 'category']).columns
+
+    return EDAReport(
+        shape=df.shape,
+        dtypes=df.dtypes,
+        missing=df.isnull().sum(),
+        describe=describe,
+        categorical_counts={column: df[column].value_counts() for column in categorical_cols},
+        target_counts=target_counts,
+        correlation=correlation,
+        high_correlations=high_correlation_pairs(correlation, correlation_threshold),
+        outliers=outliers,
+        class_tests=tests,
+    )
+
+
+def _per_column_statistics(df, target_col=TARGET_COLUMN):
+    # The per-column loops compute_statistics replaced, kept for the timing comparison
+    numerical_cols = df.select_dtypes(include=[np.number]).columns
+    df[numerical_cols].describe()
+    feature_cols = numerical_cols.drop(target_col)
+    for col in feature_cols:
+        Q1 = df[col].quantile(0.25)
+        Q3 = df[col].quantile(0.75)
+        IQR = Q3 - Q1
+        len(df[(df[col] < Q1 - 1.5 * IQR) | (df[col] > Q3 + 1.5 * IQR)])
+    correlation_matrix = df[numerical_cols].corr()
+    for i in range(len(correlation_matrix.columns)):
+        for j in range(i + 1, len(correlation_matrix.columns)):
+            abs(correlation_matrix.iloc[i, j]) > 0.7
+    classes = np.unique(df[target_col])
+    for col in feature_cols:
+        class_0 = df[df[target_col] == classes[0]][col]
+        class_1 = df[df[target_col] == classes[1]][col]
+        stats.mannwhitneyu(class_0.dropna(), class_1.dropna(), alternative='two-sided')
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    import time
+
+    from dataset import load_dataset
+
+    parser = argparse.ArgumentParser(description='Time the EDA statistics on a synthetic expansion of liver.csv')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Rows in the synthetic dataset')
+    parser.add_argument('--source', default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                         '..', '..', 'Front end', 'Data', 'liver.csv'))
+
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help='Relative noise added to the lab values, so fewer of them are tied')
+    args = parser.parse_args()
+
+    # Resample the original rows
+    source = load_dataset(args.source, cache=False)
+    rng = np.random.default_rng(42)
+    df = source.iloc[rng.integers(0, len(source), args.rows)].reset_index(drop=True)
+    if args.jitter:
+        for column in df.select_dtypes(include=[np.floating]).columns:
+            df[column] = df[column] * rng.normal(1.0, args.jitter, len(df)).astype(np.float32)
+    print(f"Synthetic dataset: {len(df):,} rows")
+
+    for name, fn in [("per-column loops", _per_column_statistics), ("compute_statistics", compute_statistics)]:
+        start = time.perf_counter()
+        fn(df)
+        print(f"{name:<20} {time.perf_counter() - start:>8.2f} s")
@@ -5,19 +5,28 @@ This script handles the training of machine learning models for liver cirrhosis
 
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
+from sklearn.model_selection import train_test_split, cross_val_score, ParameterGrid
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, roc_auc_score
 import pickle
+import inspect
+import time
 import matplotlib.pyplot as plt
 import seaborn as sns
 import warnings
+from search_strategies import get_search_strategy, count_fits, count_trees
+from pipeline_cache import PipelineCache, file_digest
+from dataset import as_float64, load_dataset, CACHE_VERSION, FEATURE_COLUMNS
+from out_of_core import OutOfCoreTrainer
 warnings.filterwarnings('ignore')
 
 class LiverCirrhosisModelTrainer:
-    def __init__(self, data_path='../Data/liver.csv'):
+    def __init__(self, data_path='../Data/liver.csv', search_strategy='grid'):
         self.data_path = data_path
+        self.search_strategy = search_strategy
+        self.search_results = None
+        self.cv_scores = None
         self.model = None
         self.scaler = None
         self.label_encoder = None
@@ -31,8 +40,7 @@ class LiverCirrhosisModelTrainer:
         print("Loading and preprocessing data...")
         
         # Load data
-        df = pd.read_csv(self.data_path, delimiter=None, engine='python')
-
+        df = load_dataset(self.data_path)
         
         # Handle missing values
         df = df.dropna()
@@ -49,7 +57,8 @@ class LiverCirrhosisModelTrainer:
             'A/G_Ratio'
         ]
         
-        X = df[self.feature_columns]
+        # The dataset stores lab values as float32; the model is fitted on the CSV's float64 values
+        X = df[self.feature_columns].apply(as_float64)
         y = df['Dataset']  # Assuming 'Dataset' column contains the target (1 for cirrhosis, 0 for normal)
         
         # Split the data
@@ -69,29 +78,61 @@ class LiverCirrhosisModelTrainer:
         """Train Random Forest model with hyperparameter tuning"""
         print("Training Random Forest model...")
         
-        # Define parameter grid for hyperparameter tuning
-        param_grid = {
-            'n_estimators': [100, 200, 300],
-            'max_depth': [10, 20, None],
-            'min_samples_split': [2, 5, 10],
-            'min_samples_leaf': [1, 2, 4]
-        }
+        # Hyperparameter search strategy: 'grid' (exhaustive), 'warm_start' or 'halving'
+        strategy = get_search_strategy(self.search_strategy)
+        print(f"Search strategy: {strategy.name}")
         
         # Initialize Random Forest
         rf = RandomForestClassifier(random_state=42)
         
-        # Perform grid search
-        grid_search = GridSearchCV(
-            rf, param_grid, cv=5, scoring='accuracy', n_jobs=-1, verbose=1
-        )
-        
-        grid_search.fit(self.X_train_scaled, self.y_train)
+        # Perform the search
+        start = time.perf_counter()
+        search = strategy.search(rf, self.X_train_scaled, self.y_train)
+        elapsed = time.perf_counter() - start
         
         # Get best model
-        self.model = grid_search.best_estimator_
+        self.model = search.best_estimator_
+        self.search_results = {
+            'strategy': strategy.name,
+            'best_params': search.best_params_,
+            'best_score': search.best_score_,
+            'wall_clock_seconds': elapsed,
+            'fits': count_fits(search),
+            'trees': count_trees(search),
+        }
+        
+        # Fold scores of the chosen candidate, so cross-validation need not refit it
+        self.cv_scores = np.array([search.cv_results_[f'split{i}_test_score'][search.best_index_]
+                                   for i in range(search.n_splits_)])
         
-        print(f"Best parameters: {grid_search.best_params_}")
-        print(f"Best cross-validation score: {grid_search.best_score_:.4f}")
+        print(f"Best parameters: {search.best_params_}")
+        print(f"Best cross-validation score: {search.best_score_:.4f}")
+        print(f"Search time: {elapsed:.1f}s ({self.search_results['fits']} fits)")
+        
+        # Trees grown compared with fitting every grid candidate from scratch
+        exhaustive_fits = len(list(ParameterGrid(strategy.param_grid))) * search.n_splits_
+        exhaustive_trees = search.n_splits_ * sum(params['n_estimators'] for params in ParameterGrid(strategy.param_grid))
+        trees = self.search_results['trees']
+        print(f"Trees grown: {trees} vs {exhaustive_trees} for the exhaustive grid "
+              f"({1 - trees / exhaustive_trees:.0%} saved; {self.search_results['fits']} vs {exhaustive_fits} forest fits)")
+        
+    def compare_search_strategies(self, strategies=('grid', 'warm_start', 'halving')):
+        """Run several search strategies and report time and chosen-model quality side by side"""
+        print("Comparing hyperparameter search strategies...")
+        
+        comparison = []
+        for strategy in strategies:
+            self.search_strategy = strategy
+            self.train_random_forest()
+            test_accuracy = accuracy_score(self.y_test, self.model.predict(self.X_test_scaled))
+            comparison.append(dict(self.search_results, test_accuracy=test_accuracy))
+        
+        print(f"\n{'Strategy':<10} {'Time (s)':>10} {'Fits':>6} {'Trees':>7} {'CV score':>10} {'Test acc':>10}  Best parameters")
+        for result in comparison:
+            print(f"{result['strategy']:<10} {result['wall_clock_seconds']:>10.1f} {result['fits']:>6} {result['trees']:>7} "
+                  f"{result['best_score']:>10.4f} {result['test_accuracy']:>10.4f}  {result['best_params']}")
+        
+        return comparison
         
     def evaluate_model(self):
         """Evaluate the trained model"""
@@ -162,22 +203,67 @@ class LiverCirrhosisModelTrainer:
         """Perform cross-validation"""
         print("Performing cross-validation...")
         
-        cv_scores = cross_val_score(
-            self.model, self.X_train_scaled, self.y_train, cv=5, scoring='accuracy'
-        )
+        # The search already scored the chosen model on every fold; only refit
+        # when the model did not come from train_random_forest
+        if self.cv_scores is not None:
+            print("Using the fold scores from the hyperparameter search")
+            cv_scores = self.cv_scores
+        else:
+            cv_scores = cross_val_score(
+                self.model, self.X_train_scaled, self.y_train, cv=5, scoring='accuracy'
+            )
         
         print(f"Cross-validation scores: {cv_scores}")
         print(f"Mean CV accuracy: {cv_scores.mean():.4f} (+/- {cv_scores.std() * 2:.4f})")
         
-    def train_complete_pipeline(self):
-        """Complete training pipeline"""
+    def _run_stage(self, cache, name, inputs, method, attributes):
+        """Run a pipeline step through the cache and restore the trainer attributes it sets"""
+        def compute():
+            method()
+            return {attribute: getattr(self, attribute) for attribute in attributes}
+        
+        # The step's own code is part of its inputs, so editing it invalidates the cache
+        inputs = dict(inputs, code=inspect.getsource(method))
+        key, state = cache.stage(name, inputs, compute)
+        for attribute, value in state.items():
+            setattr(self, attribute, value)
+        return key
+        
+    def _preprocess_inputs(self):
+        # What load_and_preprocess_data reads besides its own code: the data file,
+        # and the loader with the dtypes and cache layout it gives the columns
+        return {'data': file_digest(self.data_path),
+                'loader_code': inspect.getsource(inspect.getmodule(load_dataset)),
+                'cache_version': CACHE_VERSION}
+        
+    def train_complete_pipeline(self, cache_dir='.pipeline_cache'):
+        """Complete training pipeline
+        
+        Preprocessing and the hyperparameter search are cached in cache_dir, keyed by
+        the data file's contents and the search settings; pass cache_dir=None to
+        recompute everything.
+        """
         print("Starting complete training pipeline...")
+        cache = PipelineCache(cache_dir, enabled=cache_dir is not None)
         
         # Load and preprocess data
-        self.load_and_preprocess_data()
+        data_key = self._run_stage(
+            cache, 'preprocess', self._preprocess_inputs(),
+            self.load_and_preprocess_data,
+            ['label_encoder', 'feature_columns', 'X_train', 'X_test', 'y_train', 'y_test',
+             'scaler', 'X_train_scaled', 'X_test_scaled']
+        )
         
         # Train model
-        self.train_random_forest()
+        strategy = get_search_strategy(self.search_strategy)
+        self.search_strategy = strategy
+        self._run_stage(
+            cache, 'search',
+            {'data': data_key, 'strategy': type(strategy).__name__, 'settings': vars(strategy),
+             'strategy_code': inspect.getsource(inspect.getmodule(type(strategy)))},
+            self.train_random_forest,
+            ['model', 'search_results', 'cv_scores']
+        )
         
         # Cross-validate
         self.cross_validate_model()
@@ -194,11 +280,45 @@ class LiverCirrhosisModelTrainer:
         
         return self.model, self.scaler
 
+    def train_out_of_core(self, chunksize=100_000, n_estimators=200):
+        """Training pipeline for datasets that do not fit in memory
+        
+        The data is streamed in chunks of chunksize rows (see out_of_core.py) instead
+        of being loaded whole, and no hyperparameter search is run.
+        """
+        print("Starting out-of-core training pipeline...")
+        streaming = OutOfCoreTrainer(self.data_path, chunksize=chunksize, n_estimators=n_estimators)
+        self.model, self.scaler = streaming.fit()
+        self.label_encoder = streaming.label_encoder
+        self.feature_columns = list(FEATURE_COLUMNS)
+        
+        # Save model
+        self.save_model()
+        
+        print(f"\nTraining completed successfully!")
+        print(f"Final Test Accuracy: {streaming.report['accuracy']:.4f}")
+        print(f"Final AUC-ROC Score: {streaming.report['auc']:.4f}")
+        print(f"Training rows used: {streaming.report['rows_used']} of {streaming.report['rows_seen']}")
+        
+        return self.model, self.scaler
+
 if __name__ == "__main__":
-    # Initialize trainer
-    trainer = LiverCirrhosisModelTrainer()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Train the liver cirrhosis model')
+    parser.add_argument('strategy', nargs='?', default='grid', help="Search strategy, e.g. 'halving'")
+    parser.add_argument('--out-of-core', action='store_true',
+                        help='Stream the data in chunks instead of loading it into memory')
+    parser.add_argument('--chunksize', type=int, default=100_000, help='Rows per chunk with --out-of-core')
+    args = parser.parse_args()
+    
+    # Initialize trainer; optionally pick the search strategy, e.g. `python model_training.py halving`
+    trainer = LiverCirrhosisModelTrainer(search_strategy=args.strategy)
     
     # Run complete training pipeline
-    model, scaler = trainer.train_complete_pipeline()
+    if args.out_of_core:
+        model, scaler = trainer.train_out_of_core(chunksize=args.chunksize)
+    else:
+        model, scaler = trainer.train_complete_pipeline()
     
     print("Model training completed successfully!")
\ No newline at end of file
@@ -0,0 +1,262 @@
+"""
+Out-of-core training for datasets that do not fit in memory.
+The CSV is read in chunks, never as a whole: a first pass fits the StandardScaler with
+partial_fit on the training rows, a second pass grows a small sub-forest per group of
+adjacent chunks and merges them into one RandomForestClassifier, and a third pass
+scores the held-out rows. There are at most n_estimators groups, each holding every
+class, and the n_estimators trees are spread over them, so every training row belongs
+to a group whatever the number of chunks. A group's rows are kept in a reservoir
+sample of at most max_group_rows rows; only when a group holds more than that are
+rows left out (each with the same chance), and the report says how many. The forest
+has n_estimators trees however many chunks there are, so peak memory depends on the
+chunk size, max_group_rows and n_estimators, not on the number of rows.
+
+The train/test split is stratified and deterministic: within each class, every
+1/test_size-th row goes to the test set, so every pass sees the same split.
+"""
+
+import resource
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from dataset import FEATURE_COLUMNS, GENDER_CATEGORIES, TARGET_COLUMN, iter_chunks
+
+# Settings for the per-chunk sub-forests; the depth limit keeps each tree's size
+# bounded however many rows a chunk holds
+FOREST_PARAMS = {
+    'max_depth': 20,
+    'min_samples_split': 5,
+    'min_samples_leaf': 2,
+}
+
+# Resolution of the score histograms used for the streaming AUC
+AUC_BINS = 1000
+
+
+def allocate_trees(n_estimators, n_groups):
+    """Trees to grow on each of n_groups groups: n_estimators in total, spread evenly"""
+    return np.diff(np.arange(n_groups + 1) * n_estimators // n_groups)
+
+
+def group_chunks(chunk_classes, n_groups, classes):
+    """Split the chunks into at most n_groups runs of adjacent chunks that each hold every class
+
+    chunk_classes are the training classes of each chunk. Returns the group of each chunk.
+    """
+    n_chunks = len(chunk_classes)
+    n_groups = min(n_groups, n_chunks)
+    # Even runs first; a run missing a class is merged with the runs after it
+    runs = np.arange(n_chunks) * n_groups // n_chunks
+    required = set(classes)
+    group_of = np.zeros(n_chunks, dtype=np.int64)
+    group, seen = 0, set()
+    for run in range(n_groups):
+        members = np.flatnonzero(runs == run)
+        group_of[members] = group
+        seen.update(*(chunk_classes[i] for i in members))
+        if seen >= required:
+            group, seen = group + 1, set()
+    if group == 0:
+        raise ValueError(f"The training rows do not hold every class of {sorted(required)}")
+    # An incomplete last group joins the one before it
+    return np.minimum(group_of, group - 1)
+
+
+def peak_memory_mb():
+    """Peak resident set size of this process so far"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class ReservoirSample:
+    """A uniform sample of at most capacity of the rows added to it (Algorithm R)"""
+
+    def __init__(self, capacity, rng):
+        self.capacity = capacity
+        self.rng = rng
+        self.seen = 0
+        self._X = []
+        self._y = []
+        self._rows = 0
+
+    def add(self, X, y):
+        room = max(0, self.capacity - self._rows)
+        if room:
+            self._X.append(np.array(X[:room]))
+            self._y.append(np.array(y[:room]))
+            self._rows += len(y[:room])
+        if len(y) > room:
+            if len(self._X) > 1:
+                self._X, self._y = [np.concatenate(self._X)], [np.concatenate(self._y)]
+            # Row i of the stream replaces a random slot with probability capacity / (i + 1)
+            index = self.seen + room + np.arange(len(y) - room)
+            slots = (self.rng.random(len(index)) * (index + 1)).astype(np.int64)
+            keep = slots < self.capacity
+            rows, slots = np.arange(room, len(y))[keep], slots[keep]
+            # Later rows win a slot drawn twice, as they would one at a time
+            last = len(slots) - 1 - np.unique(slots[::-1], return_index=True)[1]
+            self._X[0][slots[last]] = X[rows[last]]
+            self._y[0][slots[last]] = y[rows[last]]
+        self.seen += len(y)
+
+    def arrays(self):
+        return np.concatenate(self._X), np.concatenate(self._y)
+
+
+class StratifiedStreamSplitter:
+    """Assigns rows to the test set as they stream past, test_size of each class"""
+
+    def __init__(self, test_size=0.2):
+        self.test_size = test_size
+        self.seen = {}
+
+    def test_mask(self, y):
+        mask = np.zeros(len(y), dtype=bool)
+        for label in np.unique(y):
+            rows = np.flatnonzero(y == label)
+            index = self.seen.get(label, 0) + np.arange(len(rows))
+            # Row k of a class is a test row when floor(k * test_size) steps up at k + 1
+            mask[rows] = np.floor((index + 1) * self.test_size) > np.floor(index * self.test_size)
+            self.seen[label] = index[-1] + 1
+        return mask
+
+
+def iter_split_chunks(path, chunksize, test_size):
+    """Yield (X_train, y_train, X_test, y_test) for each chunk of the CSV"""
+    splitter = StratifiedStreamSplitter(test_size)
+    for chunk in iter_chunks(path, chunksize):
+        chunk = chunk.dropna()
+        if chunk.empty:
+            continue
+        chunk['Gender'] = chunk['Gender'].cat.codes
+        X = chunk[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+        y = chunk[TARGET_COLUMN].to_numpy()
+        test = splitter.test_mask(y)
+        yield X[~test], y[~test], X[test], y[test]
+
+
+def streaming_auc(positive_hist, negative_hist):
+    """ROC AUC from histograms of the positive-class score of positive and negative rows"""
+    positives, negatives = positive_hist.sum(), negative_hist.sum()
+    if positives == 0 or negatives == 0:
+        return float('nan')
+    # A positive outranks every negative in a lower bin and ties half of those in its own bin
+    negatives_below = np.cumsum(negative_hist) - negative_hist
+    return float((positive_hist * (negatives_below + 0.5 * negative_hist)).sum() / (positives * negatives))
+
+
+class OutOfCoreTrainer:
+    def __init__(self, data_path, chunksize=100_000, n_estimators=200, test_size=0.2,
+                 forest_params=None, random_state=42, n_jobs=-1, max_group_rows=1_000_000):
+        self.data_path = data_path
+        self.chunksize = chunksize
+        self.n_estimators = n_estimators
+        # Training rows a sub-forest is grown on at most (the default is about 80 MB of features)
+        self.max_group_rows = max_group_rows
+        self.test_size = test_size
+        self.forest_params = dict(FOREST_PARAMS, **(forest_params or {}))
+        self.random_state = random_state
+        self.n_jobs = n_jobs
+        self.scaler = None
+        self.model = None
+        self.label_encoder = None
+        self.classes_ = None
+        self.report = {}
+
+    def fit_scaler(self):
+        """Pass 1: fit the scaler on the training rows; returns the training classes of each chunk"""
+        print("Pass 1/3: fitting the scaler...")
+        self.scaler = StandardScaler()
+        train_chunks, train_rows, chunk_classes = 0, 0, []
+        for X_train, y_train, _, _ in iter_split_chunks(self.data_path, self.chunksize, self.test_size):
+            chunk_classes.append(tuple(np.unique(y_train).tolist()))
+            if len(y_train):
+                self.scaler.partial_fit(X_train)
+                train_chunks += 1
+                train_rows += len(y_train)
+        if train_rows == 0:
+            raise ValueError(f"No complete training rows in {self.data_path}")
+        self.classes_ = np.array(sorted(set().union(*chunk_classes)))
+        self.report.update(train_rows=train_rows, train_chunks=train_chunks)
+        print(f"Training rows: {train_rows} in {train_chunks} chunks; peak memory {peak_memory_mb():.0f} MB")
+        return chunk_classes
+
+    def fit_forest(self, chunk_classes):
+        """Pass 2: grow each chunk group's share of the trees and merge them into one forest"""
+        # Every tree must see every class, or its probabilities cannot be averaged
+        group_of = group_chunks(chunk_classes, self.n_estimators, self.classes_.tolist())
+        n_groups = int(group_of[-1]) + 1
+        trees = allocate_trees(self.n_estimators, n_groups)
+        last_chunk = set(np.flatnonzero(np.diff(group_of, append=n_groups)).tolist())
+        print(f"Pass 2/3: growing {self.n_estimators} trees over {n_groups} groups of "
+              f"{len(chunk_classes)} chunks...")
+        estimators = []
+        rows_seen, rows_used = 0, 0
+        sample = None
+        for index, (X_train, y_train, _, _) in enumerate(
+                iter_split_chunks(self.data_path, self.chunksize, self.test_size)):
+            group = group_of[index]
+            if sample is None:
+                sample = ReservoirSample(self.max_group_rows, np.random.default_rng(self.random_state + group))
+            sample.add(X_train, y_train)
+            if index not in last_chunk:
+                continue
+            X_group, y_group = sample.arrays()
+            rows_seen += sample.seen
+            rows_used += len(y_group)
+            sample = None
+            sub_forest = RandomForestClassifier(
+                n_estimators=int(trees[group]), random_state=self.random_state + int(group),
+                n_jobs=self.n_jobs, **self.forest_params
+            ).fit(self.scaler.transform(X_group), y_group)
+            if self.model is None:
+                self.model = sub_forest
+            estimators.extend(sub_forest.estimators_)
+        assert len(estimators) == self.n_estimators, (len(estimators), self.n_estimators)
+
+        self.model.estimators_ = estimators
+        self.model.n_estimators = len(estimators)
+        self.report.update(trees=len(estimators), groups=n_groups, rows_seen=rows_seen, rows_used=rows_used)
+        print(f"Forest: {len(estimators)} trees grown on {rows_used} of {rows_seen} training rows; "
+              f"peak memory {peak_memory_mb():.0f} MB")
+        if rows_used < rows_seen:
+            print(f"Note: {rows_seen - rows_used} training rows were left out of groups larger than "
+                  f"max_group_rows={self.max_group_rows}; raise it or n_estimators to use them all")
+
+    def evaluate(self):
+        """Pass 3: score the held-out rows; accuracy and AUC are accumulated per chunk"""
+        print("Pass 3/3: evaluating on the test rows...")
+        correct, total = 0, 0
+        bins = np.linspace(0.0, 1.0, AUC_BINS + 1)
+        positive_hist = np.zeros(AUC_BINS, dtype=np.int64)
+        negative_hist = np.zeros(AUC_BINS, dtype=np.int64)
+        for _, _, X_test, y_test in iter_split_chunks(self.data_path, self.chunksize, self.test_size):
+            if len(y_test) == 0:
+                continue
+            # Probabilities of the second class, as in LiverCirrhosisModelTrainer.evaluate_model
+            proba = self.model.predict_proba(self.scaler.transform(X_test))
+            y_pred = self.model.classes_[proba.argmax(axis=1)]
+            correct += int((y_pred == y_test).sum())
+            total += len(y_test)
+            positive = y_test == self.model.classes_[1]
+            positive_hist += np.histogram(proba[positive, 1], bins=bins)[0]
+            negative_hist += np.histogram(proba[~positive, 1], bins=bins)[0]
+
+        accuracy = correct / total if total else float('nan')
+        auc_score = streaming_auc(positive_hist, negative_hist)
+        self.report.update(test_rows=total, accuracy=accuracy, auc=auc_score)
+        print(f"Test rows: {total}")
+        print(f"Test Accuracy: {accuracy:.4f}")
+        print(f"AUC-ROC Score: {auc_score:.4f}")
+        return accuracy, auc_score
+
+    def fit(self):
+        """Run all three passes; returns the trained model and scaler"""
+        self.label_encoder = LabelEncoder().fit(GENDER_CATEGORIES)
+        chunk_classes = self.fit_scaler()
+        self.fit_forest(chunk_classes)
+        self.evaluate()
+        self.report['peak_memory_mb'] = peak_memory_mb()
+        print(f"Peak memory: {self.report['peak_memory_mb']:.0f} MB (chunksize {self.chunksize})")
+        return self.model, self.scaler
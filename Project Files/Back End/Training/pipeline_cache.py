@@ -0,0 +1,69 @@
+"""
+Content-addressed cache for the stages of the training pipeline.
+Each stage is keyed by a hash of its name, its inputs (data file digests, parameters,
+the keys of the stages it depends on) and the scikit-learn version. Its output is
+pickled to the cache directory once the stage completes, so a rerun with unchanged
+inputs skips the stage, and an interrupted run resumes after the last completed one.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import time
+
+import sklearn
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """sha256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PipelineCache:
+    def __init__(self, cache_dir='.pipeline_cache', enabled=True):
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+        if enabled:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, name, inputs):
+        """Cache key for a stage; any change to its inputs gives a new key"""
+        payload = json.dumps({'stage': name, 'inputs': inputs, 'sklearn': sklearn.__version__},
+                             sort_keys=True, default=repr)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def path(self, name, key):
+        return os.path.join(self.cache_dir, f"{name}-{key[:16]}.pkl")
+
+    def stage(self, name, inputs, compute):
+        """Return (key, output) for a stage, loading the output from the cache when the
+        inputs are unchanged and otherwise running compute() and storing its result"""
+        key = self.key(name, inputs)
+        path = self.path(name, key)
+        if self.enabled and os.path.exists(path):
+            with open(path, 'rb') as f:
+                output = pickle.load(f)
+            print(f"[cache] {name}: inputs unchanged, loaded {path}")
+            return key, output
+
+        start = time.perf_counter()
+        output = compute()
+        if self.enabled:
+            # Write to a temporary file and rename, so an interrupted run never
+            # leaves a partial artifact behind
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(output, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            print(f"[cache] {name}: computed in {time.perf_counter() - start:.1f}s, stored {path}")
+        return key, output
@@ -0,0 +1,205 @@
+"""
+Hyperparameter search strategies for the Random Forest trainer.
+The trainer picks a strategy by name; each one fits a scikit-learn search object
+on the training data and returns it, so best_estimator_, best_params_,
+best_score_ and cv_results_ are available whatever strategy was used.
+"""
+
+import numpy as np
+from joblib import Parallel, delayed
+from scipy.stats import rankdata
+from sklearn.base import clone
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import GridSearchCV, HalvingGridSearchCV, ParameterGrid, check_cv
+
+# Full grid searched by the exhaustive strategy
+PARAM_GRID = {
+    'n_estimators': [100, 200, 300],
+    'max_depth': [10, 20, None],
+    'min_samples_split': [2, 5, 10],
+    'min_samples_leaf': [1, 2, 4]
+}
+
+
+class GridSearchStrategy:
+    """Exhaustive grid search: every combination is fitted on every fold"""
+
+    name = 'grid'
+
+    def __init__(self, param_grid=None, cv=5, scoring='accuracy', n_jobs=-1, verbose=1):
+        self.param_grid = param_grid or PARAM_GRID
+        self.cv = cv
+        self.scoring = scoring
+        self.n_jobs = n_jobs
+        self.verbose = verbose
+
+    def search(self, estimator, X, y):
+        search = GridSearchCV(
+            estimator, self.param_grid, cv=self.cv, scoring=self.scoring,
+            n_jobs=self.n_jobs, verbose=self.verbose
+        )
+        return search.fit(X, y)
+
+
+class HalvingSearchStrategy:
+    """Successive halving: all candidates start on a small budget and only the best
+    third moves on to three times the budget, until one candidate gets the full one.
+
+    With resource='n_estimators' the budget is the number of trees (up to the
+    grid's largest forest), so n_estimators is taken out of the searched grid.
+    With resource='n_samples' the budget is the number of training rows.
+    """
+
+    name = 'halving'
+
+    def __init__(self, param_grid=None, resource='n_estimators', factor=3, cv=5,
+                 scoring='accuracy', n_jobs=-1, verbose=1, random_state=42):
+        self.param_grid = dict(param_grid or PARAM_GRID)
+        self.resource = resource
+        self.factor = factor
+        self.cv = cv
+        self.scoring = scoring
+        self.n_jobs = n_jobs
+        self.verbose = verbose
+        self.random_state = random_state
+
+    def search(self, estimator, X, y):
+        param_grid = dict(self.param_grid)
+        max_resources = 'auto'
+        if self.resource == 'n_estimators':
+            max_resources = max(param_grid.pop('n_estimators', [estimator.n_estimators]))
+
+        search = HalvingGridSearchCV(
+            estimator, param_grid, resource=self.resource, max_resources=max_resources,
+            factor=self.factor, cv=self.cv, scoring=self.scoring, n_jobs=self.n_jobs,
+            verbose=self.verbose, random_state=self.random_state
+        )
+        return search.fit(X, y)
+
+
+def _grow_forest(estimator, params, checkpoints, fold, scorer):
+    # One forest per (setting, fold), grown to each checkpoint in turn and scored there
+    X_train, y_train, X_test, y_test = fold
+    forest = clone(estimator).set_params(warm_start=True, **params)
+    scores = []
+    for n_estimators in checkpoints:
+        forest.set_params(n_estimators=n_estimators)
+        forest.fit(X_train, y_train)
+        scores.append(scorer(forest, X_test, y_test))
+    return scores
+
+
+class WarmStartSearchResult:
+    """Fitted result of WarmStartSearchStrategy, with the same attributes the trainer
+    reads from a scikit-learn search object"""
+
+    def __init__(self, best_estimator, best_params, best_score, best_index, cv_results,
+                 n_splits, n_fits, n_trees_grown):
+        self.best_estimator_ = best_estimator
+        self.best_params_ = best_params
+        self.best_score_ = best_score
+        self.best_index_ = best_index
+        self.cv_results_ = cv_results
+        self.n_splits_ = n_splits
+        self.n_fits_ = n_fits
+        self.n_trees_grown_ = n_trees_grown
+
+
+class WarmStartSearchStrategy:
+    """Exhaustive grid search that reuses trees across n_estimators values.
+
+    A random forest with n trees is the first n trees of a larger forest with the
+    same random_state, so for each (max_depth, min_samples_split, min_samples_leaf)
+    setting one forest per fold is grown with warm_start=True and scored at every
+    n_estimators checkpoint. Scores, ranking and the chosen model are identical to
+    GridSearchCV over the same grid; the fold splits are computed once and shared.
+    """
+
+    name = 'warm_start'
+
+    def __init__(self, param_grid=None, cv=5, scoring='accuracy', n_jobs=-1, verbose=1):
+        self.param_grid = param_grid or PARAM_GRID
+        self.cv = cv
+        self.scoring = scoring
+        self.n_jobs = n_jobs
+        self.verbose = verbose
+
+    def search(self, estimator, X, y):
+        X = np.asarray(X)
+        y = np.asarray(y)
+        scorer = get_scorer(self.scoring)
+        cv = check_cv(self.cv, y, classifier=True)
+        folds = [(X[train], y[train], X[test], y[test]) for train, test in cv.split(X, y)]
+
+        base_grid = dict(self.param_grid)
+        checkpoints = sorted(base_grid.pop('n_estimators', [estimator.n_estimators]))
+        settings = list(ParameterGrid(base_grid))
+        if self.verbose:
+            print(f"Fitting {len(folds)} folds for each of {len(settings)} settings, "
+                  f"growing {len(checkpoints)} checkpoints each, totalling "
+                  f"{len(folds) * len(settings)} fits")
+
+        fold_scores = Parallel(n_jobs=self.n_jobs)(
+            delayed(_grow_forest)(estimator, params, checkpoints, fold, scorer)
+            for params in settings for fold in folds
+        )
+
+        # Scores keyed by candidate, laid out in GridSearchCV's candidate order
+        scores = {}
+        for index, params in enumerate(settings):
+            for position, n_estimators in enumerate(checkpoints):
+                key = tuple(sorted(dict(params, n_estimators=n_estimators).items()))
+                scores[key] = [fold_scores[index * len(folds) + split][position]
+                               for split in range(len(folds))]
+
+        candidates = list(ParameterGrid(self.param_grid))
+        split_scores = np.array([scores[tuple(sorted(params.items()))] for params in candidates])
+        means = split_scores.mean(axis=1)
+        cv_results = {'params': candidates,
+                      'mean_test_score': means,
+                      'std_test_score': split_scores.std(axis=1),
+                      'rank_test_score': rankdata(-means, method='min').astype(np.int32)}
+        for split in range(len(folds)):
+            cv_results[f'split{split}_test_score'] = split_scores[:, split]
+
+        best_index = int(np.flatnonzero(cv_results['rank_test_score'] == 1)[0])
+        best_params = candidates[best_index]
+        best_estimator = clone(estimator).set_params(**best_params).fit(X, y)
+
+        return WarmStartSearchResult(
+            best_estimator, best_params, means[best_index], best_index, cv_results,
+            n_splits=len(folds), n_fits=len(fold_scores),
+            n_trees_grown=len(fold_scores) * max(checkpoints)
+        )
+
+
+SEARCH_STRATEGIES = {
+    GridSearchStrategy.name: GridSearchStrategy,
+    HalvingSearchStrategy.name: HalvingSearchStrategy,
+    WarmStartSearchStrategy.name: WarmStartSearchStrategy,
+}
+
+
+def get_search_strategy(strategy):
+    """Accept a strategy instance or the name of a registered strategy"""
+    if isinstance(strategy, str):
+        try:
+            return SEARCH_STRATEGIES[strategy]()
+        except KeyError:
+            raise ValueError(f"Unknown search strategy '{strategy}'. "
+                             f"Choose from: {', '.join(SEARCH_STRATEGIES)}")
+    return strategy
+
+
+def count_fits(search):
+    """Number of estimator fits performed by a fitted search (excluding the final refit)"""
+    return getattr(search, 'n_fits_', len(search.cv_results_['params']) * search.n_splits_)
+
+
+def count_trees(search, default_n_estimators=100):
+    """Number of trees grown by a fitted search (excluding the final refit)"""
+    if hasattr(search, 'n_trees_grown_'):
+        return search.n_trees_grown_
+    return search.n_splits_ * sum(params.get('n_estimators', default_n_estimators)
+                                  for params in search.cv_results_['params'])
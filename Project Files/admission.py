@@ -0,0 +1,220 @@
+"""
+Admission control for the prediction path.
+At most max_concurrent requests score at once; up to max_queue more wait for a slot,
+in arrival order, until their deadline. A request that finds the queue full, or whose
+deadline passes before it gets a slot, is shed with Overloaded instead of being scored
+late, so under overload the requests that are admitted still finish quickly and the
+rest are turned away at once. Slots can be waited for from threads (Flask) or from
+an event loop (asgi.py).
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+
+class Overloaded(Exception):
+    """The request was shed; reason is 'queue_full' or 'deadline'"""
+
+    def __init__(self, reason):
+        super().__init__(f"Service overloaded ({reason.replace('_', ' ')}), retry later")
+        self.reason = reason
+
+
+class _Waiter:
+    __slots__ = ('wake', 'granted')
+
+    def __init__(self, wake):
+        self.wake = wake
+        self.granted = False
+
+
+def request_deadline(headers, timeout, now=None, clock=time.monotonic):
+    """Monotonic deadline of a request arriving at `now` (default: the current time)
+
+    A proxy's X-Request-Start header (t=<epoch seconds, ms or us>, as nginx and
+    most load balancers write it) moves the start back to when the request
+    reached the proxy, so time spent queued in front of the server counts. A
+    client's X-Request-Timeout-Ms header can shorten the timeout, not extend it.
+    """
+    start = clock() if now is None else now
+    request_start = headers.get('X-Request-Start')
+    if request_start:
+        try:
+            value = float(request_start.strip().removeprefix('t='))
+            # Scale ms and us timestamps to seconds
+            while value > 1e11:
+                value /= 1000
+            start -= max(0.0, time.time() - value)
+        except ValueError:
+            pass
+    client_timeout = headers.get('X-Request-Timeout-Ms')
+    if client_timeout:
+        try:
+            timeout = min(timeout, max(0.0, float(client_timeout) / 1000))
+        except ValueError:
+            pass
+    return start + timeout
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent, max_queue=64, clock=time.monotonic):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.clock = clock
+        self.active = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.shed = {'queue_full': 0, 'deadline': 0}
+
+    @property
+    def queue_depth(self):
+        return len(self._waiters)
+
+    def _try_acquire(self, deadline, wake):
+        """Take a free slot, or queue a waiter; returns None when admitted at once"""
+        with self._lock:
+            if self.clock() >= deadline:
+                self.shed['deadline'] += 1
+                raise Overloaded('deadline')
+            if self.active < self.max_concurrent and not self._waiters:
+                self.active += 1
+                self.admitted += 1
+                return None
+            if len(self._waiters) >= self.max_queue:
+                self.shed['queue_full'] += 1
+                raise Overloaded('queue_full')
+            waiter = _Waiter(wake)
+            self._waiters.append(waiter)
+            return waiter
+
+    def _abandon(self, waiter, reason):
+        """Take a waiter out of the queue; returns True if it was granted a slot meanwhile"""
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._waiters.remove(waiter)
+            if reason:
+                self.shed[reason] += 1
+            return False
+
+    def acquire(self, deadline):
+        """Block until a slot is free; raises Overloaded if the queue is full or the deadline passes"""
+        event = threading.Event()
+        waiter = self._try_acquire(deadline, event.set)
+        if waiter is None:
+            return
+        if not event.wait(max(0.0, deadline - self.clock())) and not self._abandon(waiter, 'deadline'):
+            raise Overloaded('deadline')
+
+    async def acquire_async(self, deadline):
+        """acquire() for an event loop: waits without holding a thread"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        waiter = self._try_acquire(deadline, wake)
+        if waiter is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(future), max(0.0, deadline - self.clock()))
+        except asyncio.TimeoutError:
+            if not self._abandon(waiter, 'deadline'):
+                raise Overloaded('deadline')
+        except asyncio.CancelledError:
+            # Client went away: give back the slot if it was handed over meanwhile
+            if self._abandon(waiter, None):
+                self.release()
+            raise
+
+    def release(self):
+        """Hand the slot to the oldest waiter, or free it"""
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+                self.admitted += 1
+                waiter.wake()
+            else:
+                self.active -= 1
+
+    @contextmanager
+    def slot(self, deadline):
+        self.acquire(deadline)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def slot_async(self, deadline):
+        await self.acquire_async(deadline)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'active': self.active,
+                'queue_depth': len(self._waiters),
+                'admitted': self.admitted,
+                'shed': dict(self.shed),
+            }
+
+
+if __name__ == "__main__":
+    import argparse
+    from concurrent.futures import ThreadPoolExecutor
+
+    # Overload demo: requests arrive at a fixed rate above what `concurrency` slots of
+    # `work_ms` each can serve; compare latency with and without admission control
+    parser = argparse.ArgumentParser(description='Admission control under overload')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--work-ms', type=float, default=2.0)
+    parser.add_argument('--concurrency', type=int, default=2)
+    parser.add_argument('--overload', type=float, default=1.5, help='Arrival rate / capacity')
+    parser.add_argument('--queue', type=int, default=8)
+    parser.add_argument('--deadline-ms', type=float, default=50.0)
+    args = parser.parse_args()
+    interval = args.work_ms / 1000 / args.concurrency / args.overload
+
+    def run(controller):
+        work_slots = threading.Semaphore(args.concurrency)
+        latencies = []
+
+        def one(start):
+            try:
+                if controller:
+                    controller.acquire(start + args.deadline_ms / 1000)
+                with work_slots:
+                    time.sleep(args.work_ms / 1000)
+                if controller:
+                    controller.release()
+                latencies.append(time.monotonic() - start)
+            except Overloaded:
+                pass
+
+        with ThreadPoolExecutor(512) as pool:
+            start = time.monotonic()
+            for i in range(args.requests):
+                time.sleep(max(0.0, start + i * interval - time.monotonic()))
+                pool.submit(one, time.monotonic())
+        latencies.sort()
+        return latencies
+
+    for name, controller in [('unbounded', None),
+                             ('admission', AdmissionController(args.concurrency, args.queue))]:
+        latencies = run(controller)
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000
+        shed = controller.stats()['shed'] if controller else {}
+        print(f"{name:>10}: {len(latencies)} served, p50 {p50:.1f} ms, p99 {p99:.1f} ms, shed {shed}")
@@ -1,24 +1,95 @@
-from flask import Flask, render_template, request, jsonify
-import pickle
-import numpy as np
-import pandas as pd
-from sklearn.preprocessing import StandardScaler
+from flask import Flask, Response, abort, render_template, request, jsonify
+import hmac
 import os
-import json
+from admission import AdmissionController
+from batching import MicroBatcher
+from model_reload import ModelHolder
+from prediction_cache import PredictionCache
+from prediction_service import PredictionService, run
+import metrics
 
 app = Flask(__name__)
 
-# Load the trained model and normalizer
+# Optional micro-batching: concurrent /predict calls arriving within the window
+# are scored together. A window of 0 ms (the default) scores each request directly.
+BATCH_WINDOW_MS = float(os.environ.get('PREDICT_BATCH_WINDOW_MS', 0))
+BATCH_MAX_SIZE = int(os.environ.get('PREDICT_BATCH_MAX_SIZE', 64))
+
+# The trained model and normalizer, replaceable while serving: every
+# MODEL_WATCH_INTERVAL seconds (0, the default, turns it off) each process checks the
+# artifact files and reloads once they change, and POST /admin/reload reloads on
+# demand when MODEL_ADMIN_TOKEN is set. Handlers take holder.get() once per request,
+# so a reload never switches models under a request that is already running.
+MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 0))
+MODEL_ADMIN_TOKEN = os.environ.get('MODEL_ADMIN_TOKEN', '')
+holder = ModelHolder(
+    batcher_factory=(lambda score_fn: MicroBatcher(score_fn, BATCH_WINDOW_MS, BATCH_MAX_SIZE))
+    if BATCH_WINDOW_MS > 0 else None,
+    watch_interval=MODEL_WATCH_INTERVAL)
 try:
-    with open('rf_acc_68.pkl', 'rb') as f:
-        model = pickle.load(f)
-    with open('normalizer.pkl', 'rb') as f:
-        scaler = pickle.load(f)
+    # Prefers the fused artifact: the scaler is already folded into its thresholds,
+    # and it is memory-mapped without importing scikit-learn
+    holder.load()
 except FileNotFoundError:
-    model = None
-    scaler = None
     print("Model files not found. Please train the model first.")
 
+def score_matrix(features_matrix):
+    """Normalize a matrix of feature rows and return the current model's class probabilities"""
+    return holder.get().score_matrix(features_matrix)
+
+# Cache of model responses for resubmitted lab panels, keyed by the rounded
+# feature vector and the model version. A size of 0 disables it.
+CACHE_SIZE = int(os.environ.get('PREDICT_CACHE_SIZE', 1024))
+CACHE_TTL = float(os.environ.get('PREDICT_CACHE_TTL', 300))
+CACHE_PRECISION = int(os.environ.get('PREDICT_CACHE_PRECISION', 6))
+cache = PredictionCache(CACHE_SIZE, CACHE_TTL, CACHE_PRECISION) if CACHE_SIZE > 0 else None
+
+# Optional admission control in front of the model: at most MAX_CONCURRENCY requests
+# per process are scored at once and MAX_QUEUE more wait, each until its deadline.
+# Requests beyond that are shed with 503 + Retry-After, or answered by the fallback
+# rules when OVERLOAD_FALLBACK is set. A concurrency of 0 (the default) admits everything.
+MAX_CONCURRENCY = int(os.environ.get('PREDICT_MAX_CONCURRENCY', 0))
+MAX_QUEUE = int(os.environ.get('PREDICT_MAX_QUEUE', 64))
+DEADLINE_MS = float(os.environ.get('PREDICT_DEADLINE_MS', 1000))
+RETRY_AFTER = int(os.environ.get('PREDICT_RETRY_AFTER', 1))
+OVERLOAD_FALLBACK = os.environ.get('PREDICT_OVERLOAD_FALLBACK', '0') == '1'
+admission = AdmissionController(MAX_CONCURRENCY, MAX_QUEUE) if MAX_CONCURRENCY > 0 else None
+
+# Service metrics, exposed in Prometheus format on /metrics
+registry = metrics.Registry()
+
+# /predict and /predict/batch themselves; the routes below only adapt Flask's request and response
+service = PredictionService(holder, registry, cache, admission, deadline_ms=DEADLINE_MS,
+                            retry_after=RETRY_AFTER, overload_fallback=OVERLOAD_FALLBACK)
+if cache:
+    registry.counter('liver_cache_hits_total', 'Prediction cache hits', fn=lambda cache=cache: cache.hits)
+    registry.counter('liver_cache_misses_total', 'Prediction cache misses', fn=lambda cache=cache: cache.misses)
+    registry.counter('liver_cache_evictions_total', 'Prediction cache LRU evictions',
+                     fn=lambda cache=cache: cache.evictions)
+    registry.gauge('liver_cache_entries', 'Responses currently cached', fn=lambda cache=cache: len(cache))
+if BATCH_WINDOW_MS > 0:
+    # Each loaded model has its own batcher, so this counts from the last reload
+    registry.counter('liver_micro_batches_total', 'Micro-batches scored, by batch size', ('size',),
+                     fn=lambda: {(str(size),): count for size, count
+                                 in holder.current.batcher.stats()['batch_size_counts'].items()}
+                     if holder.current else {})
+registry.gauge('liver_model_info', 'The model version in service (always 1)', ('version',),
+               fn=lambda: {(holder.current.version[:12],): 1} if holder.current else {})
+registry.gauge('liver_model_loaded_timestamp_seconds', 'When the model in service was loaded',
+               fn=lambda: holder.current.loaded_at if holder.current else 0)
+registry.counter('liver_model_reloads_total', 'Model reloads by outcome: swapped, unchanged or failed',
+                 ('outcome',), fn=lambda: {(outcome,): count for outcome, count in holder.reloads.items()})
+if admission:
+    registry.gauge('liver_admission_in_flight', 'Requests being scored',
+                   fn=lambda admission=admission: admission.active)
+    registry.gauge('liver_admission_queue_depth', 'Requests waiting for a scoring slot',
+                   fn=lambda admission=admission: admission.queue_depth)
+
+def to_flask(response):
+    """Flask Response for a (status, body, headers) from the prediction service"""
+    status, body, headers = response
+    return Response(body, status=status, headers=headers)
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -33,176 +104,40 @@ def portfolio_details():
 
 @app.route('/predict', methods=['POST'])
 def predict():
+    return to_flask(run(service.predict(request.mimetype, request.get_data(), request.get_json,
+                                        request.headers.get('Accept'), request.headers)))
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    return to_flask(run(service.predict_batch(request.mimetype, request.get_data(), request.get_json,
+                                              request.headers.get('Accept'), request.headers)))
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(registry.render(), content_type=metrics.CONTENT_TYPE)
+
+def require_admin():
+    """404 unless MODEL_ADMIN_TOKEN is set and the request carries it as a bearer token"""
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not MODEL_ADMIN_TOKEN or not hmac.compare_digest(supplied.encode(), MODEL_ADMIN_TOKEN.encode()):
+        abort(404)
+
+@app.route('/admin/model')
+def admin_model():
+    require_admin()
+    return jsonify(holder.status())
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    """Reload the model artifacts in this process; requests keep being served meanwhile"""
+    require_admin()
+    previous = holder.current.version if holder.current else None
     try:
-        # Get data from request
-        data = request.get_json()
-        
-        # Extract features
-        features = [
-            float(data.get('age', 0)),
-            1 if data.get('gender') == 'Male' else 0,  # Gender encoding
-            float(data.get('totalBilirubin', 0)),
-            float(data.get('directBilirubin', 0)),
-            float(data.get('alkalinePhosphatase', 0)),
-            float(data.get('alanineAminotransferase', 0)),
-            float(data.get('aspartateAminotransferase', 0)),
-            float(data.get('totalProteins', 0)),
-            float(data.get('albumin', 0)),
-            float(data.get('A/GRatio', 0)),
-           ]
-        
-        # Convert to numpy array and reshape
-        features_array = np.array(features).reshape(1, -1)
-        
-        # Normalize features if scaler is available
-        if scaler:
-            features_array = scaler.transform(features_array)
-        
-        # Make prediction if model is available
-        if model:
-            prediction = model.predict(features_array)[0]
-            probability = model.predict_proba(features_array)[0]
-            
-            # Determine risk level
-            max_prob = max(probability)
-            if max_prob < 0.3:
-                risk_level = 'Low'
-                stage = 1
-            elif max_prob < 0.6:
-                risk_level = 'Moderate'
-                stage = 2
-            elif max_prob < 0.8:
-                risk_level = 'High'
-                stage = 3
-            else:
-                risk_level = 'Critical'
-                stage = 4
-            
-            # Generate recommendations
-            recommendations = generate_recommendations(risk_level, features)
-            
-            # Generate key factors
-            key_factors = generate_key_factors(features)
-            
-            result = {
-                'prediction': int(prediction),
-                'probability': float(max_prob * 100),
-                'riskLevel': risk_level,
-                'stage': stage,
-                'confidence': float(max_prob * 100),
-                'recommendations': recommendations,
-                'keyFactors': key_factors
-            }
-        else:
-            # Fallback prediction logic
-            result = fallback_prediction(features)
-        
-        return jsonify(result)
-    
+        outcome = holder.reload()
     except Exception as e:
-        return jsonify({'error': str(e)}), 400
-
-def generate_recommendations(risk_level, features):
-    base_recommendations = [
-        'Regular monitoring of liver function tests',
-        'Maintain a healthy diet low in sodium and processed foods',
-        'Avoid alcohol consumption completely',
-        'Stay hydrated and maintain regular exercise'
-    ]
-    
-    risk_specific = {
-        'Low': [
-            'Continue current lifestyle and schedule annual check-ups',
-            'Consider hepatitis vaccination if not already vaccinated'
-        ],
-        'Moderate': [
-            'Schedule follow-up appointments every 6 months',
-            'Consider consultation with a hepatologist',
-            'Monitor for symptoms like fatigue, abdominal swelling, or jaundice'
-        ],
-        'High': [
-            'Immediate consultation with a liver specialist required',
-            'Consider advanced imaging studies (CT/MRI)',
-            'Discuss treatment options to slow disease progression'
-        ],
-        'Critical': [
-            'Urgent medical attention required',
-            'Immediate hospitalization may be necessary',
-            'Liver transplant evaluation should be considered'
-        ]
-    }
-    
-    return base_recommendations + risk_specific.get(risk_level, [])
-
-def generate_key_factors(features):
-    factors = []
-    
-    # Analyze key biomarkers
-    if features[2] > 1.2:  # Total Bilirubin
-        factors.append({
-            'factor': 'Elevated Total Bilirubin',
-            'impact': min((features[2] / 1.2 - 1) * 30, 25),
-            'description': 'Indicates potential liver dysfunction and bile processing issues'
-        })
-    
-    if features[5] > 56 or features[6] > 40:  # ALT or AST
-        factors.append({
-            'factor': 'Elevated Liver Enzymes',
-            'impact': min(max(features[5]/56, features[6]/40) * 20, 20),
-            'description': 'Suggests liver cell damage and inflammation'
-        })
-    
-    if features[8] < 3.5:  # Albumin
-        factors.append({
-            'factor': 'Low Albumin Levels',
-            'impact': min((3.5 - features[8]) / 3.5 * 25, 20),
-            'description': 'Indicates reduced liver protein synthesis capacity'
-        })
-    
-    return factors[:3]  # Return top 3 factors
-
-def fallback_prediction(features):
-    # Simple rule-based prediction as fallback
-    risk_score = 0
-    
-    # Age factor
-    if features[0] > 50:
-        risk_score += 0.15
-    if features[0] > 65:
-        risk_score += 0.1
-    
-    # Bilirubin
-    if features[2] > 1.2:
-        risk_score += min((features[2] / 1.2 - 1) * 0.3, 0.25)
-    
-    # Liver enzymes
-    if features[5] > 56 or features[6] > 40:
-        risk_score += min(max(features[5]/56, features[6]/40) * 0.2, 0.2)
-    
-    # Albumin
-    if features[8] < 3.5:
-        risk_score += min((3.5 - features[8]) / 3.5 * 0.25, 0.2)
-    
-    probability = min(risk_score * 100, 95)
-    
-    if probability < 25:
-        risk_level, stage = 'Low', 1
-    elif probability < 50:
-        risk_level, stage = 'Moderate', 2
-    elif probability < 75:
-        risk_level, stage = 'High', 3
-    else:
-        risk_level, stage = 'Critical', 4
-    
-    return {
-        'prediction': 1 if probability > 50 else 0,
-        'probability': probability,
-        'riskLevel': risk_level,
-        'stage': stage,
-        'confidence': max(85 + np.random.random() * 10, 90),
-        'recommendations': generate_recommendations(risk_level, features),
-        'keyFactors': generate_key_factors(features)
-    }
+        # The previous model, if any, is still in service
+        return jsonify({'error': f"Reload failed: {e}", **holder.status()}), 500
+    return jsonify({'outcome': outcome, 'previousVersion': previous, **holder.status()})
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,187 @@
+"""
+ASGI entry point for the prediction service.
+    uvicorn asgi:app --workers 4
+/predict and /predict/batch are served natively on the event loop: the request body
+is read asynchronously and the handler from prediction_service runs with
+run_async: parsing, scoring and encoding happen in a bounded thread pool (scoring
+on the micro-batcher, when that is enabled), so a large batch never stalls the
+event loop, and a slow client or a request waiting for admission never pins a
+thread. Every other route (/, /inner-page, /portfolio-details,
+/metrics, /admin/*, static files) is passed to the Flask app in app.py.
+The handlers, model holder, cache, admission control and metrics are app.py's own
+PredictionService, so responses are the Flask service's byte for byte; this module
+only adapts ASGI requests and responses. The one difference: a request's deadline
+counts from when it arrived, and waiting for an admission slot holds no thread.
+"""
+
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.exceptions import BadRequest, UnsupportedMediaType
+
+import app as flask_service
+from prediction_service import run_async
+
+# Threads scoring requests; at most SCORING_QUEUE_PER_THREAD requests per thread are
+# handed to the pool at once, the rest wait on the event loop
+SCORING_THREADS = int(os.environ.get('ASGI_SCORING_THREADS', os.cpu_count() or 1))
+SCORING_QUEUE_PER_THREAD = int(os.environ.get('ASGI_SCORING_QUEUE_PER_THREAD', 4))
+
+executor = ThreadPoolExecutor(max_workers=SCORING_THREADS, thread_name_prefix='scoring')
+_scoring_slots = None
+
+
+async def run_scoring(fn, *args):
+    """Run a CPU-bound scoring call in the bounded pool"""
+    global _scoring_slots
+    if _scoring_slots is None:
+        # Created on first use, so it belongs to the server's event loop
+        _scoring_slots = asyncio.Semaphore(SCORING_THREADS * SCORING_QUEUE_PER_THREAD)
+    async with _scoring_slots:
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+class _Headers:
+    """Case-insensitive .get() over the ASGI header list; a repeated header gives its
+    first value, as Flask's request.headers.get does"""
+
+    __slots__ = ('raw',)
+
+    def __init__(self, header_list):
+        self.raw = {}
+        for name, value in header_list:
+            self.raw.setdefault(name, value)
+
+    def get(self, name, default=None):
+        value = self.raw.get(name.lower().encode('latin-1'))
+        return default if value is None else value.decode('latin-1')
+
+
+def _mimetype(headers):
+    return headers.get('Content-Type', '').split(';')[0].strip().lower()
+
+
+def _load_json(headers, body):
+    """request.get_json(): the same checks and error messages as Flask"""
+    content_type = _mimetype(headers)
+    if not (content_type == 'application/json'
+            or (content_type.startswith('application/') and content_type.endswith('+json'))):
+        raise UnsupportedMediaType(
+            "Did not attempt to load JSON data because the request Content-Type was not 'application/json'."
+        )
+    try:
+        return json.loads(body)
+    except ValueError as e:
+        raise BadRequest(f"Failed to decode JSON object: {e}" if flask_service.app.debug else None)
+
+
+async def _handle(handler, header_list, body, arrival):
+    """Run a prediction_service handler on one request; returns (status, headers, body)"""
+    headers = _Headers(header_list)
+    status, response, response_headers = await run_async(
+        handler(_mimetype(headers), body, lambda: _load_json(headers, body), headers.get('Accept'),
+                headers, arrival),
+        run_scoring)
+    response_headers = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                        for name, value in response_headers]
+    response_headers.append((b'content-length', str(len(response)).encode('latin-1')))
+    return status, response_headers, response
+
+
+ROUTES = {
+    '/predict': flask_service.service.predict,
+    '/predict/batch': flask_service.service.predict_batch,
+}
+
+
+def _wsgi_environ(scope, body):
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+        'CONTENT_LENGTH': str(len(body)),
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'CONTENT_LENGTH':
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def _call_wsgi(environ):
+    """Run the Flask app on one request; returns (status, headers, body)"""
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = [(name.encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+    result = flask_service.app.wsgi_app(environ, start_response)
+    try:
+        body = b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return response['status'], response['headers'], body
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http':
+        return
+
+    arrival = time.monotonic()
+    body = await _read_body(receive)
+    if body is None:
+        return
+
+    handler = ROUTES.get(scope['path'])
+    if handler is not None and scope['method'] == 'POST':
+        status, headers, response = await _handle(handler, scope['headers'], body, arrival)
+    else:
+        # Pages, /metrics and static files, and Flask's 404/405 responses
+        status, headers, response = await run_scoring(_call_wsgi, _wsgi_environ(scope, body))
+
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': response})
@@ -0,0 +1,119 @@
+"""
+Micro-batching for the prediction path.
+Rows submitted by concurrent requests are collected for a short window and scored
+as one matrix, so the fixed per-call cost of normalization and the forest pass is
+shared by every request in the batch.
+"""
+
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+import numpy as np
+
+# Queued by close(): the worker stops once it has scored the rows ahead of it
+_CLOSE = object()
+
+
+class MicroBatcher:
+    def __init__(self, score_fn, max_wait_ms=2.0, max_batch_size=64):
+        self.score_fn = score_fn
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._closed = False
+        self.batch_sizes = Counter()
+        self.rows_scored = 0
+        self.batches_scored = 0
+
+    def submit(self, row):
+        """Queue one feature row; the returned future resolves to its score row"""
+        future = Future()
+        with self._lock:
+            # Under the lock, so no row is queued behind close()'s marker
+            closed = self._closed
+            if not closed:
+                self._ensure_worker()
+                self._queue.put((row, future))
+        if closed:
+            # Late rows, e.g. from requests still on a replaced model, are scored
+            # inline rather than starting the worker again
+            self._score([(row, future)])
+        return future
+
+    def score(self, row):
+        """Score one feature row, blocking until its batch has been processed"""
+        return self.submit(row).result()
+
+    def close(self):
+        """Stop the worker thread after the rows already queued, e.g. when the model is replaced
+
+        Rows submitted afterwards are scored in the submitting thread.
+        """
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put((_CLOSE, None))
+
+    def stats(self):
+        """Snapshot of the batch size distribution and totals"""
+        with self._lock:
+            return {
+                'batches': self.batches_scored,
+                'rows': self.rows_scored,
+                'mean_batch_size': self.rows_scored / self.batches_scored if self.batches_scored else 0.0,
+                'batch_size_counts': dict(sorted(self.batch_sizes.items())),
+            }
+
+    def _ensure_worker(self):
+        # Started lazily so forked server workers each get their own thread
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+            self._worker.start()
+
+    def _collect(self):
+        """Block for the first row, then gather more until the window closes or the batch is full"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            rows = [(row, future) for row, future in batch if row is not _CLOSE]
+            if rows:
+                self._score(rows)
+            if len(rows) < len(batch):
+                # close() was called; nothing can be queued behind its marker
+                return
+
+    def _score(self, batch):
+        rows = [row for row, _ in batch]
+        futures = [future for _, future in batch]
+        try:
+            scores = self.score_fn(np.array(rows))
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+
+        with self._lock:
+            self.batch_sizes[len(batch)] += 1
+            self.batches_scored += 1
+            self.rows_scored += len(batch)
+
+        for future, score in zip(futures, scores):
+            future.set_result(score)
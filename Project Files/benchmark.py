@@ -0,0 +1,469 @@
+"""
+Micro-benchmarks for each stage of the serving and training pipelines.
+Every stage is timed on its own and the results are written as JSON, so they can
+be stored as a baseline and compared against later runs.
+
+Usage (from the project root):
+    python benchmark.py                          # serving stages
+    python benchmark.py --training               # also trainer and EDA stages
+    python benchmark.py --output results.json    # write machine-readable results
+    python benchmark.py --save-baseline          # store this run as the baseline
+    python benchmark.py --check                  # exit 1 if a stage regressed
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import timeit
+import warnings
+
+import numpy as np
+
+warnings.filterwarnings('ignore')
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+TRAINING_DIR = os.path.join(PROJECT_ROOT, 'Back End', 'Training')
+DATA_PATH = os.path.join(PROJECT_ROOT, 'Front end', 'Data', 'liver.csv')
+BASELINE_PATH = os.path.join(PROJECT_ROOT, 'benchmark_baseline.json')
+DEFAULT_THRESHOLD = 0.25
+
+SAMPLE_REQUEST = {
+    'age': 45,
+    'gender': 'Male',
+    'totalBilirubin': 1.2,
+    'directBilirubin': 0.3,
+    'alkalinePhosphatase': 120,
+    'alanineAminotransferase': 35,
+    'aspartateAminotransferase': 28,
+    'totalProteins': 7.2,
+    'albumin': 4.1,
+    'A/GRatio': 1.6,
+}
+
+_registry = []
+
+
+def benchmark(group, name, number=None, repeat=5):
+    """Register a setup function that returns the callable to time
+
+    number is the calls per timing run (None picks it automatically); slow
+    stages such as model training set number=1, repeat=1.
+    """
+    def register(setup):
+        _registry.append({'group': group, 'name': f"{group}.{name}", 'setup': setup,
+                          'number': number, 'repeat': repeat})
+        return setup
+    return register
+
+
+def measure(fn, number=None, repeat=5, min_time=0.2):
+    """Per-call timings in milliseconds over `repeat` runs"""
+    timer = timeit.Timer(fn)
+    if number is None:
+        number, elapsed = timer.autorange()
+        number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    runs = [elapsed / number * 1000 for elapsed in timer.repeat(repeat=repeat, number=number)]
+    return {
+        'median_ms': statistics.median(runs),
+        'min_ms': min(runs),
+        'mean_ms': statistics.mean(runs),
+        'number': number,
+        'repeat': repeat,
+    }
+
+
+@contextlib.contextmanager
+def _quiet():
+    # Trainer and EDA methods print their progress; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def _app():
+    sys.path.insert(0, PROJECT_ROOT)
+    import app
+    return app
+
+
+def _pickles():
+    import pickle
+    with open(os.path.join(PROJECT_ROOT, 'rf_acc_68.pkl'), 'rb') as f:
+        model = pickle.load(f)
+    with open(os.path.join(PROJECT_ROOT, 'normalizer.pkl'), 'rb') as f:
+        scaler = pickle.load(f)
+    return model, scaler
+
+
+def _sample_features():
+    from scoring import extract_features
+    return extract_features(SAMPLE_REQUEST)
+
+
+# Serving stages, in the order predict() runs them
+
+@benchmark('serving', 'parse_json')
+def _parse_json():
+    flask_app = _app().app
+    body = json.dumps(SAMPLE_REQUEST)
+    return lambda: flask_app.json.loads(body)
+
+
+@benchmark('serving', 'extract_features')
+def _extract_features():
+    from scoring import extract_features
+    return lambda: extract_features(SAMPLE_REQUEST)
+
+
+@benchmark('serving', 'scaler_transform')
+def _scaler_transform():
+    _, scaler = _pickles()
+    row = np.array(_sample_features()).reshape(1, -1)
+    return lambda: scaler.transform(row)
+
+
+@benchmark('serving', 'forest_sklearn_predict_and_proba')
+def _forest_sklearn():
+    model, scaler = _pickles()
+    row = scaler.transform(np.array(_sample_features()).reshape(1, -1))
+
+    def run():
+        model.predict(row)
+        return model.predict_proba(row)
+    return run
+
+
+@benchmark('serving', 'forest_compiled_proba')
+def _forest_compiled():
+    from forest_engine import CompiledForest
+    model, scaler = _pickles()
+    compiled = CompiledForest.from_sklearn(model)
+    row = scaler.transform(np.array(_sample_features()).reshape(1, -1))
+    return lambda: compiled.predict_proba(row)
+
+
+@benchmark('serving', 'forest_fused_proba')
+def _forest_fused():
+    from model_format import load_model
+    model, scaler, _ = load_model(
+        os.path.join(PROJECT_ROOT, 'rf_fused.forest'),
+        os.path.join(PROJECT_ROOT, 'rf_acc_68.pkl'),
+        os.path.join(PROJECT_ROOT, 'normalizer.pkl'),
+    )
+    row = np.array(_sample_features()).reshape(1, -1)
+    return lambda: model.predict_proba(row)
+
+
+@benchmark('serving', 'forest_batch_582_rows')
+def _forest_batch():
+    from scoring import features_from_frame
+    import pandas as pd
+    app = _app()
+    rows = features_from_frame(pd.read_csv(DATA_PATH))
+    return lambda: app.score_matrix(rows)
+
+
+def _dataset_rows():
+    from scoring import features_from_frame
+    import pandas as pd
+    return features_from_frame(pd.read_csv(DATA_PATH))
+
+
+# Request body decoding for a whole dataset in each format: parse cost per row
+# is the stage time divided by the row count
+
+@benchmark('serving', 'parse_json_batch_582_rows')
+def _parse_json_batch():
+    from scoring import extract_features
+    from wire_format import REQUEST_FIELDS
+    flask_app = _app().app
+    records = [dict(zip(REQUEST_FIELDS, row)) for row in _dataset_rows().tolist()]
+    for record in records:
+        record['gender'] = 'Male' if record['gender'] else 'Female'
+    body = json.dumps(records)
+    return lambda: [extract_features(record) for record in flask_app.json.loads(body)]
+
+
+@benchmark('serving', 'parse_float32_batch_582_rows')
+def _parse_float32_batch():
+    from wire_format import parse_float32_matrix
+    body = _dataset_rows().astype('<f4').tobytes()
+    return lambda: parse_float32_matrix(body)
+
+
+@benchmark('serving', 'parse_arrow_batch_582_rows')
+def _parse_arrow_batch():
+    from wire_format import REQUEST_FIELDS, parse_arrow, require_pyarrow
+    pa = require_pyarrow()
+    rows = _dataset_rows()
+    table = pa.table({field: rows[:, j] for j, field in enumerate(REQUEST_FIELDS)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    body = sink.getvalue().to_pybytes()
+    return lambda: parse_arrow(body)
+
+
+@benchmark('serving', 'generate_recommendations')
+def _generate_recommendations():
+    from scoring import generate_recommendations
+    features = _sample_features()
+    return lambda: generate_recommendations('High', features)
+
+
+@benchmark('serving', 'generate_key_factors')
+def _generate_key_factors():
+    from scoring import generate_key_factors
+    features = [62, 1, 7.3, 4.1, 490, 60, 68, 7.0, 3.3, 0.89]
+    return lambda: generate_key_factors(features)
+
+
+@benchmark('serving', 'rule_engine_batch_582_rows')
+def _rule_engine_batch():
+    from scoring import features_from_frame, fallback_batch
+    import pandas as pd
+    rows = features_from_frame(pd.read_csv(DATA_PATH))
+    return lambda: fallback_batch(rows)
+
+
+@benchmark('serving', 'build_result')
+def _build_result():
+    from scoring import build_result
+    app = _app()
+    features = _sample_features()
+    classes = app.holder.get().model.classes_
+    probability = app.score_matrix(np.array(features).reshape(1, -1))[0]
+    return lambda: build_result(classes, probability, features)
+
+
+@benchmark('serving', 'jsonify')
+def _jsonify():
+    from flask import jsonify
+    from scoring import build_result
+    app = _app()
+    features = _sample_features()
+    result = build_result(app.holder.get().model.classes_, app.score_matrix(np.array(features).reshape(1, -1))[0], features)
+
+    def run():
+        with app.app.app_context():
+            return jsonify(result)
+    return run
+
+
+@benchmark('serving', 'encode_result')
+def _encode_result():
+    # What /predict now does in place of jsonify: pre-encoded fragments
+    from prediction_service import json_response
+    from response_json import encode_result
+    from scoring import build_result
+    app = _app()
+    features = _sample_features()
+    result = build_result(app.holder.get().model.classes_, app.score_matrix(np.array(features).reshape(1, -1))[0], features)
+
+    def run():
+        with app.app.app_context():
+            return app.to_flask(json_response(encode_result(result)))
+    return run
+
+
+@benchmark('serving', 'metrics_per_request')
+def _metrics_per_request():
+    # Everything /predict records about one request: six stage laps, three
+    # counters and the request latency histogram
+    import metrics
+    registry = metrics.Registry()
+    stages = registry.histogram('stage_seconds', 'stages', ('stage',))
+    latency = registry.histogram('request_seconds', 'requests', ('endpoint',))
+    counter = registry.counter('events_total', 'events', ('kind',))
+
+    def run():
+        timer = metrics.StageTimer(stages)
+        for stage in ('parse', 'features', 'scale', 'model', 'postprocess', 'serialize'):
+            timer.lap(stage)
+        counter.inc(('path',))
+        counter.inc(('risk',))
+        counter.inc(('outcome',))
+        latency.observe(timer.elapsed(), ('predict',))
+    return run
+
+
+@benchmark('serving', 'predict_endpoint')
+def _predict_endpoint():
+    # The whole request through Flask's test client, with the response cache off
+    app = _app()
+    app.service.cache = None
+    client = app.app.test_client()
+    return lambda: client.post('/predict', json=SAMPLE_REQUEST)
+
+
+# Training and EDA stages (--training)
+
+def _trainer():
+    sys.path.insert(0, TRAINING_DIR)
+    from model_training import LiverCirrhosisModelTrainer
+    trainer = LiverCirrhosisModelTrainer(DATA_PATH)
+    with _quiet():
+        trainer.load_and_preprocess_data()
+    return trainer
+
+
+def _eda():
+    sys.path.insert(0, TRAINING_DIR)
+    from data_analysis import LiverCirrhosisEDA
+    eda = LiverCirrhosisEDA(DATA_PATH)
+    with _quiet():
+        eda.load_data()
+    return eda
+
+
+def _quietly(method):
+    import matplotlib.pyplot as plt
+
+    def run():
+        with _quiet():
+            method()
+        plt.close('all')
+    return run
+
+
+@benchmark('training', 'load_and_preprocess_data')
+def _load_and_preprocess():
+    return _quietly(_trainer().load_and_preprocess_data)
+
+
+@benchmark('training', 'train_random_forest', number=1, repeat=1)
+def _train_random_forest():
+    return _quietly(_trainer().train_random_forest)
+
+
+for _method in ['load_data', 'basic_info', 'descriptive_statistics', 'target_distribution',
+                'feature_distributions', 'correlation_analysis', 'outlier_analysis',
+                'class_wise_analysis']:
+    benchmark('eda', _method, repeat=3)(
+        lambda method=_method: _quietly(getattr(_eda(), method)))
+
+
+@benchmark('eda', 'compute_statistics', repeat=3)
+def _compute_statistics():
+    # _eda() puts the training modules on sys.path, so it comes first
+    df = _eda().df
+    from eda_stats import compute_statistics
+    return lambda: compute_statistics(df)
+
+
+def run_benchmarks(groups, name_filter=None):
+    results = {}
+    for entry in _registry:
+        if entry['group'] not in groups:
+            continue
+        if name_filter and name_filter not in entry['name']:
+            continue
+        try:
+            fn = entry['setup']()
+        except ImportError as e:
+            # Stages of optional formats, e.g. Arrow without pyarrow
+            print(f"{entry['name']:<45} skipped: {e}")
+            continue
+        results[entry['name']] = measure(fn, entry['number'], entry['repeat'])
+        print(f"{entry['name']:<45} {results[entry['name']]['median_ms']:>12.4f} ms")
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Print current vs baseline timings; returns (stages slower than the threshold
+    allows, stages the baseline has no timing for)
+
+    The fastest run of each stage is compared: it is the least sensitive to
+    other load on the machine.
+    """
+    regressions = []
+    missing = []
+    print(f"\n{'stage':<45} {'baseline ms':>12} {'current ms':>12} {'change':>8}")
+    for name, result in current['results'].items():
+        if name not in baseline['results']:
+            print(f"{name:<45} {'-':>12} {result['min_ms']:>12.4f} {'':>8}  NOT IN BASELINE")
+            missing.append(name)
+            continue
+        before = baseline['results'][name]['min_ms']
+        after = result['min_ms']
+        change = after / before - 1 if before else 0.0
+        flag = '  REGRESSION' if change > threshold else ''
+        print(f"{name:<45} {before:>12.4f} {after:>12.4f} {change:>+8.1%}{flag}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions, missing
+
+
+def merge_baseline(current, previous):
+    """current, keeping the previous timings of stages it did not run
+
+    Stages left out by --filter or --training, or skipped for a missing optional
+    dependency, keep guarding against regressions after a re-record.
+    """
+    results = dict(previous['results']) if previous else {}
+    results.update(current['results'])
+    # Stored in the order the stages are registered, as a full run writes them
+    order = {entry['name']: i for i, entry in enumerate(_registry)}
+    results = dict(sorted(results.items(), key=lambda item: order.get(item[0], len(order))))
+    return {**current, 'results': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the serving and training pipeline stages')
+    parser.add_argument('--training', action='store_true', help='Also run trainer and EDA stages')
+    parser.add_argument('--filter', default=None, help='Only run stages whose name contains this text')
+    parser.add_argument('--output', default=None, help='Write results as JSON to this path')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='Baseline results file')
+    parser.add_argument('--save-baseline', action='store_true', help='Store this run as the baseline')
+    parser.add_argument('--check', action='store_true',
+                        help='Exit with status 1 if a stage is slower than the baseline by more than --threshold')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'Allowed slowdown as a fraction (default: {DEFAULT_THRESHOLD})')
+    args = parser.parse_args()
+
+    # Stages load artifacts relative to the project root, like the apps do
+    os.chdir(PROJECT_ROOT)
+    groups = {'serving', 'training', 'eda'} if args.training else {'serving'}
+    current = run_benchmarks(groups, args.filter)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(merge_baseline(current, baseline), f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    if baseline is not None:
+        regressions, missing = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) regressed by more than {args.threshold:.0%}")
+        if missing:
+            # A stage without a baseline is not guarded at all; say so rather than pass
+            print(f"\n{len(missing)} stage(s) have no baseline timing: {', '.join(missing)}\n"
+                  f"Record them with: python benchmark.py --save-baseline")
+        if args.check and (regressions or missing):
+            sys.exit(1)
+    elif args.check:
+        print(f"No baseline at {args.baseline}; run with --save-baseline first")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
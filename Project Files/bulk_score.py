@@ -0,0 +1,199 @@
+"""
+Bulk scoring of lab archives from the command line.
+Streams a CSV in the dataset's column layout (see Data/liver.csv) in chunks,
+scores each chunk in one vectorized pass across a pool of worker processes, and
+appends the results to a CSV or Parquet file as chunks complete. Only a bounded
+number of chunks is held in memory at any time, whatever the size of the input.
+With --rules, rows are scored by the fallback clinical rules instead of the model.
+Every row also gets its key factors from the rule engine. Rows with a lab value that
+is not a finite number are not scored; they are written with their row number and
+the reason to a separate file (--errors, by default <output>.rejected.csv) and the
+run goes on.
+
+Usage:
+    python bulk_score.py archive.csv scored.csv
+    python bulk_score.py archive.csv scored.parquet --chunksize 200000 --workers 8
+    python bulk_score.py archive.csv scored.csv --rules
+"""
+
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from model_format import load_model
+from rules import default_engine
+from scoring import FEATURE_COLUMNS, features_from_frame, predict_proba, assess_batch, fallback_batch
+
+_model = None
+_scaler = None
+
+
+def _init_worker(use_rules=False):
+    # Each worker maps the model once; the fused artifact is shared between them
+    global _model, _scaler
+    if not use_rules:
+        _model, _scaler, _ = load_model()
+
+
+def score_matrix(features_matrix):
+    """Score one chunk in a worker: (prediction, probability %, risk level, stage, key factors) columns"""
+    if _model is None:
+        predictions, probability, risk_levels, stages, impacts = fallback_batch(features_matrix)
+    else:
+        probabilities = predict_proba(_model, _scaler, features_matrix)
+        predictions, max_prob, risk_levels, stages = assess_batch(_model.classes_, probabilities)
+        probability = max_prob * 100
+        impacts = default_engine.evaluate(features_matrix)[1]
+    return predictions, probability, risk_levels, stages, default_engine.factor_names(impacts)
+
+
+def validate_chunk(chunk):
+    """Split a chunk into (scorable rows, their feature matrix, rejected rows or None)
+
+    Rejected rows get the input row number (0 for the first data row) and the
+    reason, in 'row' and 'error' columns in front of their input columns.
+    """
+    errors = pd.Series(None, index=chunk.index, dtype=object)
+    for column in FEATURE_COLUMNS:
+        if column == 'Gender':
+            continue
+        values = pd.to_numeric(chunk[column], errors='coerce')
+        bad = ((values.isna() & chunk[column].notna()) | np.isinf(values)) & errors.isna()
+        if bad.any():
+            errors[bad] = [f"{column} is not a finite number: {value!r}" for value in chunk.loc[bad, column]]
+    if errors.isna().all():
+        return chunk, features_from_frame(chunk), None
+
+    valid = errors.isna()
+    rejected = chunk.loc[~valid]
+    rejected.insert(0, 'error', errors[~valid])
+    rejected.insert(0, 'row', rejected.index)
+    chunk = chunk.loc[valid].copy()
+    # Columns read as text because of a rejected value hold numbers again
+    for column in chunk.columns.intersection(FEATURE_COLUMNS).drop('Gender', errors='ignore'):
+        if chunk[column].dtype == object:
+            chunk[column] = pd.to_numeric(chunk[column])
+    return chunk, features_from_frame(chunk), rejected
+
+
+def add_scores(chunk, scores):
+    predictions, probability, risk_levels, stages, key_factors = scores
+    chunk = chunk.copy()
+    chunk['prediction'] = predictions
+    chunk['probability'] = probability
+    chunk['riskLevel'] = risk_levels
+    chunk['stage'] = stages
+    chunk['keyFactors'] = key_factors
+    return chunk
+
+
+class ChunkWriter:
+    """Appends scored chunks to a CSV or Parquet file"""
+
+    def __init__(self, path, file_format):
+        self.path = path
+        self.file_format = file_format
+        self.rows = 0
+        self._parquet = None
+
+    def write(self, chunk):
+        if self.file_format == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            chunk.to_csv(self.path, mode='w' if self.rows == 0 else 'a',
+                         header=self.rows == 0, index=False)
+        self.rows += len(chunk)
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def rejected_path(output_path):
+    return os.path.splitext(output_path)[0] + '.rejected.csv'
+
+
+def score_file(input_path, output_path, chunksize=100000, workers=None, file_format=None, use_rules=False,
+               errors_path=None):
+    """Score input_path into output_path and return (rows scored, rows rejected, seconds taken)
+
+    Rejected rows go to errors_path (default: rejected_path(output_path)), which is
+    only created when there are any.
+    """
+    if file_format is None:
+        file_format = 'parquet' if output_path.endswith('.parquet') else 'csv'
+    if file_format == 'parquet':
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise ImportError("Parquet output requires pyarrow (pip install pyarrow)")
+    workers = workers or os.cpu_count() or 1
+    errors_path = errors_path or rejected_path(output_path)
+    if os.path.exists(errors_path):
+        # Left by an earlier run; it must not look like this run's rejects
+        os.remove(errors_path)
+
+    start = time.perf_counter()
+    writer = ChunkWriter(output_path, file_format)
+    errors = ChunkWriter(errors_path, 'csv')
+    reader = pd.read_csv(input_path, chunksize=chunksize)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(use_rules,)) as pool:
+            # Keep at most two chunks per worker in flight and write them in input order
+            in_flight = deque()
+            for chunk in reader:
+                chunk, features_matrix, rejected = validate_chunk(chunk)
+                if rejected is not None:
+                    errors.write(rejected)
+                if chunk.empty:
+                    continue
+                in_flight.append((chunk, pool.submit(score_matrix, features_matrix)))
+                if len(in_flight) >= 2 * workers:
+                    chunk, future = in_flight.popleft()
+                    writer.write(add_scores(chunk, future.result()))
+                    print(f"{writer.rows} rows scored", end='\r', flush=True)
+            while in_flight:
+                chunk, future = in_flight.popleft()
+                writer.write(add_scores(chunk, future.result()))
+            print(f"{writer.rows} rows scored")
+    finally:
+        writer.close()
+        errors.close()
+        reader.close()
+    if errors.rows:
+        print(f"{errors.rows} rows rejected, see {errors_path}")
+    return writer.rows, errors.rows, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score a CSV of lab panels with the liver cirrhosis model')
+    parser.add_argument('input', help=f"CSV with columns {', '.join(FEATURE_COLUMNS)}")
+    parser.add_argument('output', help='Output .csv or .parquet file')
+    parser.add_argument('--chunksize', type=int, default=100000, help='Rows per chunk (default: 100000)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default=None,
+                        help='Output format (default: from the output file extension)')
+    parser.add_argument('--rules', action='store_true',
+                        help='Score with the fallback clinical rules instead of the model')
+    parser.add_argument('--errors', default=None,
+                        help='CSV for rows that cannot be scored (default: <output>.rejected.csv)')
+    args = parser.parse_args()
+
+    rows, _, elapsed = score_file(args.input, args.output, args.chunksize, args.workers, args.format, args.rules,
+                                  args.errors)
+    print(f"Scored {rows} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/sec)")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Array-backed inference engine for the Random Forest used by the prediction service.
+All trees of a fitted scikit-learn forest are flattened into contiguous NumPy node
+arrays so single rows and batches can be scored with vectorized traversal, without
+going through scikit-learn's per-tree Python and joblib dispatch.
+"""
+
+import numpy as np
+
+LEAF = -1
+# Rows traversed together; keeps the (row, tree) working set cache-sized
+BLOCK_ROWS = 512
+_SIGN_BIT = np.int64(-2**63)
+_MAGNITUDE = np.int64(2**63 - 1)
+
+
+def _float_to_key(values):
+    """Map float64 values onto int64 keys with the same ordering"""
+    bits = np.asarray(values, dtype=np.float64).view(np.int64)
+    return np.where(bits < 0, -(bits & _MAGNITUDE), bits)
+
+
+def _key_to_float(keys):
+    bits = np.where(keys < 0, (-keys) | _SIGN_BIT, keys)
+    return bits.astype(np.int64).view(np.float64)
+
+
+class CompiledForest:
+    def __init__(self, feature, threshold, left, right, value, roots, classes, max_depth,
+                 cast_float32=True, children=None, n_features=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.max_depth = int(max_depth)
+        # Forests exported from scikit-learn compare float32-rounded inputs;
+        # forests with folded thresholds compare the raw float64 values
+        self.cast_float32 = bool(cast_float32)
+        self.metadata = {}
+        self.checksum = None
+        # Inferred from the splits when not given, which undercounts trailing unused features
+        if n_features is None:
+            n_features = int(feature.max()) + 1 if len(feature) else 0
+        self.n_features_in_ = int(n_features)
+
+        # Traversal table: leaves point back at themselves so finished rows can
+        # keep stepping without branching, and both children sit side by side.
+        # It can be passed in (e.g. memory-mapped) so processes do not rebuild it.
+        if children is None:
+            nodes = np.arange(len(left), dtype=np.int32)
+            is_leaf = left == LEAF
+            children = np.stack([
+                np.where(is_leaf, nodes, right),
+                np.where(is_leaf, nodes, left),
+            ], axis=1).ravel().astype(np.int32)
+        self.children = children
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        """Flatten a fitted RandomForestClassifier into one set of node arrays"""
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left == LEAF
+
+            # Child indices become global indices into the concatenated arrays
+            left = np.where(is_leaf, LEAF, tree.children_left + offset)
+            right = np.where(is_leaf, LEAF, tree.children_right + offset)
+
+            # Leaves are normalized exactly like DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :].astype(np.float64)
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            value = value / normalizer
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(left)
+            rights.append(right)
+            values.append(value)
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.int32),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            left=np.ascontiguousarray(np.concatenate(lefts), dtype=np.int32),
+            right=np.ascontiguousarray(np.concatenate(rights), dtype=np.int32),
+            value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            classes=np.asarray(forest.classes_),
+            max_depth=max_depth,
+            n_features=forest.n_features_in_,
+        )
+
+    def fold_scaler(self, mean, scale):
+        """Return a forest that takes raw features, with the scaler baked into its thresholds
+
+        For every split on feature j with threshold t, the new threshold is the
+        largest float64 x for which float32((x - mean[j]) / scale[j]) <= t. The
+        standardization is monotonic, so comparing raw inputs against it makes
+        exactly the same decision as the two-stage scaler + forest pipeline.
+        """
+        if not self.cast_float32:
+            raise ValueError('Forest thresholds are already in raw feature units')
+        mean = np.asarray(mean, dtype=np.float64)
+        scale = np.asarray(scale, dtype=np.float64)
+        if np.any(scale <= 0):
+            raise ValueError('Scaler scale_ must be positive to fold into thresholds')
+
+        internal = self.left != LEAF
+        features = self.feature[internal]
+        targets = self.threshold[internal]
+        node_mean = mean[features]
+        node_scale = scale[features]
+
+        def goes_left(raw):
+            # Bisection starts at the extremes of float64, which overflow float32 to +-inf
+            with np.errstate(over='ignore'):
+                scaled = ((raw - node_mean) / node_scale).astype(np.float32).astype(np.float64)
+            return scaled <= targets
+
+        # Bisect over the ordered float64 bit patterns: lo always goes left,
+        # hi always goes right, until they are adjacent floats
+        finite_max = np.finfo(np.float64).max
+        lo = np.full(targets.shape, _float_to_key(-finite_max))
+        hi = np.full(targets.shape, _float_to_key(finite_max))
+        always_left = goes_left(_key_to_float(hi))
+        for _ in range(64):
+            open_ = lo < hi - 1
+            if not open_.any():
+                break
+            mid = (lo >> 1) + (hi >> 1) + (lo & hi & 1)
+            left = goes_left(_key_to_float(mid))
+            lo = np.where(open_ & left, mid, lo)
+            hi = np.where(open_ & ~left, mid, hi)
+
+        threshold = self.threshold.copy()
+        threshold[internal] = np.where(always_left, np.inf, _key_to_float(lo))
+        return CompiledForest(
+            feature=self.feature, threshold=threshold, left=self.left, right=self.right,
+            value=self.value, roots=self.roots, classes=self.classes_,
+            max_depth=self.max_depth, cast_float32=False, children=self.children,
+            n_features=self.n_features_in_,
+        )
+
+    def _check_input(self, X):
+        """X as a 2-D float64 array, checked the way scikit-learn checks it
+
+        The traversal gathers features from one flat array, so a wrong column
+        count would silently read neighbouring rows, and NaN or infinity would
+        be routed down the trees as if they were lab values.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.ndim != 2:
+            raise ValueError(f"Expected a 2D array of feature rows, got {X.ndim} dimensions")
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, but CompiledForest is expecting "
+                             f"{self.n_features_in_} features as input")
+        if not np.isfinite(X).all():
+            raise ValueError("Input X contains NaN or infinity")
+        return X
+
+    def apply(self, X):
+        """Return the leaf index reached in every tree, shape (n_samples, n_trees)"""
+        return self._apply(self._check_input(X))
+
+    def _apply(self, X):
+        if self.cast_float32:
+            # scikit-learn compares float32 inputs against float64 thresholds
+            X = X.astype(np.float32).astype(np.float64)
+        else:
+            X = X.astype(np.float64)
+
+        # Walk all (row, tree) pairs together; pairs that reached a leaf are
+        # dropped every few levels to keep the working set small
+        n_samples, n_features = X.shape
+        nodes = np.broadcast_to(self.roots, (n_samples, self.n_trees)).ravel().astype(np.intp)
+        row_offsets = np.repeat(np.arange(n_samples, dtype=np.intp) * n_features, self.n_trees)
+        flat_X = X.ravel()
+        active = np.arange(nodes.size)
+        for depth in range(self.max_depth):
+            current = nodes[active]
+            if depth % 4 == 3:
+                internal = self.left[current] != LEAF
+                active = active[internal]
+                current = current[internal]
+                if active.size == 0:
+                    break
+            go_left = flat_X[row_offsets[active] + self.feature[current]] <= self.threshold[current]
+            nodes[active] = self.children[2 * current + go_left]
+        return nodes.reshape(n_samples, self.n_trees)
+
+    def predict_proba(self, X):
+        """Average the per-tree class probabilities, matching RandomForestClassifier"""
+        X = self._check_input(X)
+        proba = np.empty((X.shape[0], self.value.shape[1]))
+        for start in range(0, X.shape[0], BLOCK_ROWS):
+            leaf_values = self.value[self._apply(X[start:start + BLOCK_ROWS])]
+            # Trees are accumulated one after another, as scikit-learn does, so the
+            # floating point sums are bit-identical; cumsum is strictly sequential
+            proba[start:start + BLOCK_ROWS] = np.cumsum(leaf_values, axis=1)[:, -1, :]
+        return proba / self.n_trees
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+if __name__ == "__main__":
+    # Parity and latency check against scikit-learn on the bundled dataset
+    import pickle
+    import timeit
+    import warnings
+    import pandas as pd
+    warnings.filterwarnings('ignore')
+
+    with open('rf_acc_68.pkl', 'rb') as f:
+        forest = pickle.load(f)
+    with open('normalizer.pkl', 'rb') as f:
+        scaler = pickle.load(f)
+
+    df = pd.read_csv('Front end/Data/liver.csv').dropna()
+    df['Gender'] = (df['Gender'] == 'Male').astype(int)
+    X = scaler.transform(df.drop('Dataset', axis=1).values)
+
+    compiled = CompiledForest.from_sklearn(forest)
+    expected = forest.predict_proba(X)
+    actual = compiled.predict_proba(X)
+    assert np.array_equal(expected, actual), "probabilities differ from scikit-learn"
+    assert np.array_equal(forest.predict(X), compiled.predict(X)), "predictions differ from scikit-learn"
+    print(f"Rows compared: {len(X)}, probabilities bit-identical to scikit-learn")
+
+    row = X[:1]
+    for label, fn in [
+        ('single row, scikit-learn', lambda: forest.predict_proba(row)),
+        ('single row, compiled', lambda: compiled.predict_proba(row)),
+        (f'{len(X)} rows, scikit-learn', lambda: forest.predict_proba(X)),
+        (f'{len(X)} rows, compiled', lambda: compiled.predict_proba(X)),
+    ]:
+        runs = 50
+        elapsed = min(timeit.repeat(fn, number=runs, repeat=3)) / runs
+        print(f"{label}: {elapsed * 1000:.3f} ms")
@@ -0,0 +1,20 @@
+"""
+Gunicorn settings for the prediction service.
+    gunicorn app:app
+The app (and the memory-mapped fused model) is loaded once in the master and
+shared by the forked workers instead of each worker loading its own copy.
+"""
+
+import os
+
+from shared_model import worker_memory, format_memory
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+
+# Import app.py in the master before forking, so workers inherit the model mapping
+preload_app = True
+
+
+def post_worker_init(worker):
+    worker.log.info("Worker %s ready: %s", worker.pid, format_memory(worker_memory()))
@@ -0,0 +1,154 @@
+"""
+HTTP load generator for the prediction service.
+Opens many keep-alive connections at once and has each one POST /predict in a loop
+for a fixed time, then reports throughput and latency percentiles. Works against
+any server, so the Flask+gunicorn and ASGI setups can be compared:
+
+    gunicorn app:app --workers 4 --threads 8            # Flask, threaded workers
+    uvicorn asgi:app --workers 4                        # ASGI
+    python loadtest.py --url http://127.0.0.1:5000/predict --connections 1000
+
+The generator is a single asyncio process; run it on another machine (or pin it to
+its own cores) when the server should get the whole host.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+SAMPLE_REQUEST = {
+    'age': 45,
+    'gender': 'Male',
+    'totalBilirubin': 1.2,
+    'directBilirubin': 0.3,
+    'alkalinePhosphatase': 120,
+    'alanineAminotransferase': 35,
+    'aspartateAminotransferase': 28,
+    'totalProteins': 7.2,
+    'albumin': 4.1,
+    'A/GRatio': 1.6,
+}
+
+
+async def _read_response(reader):
+    """Read one HTTP/1.1 response; returns (status, body, Retry-After seconds or None)"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed by server')
+    status = int(status_line.split()[1])
+    length, chunked, retry_after = 0, False, None
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding' and 'chunked' in value.lower():
+            chunked = True
+        elif name == 'retry-after':
+            retry_after = float(value)
+    if not chunked:
+        return status, await reader.readexactly(length), retry_after
+    body = bytearray()
+    while True:
+        size = int((await reader.readline()).strip(), 16)
+        if size == 0:
+            await reader.readline()
+            return status, bytes(body), retry_after
+        body += await reader.readexactly(size)
+        await reader.readline()
+
+
+async def _connection(host, port, request, stop_at, latencies, ok_latencies, errors, started, backoff):
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        errors['connect'] = errors.get('connect', 0) + 1
+        return
+    started.append(1)
+    try:
+        while time.perf_counter() < stop_at:
+            sent = time.perf_counter()
+            writer.write(request)
+            status, _, retry_after = await _read_response(reader)
+            latencies.append(time.perf_counter() - sent)
+            if status == 200:
+                ok_latencies.append(latencies[-1])
+            else:
+                errors[status] = errors.get(status, 0) + 1
+                if backoff and retry_after:
+                    # Back off as a well-behaved client would after a 503
+                    await asyncio.sleep(min(retry_after, stop_at - time.perf_counter()))
+    except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError):
+        errors['disconnect'] = errors.get('disconnect', 0) + 1
+    finally:
+        writer.close()
+
+
+async def run(url, connections, duration, payload=SAMPLE_REQUEST, backoff=True):
+    """Load url with `connections` concurrent keep-alive connections for `duration` seconds"""
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    body = json.dumps(payload).encode()
+    request = (f"POST {parts.path or '/'} HTTP/1.1\r\nHost: {host}:{port}\r\n"
+               f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n").encode() + body
+
+    latencies, ok_latencies, errors, started = [], [], {}, []
+    start = time.perf_counter()
+    stop_at = start + duration
+    await asyncio.gather(*(_connection(host, port, request, stop_at, latencies, ok_latencies, errors, started, backoff)
+                           for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    ok_latencies.sort()
+
+    def percentile(q, latencies=latencies):
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else float('nan')
+
+    return {
+        'connections': connections,
+        'connected': len(started),
+        'requests': len(latencies),
+        'requests_per_sec': len(latencies) / elapsed,
+        'p50_ms': percentile(0.50),
+        'p99_ms': percentile(0.99),
+        'max_ms': latencies[-1] * 1000 if latencies else float('nan'),
+        'mean_ms': statistics.mean(latencies) * 1000 if latencies else float('nan'),
+        # Successful responses only, e.g. when the server sheds load with 503s
+        'ok_requests': len(ok_latencies),
+        'ok_p50_ms': percentile(0.50, ok_latencies),
+        'ok_p99_ms': percentile(0.99, ok_latencies),
+        'errors': errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test POST /predict')
+    parser.add_argument('--url', default='http://127.0.0.1:5000/predict')
+    parser.add_argument('--connections', type=int, default=1000, help='Concurrent keep-alive connections')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds to run')
+    parser.add_argument('--no-backoff', action='store_true',
+                        help='Retry at once after a 503 instead of waiting for its Retry-After')
+    parser.add_argument('--output', default=None, help='Write the results as JSON to this path')
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.url, args.connections, args.duration, backoff=not args.no_backoff))
+    print(f"{result['connected']}/{result['connections']} connections, {result['requests']} requests")
+    print(f"{result['requests_per_sec']:.0f} req/s, p50 {result['p50_ms']:.1f} ms, "
+          f"p99 {result['p99_ms']:.1f} ms, max {result['max_ms']:.1f} ms")
+    if result['errors']:
+        print(f"errors: {result['errors']}")
+        print(f"{result['ok_requests']} succeeded, p50 {result['ok_p50_ms']:.1f} ms, p99 {result['ok_p99_ms']:.1f} ms")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Export the trained Random Forest and its StandardScaler as one fused artifact.
+The scaler is folded into the forest's split thresholds, so the serving apps can
+score raw clinical values directly without a per-request scaler.transform call.
+The artifact is written in the memory-mappable format from model_format.py.
+
+Run from the project root after retraining:
+    python model_export.py
+"""
+
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from forest_engine import CompiledForest
+from model_format import FUSED_MODEL_PATH, file_sha256, save_forest, load_forest
+
+MODEL_PATH = 'rf_acc_68.pkl'
+SCALER_PATH = 'normalizer.pkl'
+DATA_PATH = 'Front end/Data/liver.csv'
+
+
+def fuse_model(model, scaler):
+    """Compile the forest and fold the scaler's standardization into its thresholds"""
+    n_features = model.n_features_in_
+    mean = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+    scale = scaler.scale_ if scaler.with_std else np.ones(n_features)
+    return CompiledForest.from_sklearn(model).fold_scaler(mean, scale)
+
+
+def load_raw_features(data_path=DATA_PATH):
+    """Feature matrix from the training CSV, encoded the way the service encodes requests"""
+    df = pd.read_csv(data_path).dropna()
+    df['Gender'] = (df['Gender'] == 'Male').astype(int)
+    return df.drop('Dataset', axis=1).values.astype(np.float64)
+
+
+def verify_fused_model(fused, model, scaler, X):
+    """Raise ValueError unless the fused forest reproduces the two-stage pipeline exactly"""
+    expected = model.predict_proba(scaler.transform(X))
+    actual = fused.predict_proba(X)
+    mismatched = int(np.sum(np.any(expected != actual, axis=1)))
+    if mismatched:
+        raise ValueError(f"Fused model differs from scaler + forest on {mismatched} of {len(X)} rows")
+    return len(X)
+
+
+def export_fused_model(model_path=MODEL_PATH, scaler_path=SCALER_PATH,
+                       output_path=FUSED_MODEL_PATH, data_path=DATA_PATH):
+    """Write the fused artifact, after checking it against the two pickles on the dataset"""
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    with open(scaler_path, 'rb') as f:
+        scaler = pickle.load(f)
+
+    fused = fuse_model(model, scaler)
+    X = load_raw_features(data_path)
+    verify_fused_model(fused, model, scaler, X)
+
+    save_forest(fused, output_path, metadata={
+        # Lets the apps detect a fused artifact left over from an older model
+        'source_sha256': {
+            'model': file_sha256(model_path),
+            'scaler': file_sha256(scaler_path),
+        },
+        'n_features': int(model.n_features_in_),
+        'feature_names': [str(name) for name in getattr(scaler, 'feature_names_in_', [])],
+    })
+    # Read the file back through the loader the apps use
+    rows_checked = verify_fused_model(load_forest(output_path), model, scaler, X)
+
+    print(f"Fused model verified on {rows_checked} rows")
+    print(f"Fused model saved to {output_path}")
+    return fused
+
+
+if __name__ == "__main__":
+    import warnings
+    warnings.filterwarnings('ignore')
+    export_fused_model()
@@ -0,0 +1,198 @@
+"""
+Versioned binary file format for compiled forests.
+A small JSON header describes the forest and where each node array lives; the
+arrays follow as raw little-endian bytes, aligned so they can be memory-mapped
+and used in place. Loading needs only NumPy, not scikit-learn or pickle.
+
+Layout:
+    8 bytes   magic b'LCFOREST'
+    4 bytes   format version (uint32, little-endian)
+    4 bytes   header length in bytes (uint32, little-endian)
+    header    UTF-8 JSON, padded with spaces to the array alignment
+    payload   node arrays, each starting on an ALIGNMENT boundary
+"""
+
+import hashlib
+import json
+import os
+import struct
+
+import numpy as np
+
+from forest_engine import CompiledForest
+
+MAGIC = b'LCFOREST'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+FUSED_MODEL_PATH = 'rf_fused.forest'
+
+_PREFIX = struct.Struct('<8sII')
+_ARRAYS = {
+    'feature': '<i4',
+    'threshold': '<f8',
+    'left': '<i4',
+    'right': '<i4',
+    'value': '<f8',
+    'roots': '<i4',
+    'children': '<i4',
+}
+
+
+def file_sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _padded(length):
+    return -(-length // ALIGNMENT) * ALIGNMENT
+
+
+def save_forest(forest, path, metadata=None):
+    """Write a CompiledForest to path in the versioned binary format"""
+    arrays = {name: np.ascontiguousarray(getattr(forest, name), dtype=dtype)
+              for name, dtype in _ARRAYS.items()}
+
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = _padded(offset + array.nbytes)
+    payload = bytearray(offset)
+    for name, array in arrays.items():
+        start = layout[name]['offset']
+        payload[start:start + array.nbytes] = array.tobytes()
+
+    header = {
+        'classes': forest.classes_.tolist(),
+        'max_depth': forest.max_depth,
+        'cast_float32': forest.cast_float32,
+        'arrays': layout,
+        'payload_bytes': len(payload),
+        'payload_sha256': hashlib.sha256(payload).hexdigest(),
+        'metadata': metadata or {},
+    }
+    header_bytes = json.dumps(header, sort_keys=True).encode('utf-8')
+    header_bytes = header_bytes.ljust(_padded(_PREFIX.size + len(header_bytes)) - _PREFIX.size)
+
+    # Written beside the target and renamed over it: rewriting the file in place
+    # would pull the pages from under processes serving from a mapping of it
+    # (SIGBUS), while they keep the old file across a rename until they reload
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+            f.write(header_bytes)
+            f.write(payload)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def read_header(path):
+    """Return (header dict, payload offset) after checking magic and version"""
+    with open(path, 'rb') as f:
+        prefix = f.read(_PREFIX.size)
+        if len(prefix) < _PREFIX.size:
+            raise ValueError(f"{path} is not a forest model file")
+        magic, version, header_length = _PREFIX.unpack(prefix)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a forest model file")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path} uses format version {version}, expected {FORMAT_VERSION}")
+        header = json.loads(f.read(header_length).decode('utf-8'))
+    return header, _PREFIX.size + header_length
+
+
+def load_forest(path, verify=True):
+    """Memory-map a forest model file and return a CompiledForest backed by it"""
+    header, payload_offset = read_header(path)
+    payload = np.memmap(path, dtype=np.uint8, mode='r', offset=payload_offset,
+                        shape=(header['payload_bytes'],))
+    if verify and hashlib.sha256(payload).hexdigest() != header['payload_sha256']:
+        raise ValueError(f"{path} failed its checksum; the file is corrupt or truncated")
+
+    # A plain ndarray view of the mapping: still zero-copy, but the node arrays cut
+    # from it are not memmap subclasses, whose every fancy-index gather during
+    # traversal would build another memmap object
+    data = payload.view(np.ndarray)
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape']))
+        start = spec['offset']
+        arrays[name] = data[start:start + count * dtype.itemsize].view(dtype).reshape(spec['shape'])
+
+    forest = CompiledForest(
+        classes=np.asarray(header['classes']),
+        max_depth=header['max_depth'],
+        cast_float32=header['cast_float32'],
+        n_features=header['metadata'].get('n_features'),
+        **arrays,
+    )
+    forest.metadata = header['metadata']
+    forest.checksum = header['payload_sha256']
+    return forest
+
+
+def load_fused_model(path=FUSED_MODEL_PATH, model_path='rf_acc_68.pkl', scaler_path='normalizer.pkl'):
+    """Load the fused forest, or return None if it is missing or older than the pickles"""
+    try:
+        forest = load_forest(path)
+    except FileNotFoundError:
+        return None
+
+    sources = forest.metadata.get('source_sha256', {})
+    for key, source_path in (('model', model_path), ('scaler', scaler_path)):
+        try:
+            if file_sha256(source_path) != sources.get(key):
+                print(f"{path} is older than {source_path}; re-run model_export.py")
+                return None
+        except FileNotFoundError:
+            continue
+    return forest
+
+
+def load_model(path=FUSED_MODEL_PATH, model_path='rf_acc_68.pkl', scaler_path='normalizer.pkl'):
+    """Load the serving model as (model, scaler, version)
+
+    The fused forest is used when it matches the pickles, with scaler None since
+    normalization is folded into it. Otherwise the pickled forest is compiled and
+    returned with its scaler. Raises FileNotFoundError if neither is available.
+    """
+    model = load_fused_model(path, model_path, scaler_path)
+    if model is not None:
+        return model, None, model.checksum
+
+    import pickle
+    with open(model_path, 'rb') as f:
+        # Flatten the forest once so scoring skips scikit-learn's per-tree dispatch
+        model = CompiledForest.from_sklearn(pickle.load(f))
+    with open(scaler_path, 'rb') as f:
+        scaler = pickle.load(f)
+    return model, scaler, file_sha256(model_path) + file_sha256(scaler_path)
+
+
+if __name__ == "__main__":
+    # Cold-start comparison, each measured in a fresh interpreter
+    import subprocess
+    import sys
+    import time
+
+    def cold_start(code):
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, '-W', 'ignore', '-c', code], check=True)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    pickled = cold_start(
+        "import pickle\n"
+        "with open('rf_acc_68.pkl', 'rb') as f: pickle.load(f)\n"
+        "with open('normalizer.pkl', 'rb') as f: pickle.load(f)\n"
+    )
+    mapped = cold_start("from model_format import load_fused_model\nassert load_fused_model() is not None\n")
+    print(f"pickle.load of rf_acc_68.pkl + normalizer.pkl: {pickled * 1000:.0f} ms")
+    print(f"load_fused_model() from {FUSED_MODEL_PATH}: {mapped * 1000:.0f} ms")
@@ -0,0 +1,263 @@
+"""
+Hot reload of the serving model.
+The model in service is held as one immutable ServingModel snapshot (model, scaler,
+version and, when micro-batching is on, its own batcher). A request reads the
+snapshot once and uses it to the end, so replacing it never changes the model under
+a request that is already running: in-flight requests finish on the old version and
+the next ones start on the new one.
+
+A reload loads the artifacts in the calling thread while the current model keeps
+serving, checks the candidate with smoke predictions (which also warm it up), and
+only then swaps it in with a single assignment. A candidate that fails to load or
+validate is discarded and the old model stays. Reloads are started by an admin
+request or by a watcher thread that polls the artifact files and reloads once a
+change has settled, e.g. after LiverCirrhosisModelTrainer.save_model rewrote the
+pickles or model_export.py rewrote the fused forest.
+"""
+
+import itertools
+import os
+import threading
+import time
+
+import numpy as np
+
+from model_format import FUSED_MODEL_PATH, load_model
+from scoring import predict_proba
+
+ARTIFACT_PATHS = (FUSED_MODEL_PATH, 'rf_acc_68.pkl', 'normalizer.pkl')
+
+# Feature vectors every candidate model must score; the first is the sample
+# request, the others span the healthy and abnormal ranges of each lab value
+SMOKE_ROWS = np.array([
+    [45, 1, 1.2, 0.3, 120, 35, 28, 7.2, 4.1, 1.6],
+    [62, 1, 7.3, 4.1, 490, 60, 68, 7.0, 3.3, 0.89],
+    [30, 0, 0.7, 0.1, 80, 15, 20, 6.8, 3.9, 1.3],
+    [70, 0, 22.0, 11.5, 1500, 900, 1200, 4.5, 1.8, 0.4],
+], dtype=np.float64)
+
+
+class ServingModel:
+    """One loaded model; not modified once it is in service
+
+    generation numbers the models a holder has swapped in, from 1; unlike version,
+    the artifact hash, it only increases, also when a reload rolls back to an
+    earlier artifact.
+    """
+
+    __slots__ = ('model', 'scaler', 'version', 'generation', 'loaded_at', 'batcher')
+
+    def __init__(self, model, scaler, version):
+        self.model = model
+        self.scaler = scaler
+        self.version = version
+        self.generation = 0
+        self.loaded_at = time.time()
+        self.batcher = None
+
+    def score_matrix(self, features_matrix):
+        """Normalize a matrix of feature rows and return the model's class probabilities"""
+        return predict_proba(self.model, self.scaler, features_matrix)
+
+
+def validate(serving, rows=SMOKE_ROWS):
+    """Raise ValueError unless the model gives sound probabilities for the smoke rows"""
+    classes = np.asarray(serving.model.classes_)
+    if len(classes) < 2 or not np.issubdtype(classes.dtype, np.integer):
+        raise ValueError(f"Expected at least two integer classes, got {classes.tolist()}")
+    probabilities = np.asarray(serving.score_matrix(rows))
+    if probabilities.shape != (len(rows), len(classes)):
+        raise ValueError(f"Expected probabilities of shape {(len(rows), len(classes))}, "
+                         f"got {probabilities.shape}")
+    if not np.all(np.isfinite(probabilities)) or not np.allclose(probabilities.sum(axis=1), 1.0):
+        raise ValueError("Smoke predictions are not valid probability distributions")
+    # The single-row path the /predict handler takes
+    single = serving.score_matrix(rows[:1])[0]
+    if not np.allclose(single, probabilities[0]):
+        raise ValueError("Single-row and batch predictions disagree")
+
+
+class ModelHolder:
+    def __init__(self, loader=load_model, paths=ARTIFACT_PATHS, batcher_factory=None, watch_interval=0.0):
+        self.loader = loader
+        self.paths = paths
+        self.batcher_factory = batcher_factory
+        self.watch_interval = watch_interval
+        self.current = None
+        self.reloads = {'swapped': 0, 'unchanged': 0, 'failed': 0}
+        self.last_error = None
+        self._signature = None
+        self._generations = itertools.count(1)
+        self._reload_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._watcher = None
+
+    def get(self):
+        """The current ServingModel, or None if no model is loaded
+
+        Read it once per request and use that snapshot throughout.
+        """
+        if self.watch_interval > 0:
+            self._ensure_watcher()
+        return self.current
+
+    def load(self):
+        """Load the first model; raises FileNotFoundError if there are no artifacts"""
+        with self._reload_lock:
+            self._signature = self.signature()
+            self._swap(self._prepare())
+
+    def reload(self):
+        """Load, validate and swap in the artifacts on disk
+
+        Returns 'swapped', or 'unchanged' when they hold the model already in
+        service; raises if the new model cannot be loaded or fails validation, in
+        which case the current model keeps serving.
+        """
+        with self._reload_lock:
+            # Taken before loading: a write that lands during the load is picked up next time
+            self._signature = self.signature()
+            try:
+                candidate = self._prepare()
+            except Exception as e:
+                self.reloads['failed'] += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                raise
+            self.last_error = None
+            current = self.current
+            if current is not None and candidate.version == current.version:
+                self.reloads['unchanged'] += 1
+                return 'unchanged'
+            self._swap(candidate)
+            self.reloads['swapped'] += 1
+            return 'swapped'
+
+    def _prepare(self):
+        model, scaler, version = self.loader()
+        candidate = ServingModel(model, scaler, version)
+        # Doubles as the warm-up: the first predictions on a fresh model pay for
+        # page faults and lazy setup, before any request reaches it
+        validate(candidate)
+        if self.batcher_factory:
+            # Its own batcher, so rows are always scored by the model their request started with
+            candidate.batcher = self.batcher_factory(candidate.score_matrix)
+        return candidate
+
+    def _swap(self, candidate):
+        candidate.generation = next(self._generations)
+        previous, self.current = self.current, candidate
+        if previous is not None and previous.batcher is not None:
+            # Its worker exits once the rows of in-flight requests are scored
+            previous.batcher.close()
+
+    def signature(self):
+        """(mtime, size) of each artifact, None for missing ones"""
+        stamps = []
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+                stamps.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def status(self):
+        current = self.current
+        return {
+            'version': current.version if current else None,
+            'loadedAt': current.loaded_at if current else None,
+            'reloads': dict(self.reloads),
+            'lastError': self.last_error,
+            'watchInterval': self.watch_interval,
+        }
+
+    def _ensure_watcher(self):
+        # Started lazily so forked server workers each get their own thread
+        if self._watcher is None or not self._watcher.is_alive():
+            with self._lock:
+                if self._watcher is None or not self._watcher.is_alive():
+                    self._watcher = threading.Thread(target=self._watch, name='model-watcher', daemon=True)
+                    self._watcher.start()
+
+    def _watch(self):
+        previous = self.signature()
+        while True:
+            time.sleep(self.watch_interval)
+            signature = self.signature()
+            # Reload only once the files have stopped changing for a whole interval,
+            # so a model and scaler being rewritten are not read half way through
+            if signature != self._signature and signature == previous:
+                try:
+                    outcome = self.reload()
+                    print(f"Model reload from changed artifacts: {outcome}, version {self.current.version[:12]}")
+                except Exception as e:
+                    print(f"Model reload failed, still serving the previous model: {e}")
+            previous = signature
+
+
+if __name__ == "__main__":
+    import math
+    import shutil
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+
+    from batching import MicroBatcher
+    from forest_engine import CompiledForest
+    from model_format import load_forest, save_forest
+
+    # Swap demo: keep requests running against the holder while a modified copy of
+    # the fused forest is written and picked up by the watcher
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, FUSED_MODEL_PATH)
+    shutil.copy(FUSED_MODEL_PATH, path)
+
+    def loader():
+        return load_model(path, os.path.join(workdir, 'missing.pkl'), os.path.join(workdir, 'missing.pkl'))
+
+    holder = ModelHolder(loader, paths=(path,), watch_interval=0.05,
+                         batcher_factory=lambda fn: MicroBatcher(fn, 1.0, 32))
+    holder.load()
+    first_version = holder.get().version
+    stop = threading.Event()
+    versions = {}
+    failures = []
+
+    def client():
+        while not stop.is_set():
+            serving = holder.get()
+            try:
+                probability = serving.batcher.score(SMOKE_ROWS[0])
+                assert math.isclose(sum(probability), 1.0)
+                versions[serving.version] = versions.get(serving.version, 0) + 1
+            except Exception as e:
+                failures.append(e)
+
+    with ThreadPoolExecutor(8) as pool:
+        for _ in range(8):
+            pool.submit(client)
+        time.sleep(0.3)
+        # A truncated file must be rejected without disturbing service. Artifacts are
+        # replaced by renaming, as save_forest does, never rewritten in place
+        shutil.copy(path, path + '.good')
+        with open(path + '.good', 'rb') as f:
+            truncated = f.read()
+        with open(path + '.bad', 'wb') as f:
+            f.write(truncated[:len(truncated) // 2])
+        os.replace(path + '.bad', path)
+        time.sleep(0.3)
+        rejected = holder.status()
+        # Then a genuinely new artifact, standing in for a retrained forest
+        forest = load_forest(path + '.good')
+        threshold = np.array(forest.threshold)
+        threshold[0] += 1e-9
+        save_forest(CompiledForest(forest.feature, threshold, forest.left, forest.right, forest.value,
+                                   forest.roots, forest.classes_, forest.max_depth,
+                                   cast_float32=forest.cast_float32, children=forest.children), path)
+        time.sleep(0.3)
+        stop.set()
+
+    print(f"after truncation: version {rejected['version'][:12]} kept, last error {rejected['lastError']!r}")
+    print(f"requests by version: { {version[:12]: count for version, count in versions.items()} }")
+    print(f"swapped {first_version[:12]} -> {holder.get().version[:12]}, "
+          f"reloads {holder.reloads}, failed requests {len(failures)}")
+    shutil.rmtree(workdir)
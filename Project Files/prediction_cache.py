@@ -0,0 +1,103 @@
+"""
+Bounded in-process cache of prediction responses.
+Clinics often resubmit the same lab panel (refreshes, retries, dashboards polling
+a patient). Responses are cached by the feature vector, rounded to a configurable
+precision, with LRU eviction and a time-to-live. Every entry is tied to the
+generation of the model that produced it (ModelHolder numbers the models it swaps
+in), and the cache only moves forward: a newer generation drops every entry, so a
+new model never serves stale results, while a lookup or a result from an older one,
+i.e. a request still finishing on a replaced model, is a miss and is not stored.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class PredictionCache:
+    def __init__(self, maxsize=1024, ttl=300.0, precision=6, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.precision = precision
+        self.clock = clock
+        self.generation = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def key(self, features):
+        """Canonical cache key for a feature vector"""
+        return tuple(round(float(value), self.precision) for value in features)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, features, generation):
+        """Return the cached response for features, or None"""
+        key = self.key(features)
+        with self._lock:
+            if self._stale(generation):
+                self.misses += 1
+                return None
+            self._advance(generation)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, result = entry
+            if self.clock() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, features, generation, result):
+        key = self.key(features)
+        with self._lock:
+            if self._stale(generation):
+                # Finished on a model that has since been replaced (a hot reload);
+                # the newer model's entries stay
+                return
+            self._advance(generation)
+            self._entries[key] = (self.clock() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'generation': self.generation,
+            }
+
+    def _stale(self, generation):
+        return self.generation is not None and generation < self.generation
+
+    def _advance(self, generation):
+        # Called with the lock held: results from the older models are dropped at once
+        if generation != self.generation:
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+            self.generation = generation
@@ -0,0 +1,368 @@
+"""
+Request handling for /predict and /predict/batch, independent of the web framework.
+app.py (Flask) and asgi.py (ASGI) only adapt requests and responses: they pass the
+request's content type, body, a get_json callable and its headers to a
+PredictionService handler, and turn the (status, body, headers) it ends with into
+their own response. Parsing, the cache, admission control, the fallback rules,
+encoding and metrics all live here, once.
+
+A handler is a generator. Where it needs the model it yields a Score, the call to
+make, and is resumed with the call's result, or with its exception (Overloaded when
+the request is shed). run() makes the calls in the current thread, blocking on
+admission slots and the micro-batcher as a Flask worker does. run_async() keeps
+the event loop free of request work: the handler itself (parsing, feature
+extraction, cache lookups, encoding) and its scoring calls run in a thread pool,
+and only waiting for an admission slot or a micro-batch happens on the loop, so
+neither a large batch body nor a request waiting its turn holds up the others.
+"""
+
+import asyncio
+from contextlib import nullcontext
+
+import numpy as np
+
+import metrics
+import wire_format
+from admission import Overloaded, request_deadline
+from response_json import dumps, encode_result, encode_results
+from scoring import (extract_features, build_result, score_rows, score_columns,
+                     fallback_prediction, fallback_results)
+
+
+class Score:
+    """A scoring call a handler needs made: fn(*args), inside an admission slot if admission is set
+
+    future marks fn as returning a concurrent.futures.Future (MicroBatcher.submit)
+    to wait on; timer, if given, gets an 'admission' lap once the slot is taken.
+    """
+
+    __slots__ = ('fn', 'args', 'admission', 'deadline', 'timer', 'future')
+
+    def __init__(self, fn, args, admission=None, deadline=None, timer=None, future=False):
+        self.fn = fn
+        self.args = args
+        self.admission = admission
+        self.deadline = deadline
+        self.timer = timer
+        self.future = future
+
+    def run(self):
+        with self.admission.slot(self.deadline) if self.admission else nullcontext():
+            if self.admission and self.timer:
+                self.timer.lap('admission')
+            result = self.fn(*self.args)
+            return result.result() if self.future else result
+
+    @property
+    def waits(self):
+        """Whether the call waits for something (a slot, a batch) before it can finish"""
+        return self.admission is not None or self.future
+
+    async def run_async(self, run_in_pool):
+        async with self.admission.slot_async(self.deadline) if self.admission else nullcontext():
+            if self.admission and self.timer:
+                self.timer.lap('admission')
+            if self.future:
+                return await asyncio.wrap_future(self.fn(*self.args))
+            return await run_in_pool(self.fn, *self.args)
+
+
+def run(handler):
+    """Drive a handler in the current thread; returns its (status, body, headers)"""
+    try:
+        work = next(handler)
+        while True:
+            try:
+                result = work.run()
+            except Exception as e:
+                work = handler.throw(e)
+            else:
+                work = handler.send(result)
+    except StopIteration as stop:
+        return stop.value
+
+
+def _advance(handler, resume, value):
+    """Resume a handler and run it until it finishes or yields a call that waits
+
+    Returns (True, response) or (False, the Score to wait for). Runs in run_async's pool.
+    """
+    try:
+        work = resume(value)
+        while not work.waits:
+            try:
+                result = work.fn(*work.args)
+            except Exception as e:
+                work = handler.throw(e)
+            else:
+                work = handler.send(result)
+    except StopIteration as stop:
+        return True, stop.value
+    return False, work
+
+
+async def run_async(handler, run_in_pool):
+    """Drive a handler from the event loop; run_in_pool(fn, *args) runs everything but the waiting"""
+    done, work = await run_in_pool(_advance, handler, handler.send, None)
+    while not done:
+        try:
+            result = await work.run_async(run_in_pool)
+        except Exception as e:
+            done, work = await run_in_pool(_advance, handler, handler.throw, e)
+        else:
+            done, work = await run_in_pool(_advance, handler, handler.send, result)
+    return work
+
+
+def json_response(body, status=200, headers=()):
+    """Response for JSON bytes from response_json, ending in a newline like jsonify's"""
+    return status, body + b'\n', [('Content-Type', 'application/json'), *headers]
+
+
+def error_response(message, status=400, headers=()):
+    return json_response(dumps({'error': message}), status, headers)
+
+
+def encoded_response(response_type, results):
+    """Response for a list of results in the binary format asked for in Accept"""
+    body, content_type = wire_format.encode_results(response_type, results)
+    return 200, body, [('Content-Type', content_type)]
+
+
+def _score_one(serving, features, timer):
+    features_array = np.array(features).reshape(1, -1)
+    if serving.scaler:
+        features_array = serving.scaler.transform(features_array)
+    timer.lap('scale')
+    return serving.model.predict_proba(features_array)[0]
+
+
+class PredictionService:
+    """The prediction endpoints over a ModelHolder, with an optional cache and admission control
+
+    With overload_fallback, requests shed by admission control are answered by the
+    clinical rules instead of 503 + Retry-After. Request and prediction metrics are
+    registered in registry.
+    """
+
+    def __init__(self, holder, registry, cache=None, admission=None, deadline_ms=1000,
+                 retry_after=1, overload_fallback=False):
+        self.holder = holder
+        self.cache = cache
+        self.admission = admission
+        self.deadline_ms = deadline_ms
+        self.retry_after = retry_after
+        self.overload_fallback = overload_fallback
+        self.requests = registry.counter(
+            'liver_requests_total', 'Prediction requests by endpoint and outcome', ('endpoint', 'outcome'))
+        self.request_latency = registry.histogram(
+            'liver_request_duration_seconds', 'Prediction request latency by endpoint', ('endpoint',))
+        self.stage_latency = registry.histogram(
+            'liver_predict_stage_duration_seconds', 'Time spent in each stage of /predict', ('stage',))
+        self.predictions = registry.counter(
+            'liver_predictions_total', 'Scored records by path: model, cache, fallback rules or error', ('path',))
+        self.risk_levels = registry.counter(
+            'liver_risk_level_total', 'Scored records by risk level', ('risk_level',))
+        self.shed = registry.counter(
+            'liver_requests_shed_total', 'Requests shed by admission control, by reason and action',
+            ('reason', 'action'))
+
+    def deadline(self, headers, arrival=None):
+        """Monotonic deadline of a request that arrived at `arrival` (default: now)"""
+        return request_deadline(headers, self.deadline_ms / 1000, now=arrival)
+
+    def _done(self, endpoint, outcome, timer, response):
+        self.requests.inc((endpoint, outcome))
+        self.request_latency.observe(timer.elapsed(), (endpoint,))
+        return response
+
+    def overloaded_response(self, endpoint, error, timer):
+        self.shed.inc((error.reason, 'rejected'))
+        return self._done(endpoint, 'shed', timer,
+                          error_response(str(error), 503, [('Retry-After', str(self.retry_after))]))
+
+    def predict(self, mimetype, body, get_json, accept, headers, arrival=None):
+        """Handler for /predict: one JSON record, or a one-record binary body"""
+        timer = metrics.StageTimer(self.stage_latency)
+        deadline = self.deadline(headers, arrival) if self.admission else None
+        serving = self.holder.get()
+        cache = self.cache
+        try:
+            # Get data from request: JSON, or a one-record binary body
+            binary = wire_format.is_binary(mimetype)
+            if binary:
+                features_matrix = wire_format.parse_features(mimetype, body)
+            else:
+                data = get_json()
+            timer.lap('parse')
+
+            # Extract features
+            features = wire_format.single_row(features_matrix) if binary else extract_features(data)
+            timer.lap('features')
+
+            # Make prediction if model is available
+            if serving:
+                result = cache.get(features, serving.generation) if cache else None
+                path = 'cache'
+                if result is None:
+                    path = 'model'
+                    try:
+                        if serving.batcher:
+                            # Normalization happens inside the batch, so it counts as model time
+                            work = Score(serving.batcher.submit, (features,), future=True)
+                        else:
+                            work = Score(_score_one, (serving, features, timer))
+                        work.admission, work.deadline, work.timer = self.admission, deadline, timer
+                        probability = yield work
+                        timer.lap('model')
+                        result = build_result(serving.model.classes_, probability, features)
+                        if cache:
+                            cache.put(features, serving.generation, result)
+                    except Overloaded as e:
+                        if not self.overload_fallback:
+                            return self.overloaded_response('predict', e, timer)
+                        # Degrade to the clinical rules instead of turning the request away
+                        self.shed.inc((e.reason, 'fallback'))
+                        path = 'fallback'
+                        result = fallback_prediction(features)
+            else:
+                # Fallback prediction logic
+                path = 'fallback'
+                result = fallback_prediction(features)
+            timer.lap('postprocess')
+
+            response_type = wire_format.response_format(accept)
+            if response_type:
+                response = encoded_response(response_type, [result])
+            else:
+                response = json_response(encode_result(result))
+            timer.lap('serialize')
+
+            self.predictions.inc((path,))
+            self.risk_levels.inc((result['riskLevel'],))
+            return self._done('predict', 'ok', timer, response)
+
+        except Exception as e:
+            return self._done('predict', 'error', timer, error_response(str(e)))
+
+    def predict_batch(self, mimetype, body, get_json, accept, headers, arrival=None):
+        """Handler for /predict/batch: a JSON array (or {"records": [...]}), or a binary matrix"""
+        timer = metrics.StageTimer(self.stage_latency)
+        deadline = self.deadline(headers, arrival) if self.admission else None
+        serving = self.holder.get()
+        cache = self.cache
+        response_type = wire_format.response_format(accept)
+        try:
+            if response_type == wire_format.ARROW_STREAM:
+                wire_format.require_pyarrow()
+            if wire_format.is_binary(mimetype):
+                features_matrix = wire_format.parse_features(mimetype, body)
+            else:
+                # Accept either a bare array or {"records": [...]}
+                features_matrix = None
+                data = get_json()
+                records = data.get('records') if isinstance(data, dict) else data
+                if not isinstance(records, list):
+                    raise ValueError('Expected a JSON array of patient records')
+        except Exception as e:
+            return self._done('predict_batch', 'error', timer, error_response(str(e)))
+
+        admission = self.admission if serving else None
+        if features_matrix is not None:
+            try:
+                payload = yield Score(self.score_binary_batch, (features_matrix, response_type, serving),
+                                      admission, deadline)
+            except Overloaded as e:
+                if not self.overload_fallback:
+                    return self.overloaded_response('predict_batch', e, timer)
+                self.shed.inc((e.reason, 'fallback'))
+                payload = yield Score(self.score_binary_batch, (features_matrix, response_type))
+            if response_type:
+                response = 200, payload[0], [('Content-Type', payload[1])]
+            else:
+                response = json_response(encode_results(payload['results']))
+            return self._done('predict_batch', 'ok', timer, response)
+
+        # Extract features per record so one bad record does not fail the batch
+        results = [None] * len(records)
+        rows = []
+        row_index = []
+        for i, record in enumerate(records):
+            try:
+                rows.append(extract_features(record))
+                row_index.append(i)
+            except Exception as e:
+                results[i] = {'error': str(e)}
+
+        if rows:
+            try:
+                # Serve repeated panels from the cache, then score the rest in one pass
+                use_cache = cache is not None and serving is not None
+                pending = []
+                for i, features in zip(row_index, rows):
+                    cached = cache.get(features, serving.generation) if use_cache else None
+                    if cached is None:
+                        pending.append((i, features))
+                    else:
+                        results[i] = cached
+                self.predictions.inc(('cache',), len(rows) - len(pending))
+
+                # One scaler transform and one forest pass over the whole matrix
+                if pending:
+                    model, scaler = (serving.model, serving.scaler) if serving else (None, None)
+                    try:
+                        scored = yield Score(score_rows, (model, scaler, [features for _, features in pending]),
+                                             admission, deadline)
+                        path = 'model' if serving else 'fallback'
+                    except Overloaded as e:
+                        if not self.overload_fallback:
+                            return self.overloaded_response('predict_batch', e, timer)
+                        self.shed.inc((e.reason, 'fallback'))
+                        scored = fallback_results([features for _, features in pending])
+                        path = 'fallback'
+                    for (i, features), result in zip(pending, scored):
+                        results[i] = result
+                        if use_cache and path == 'model':
+                            cache.put(features, serving.generation, result)
+                    self.predictions.inc((path,), len(pending))
+            except Exception as e:
+                for i in row_index:
+                    results[i] = {'error': str(e)}
+
+        for result in results:
+            if 'riskLevel' in result:
+                self.risk_levels.inc((result['riskLevel'],))
+            else:
+                self.predictions.inc(('error',))
+        if response_type:
+            response = encoded_response(response_type, results)
+        else:
+            response = json_response(encode_results(results))
+        return self._done('predict_batch', 'ok', timer, response)
+
+    def score_binary_batch(self, features_matrix, response_type, serving=None):
+        """Score the decoded matrix of a binary /predict/batch body in one pass
+
+        serving is the request's ServingModel, or None for the fallback rules. Returns
+        (body, content type) when a binary response was asked for, else the
+        {'results': [...]} payload. Binary batches skip the response cache: looking
+        rows up one at a time is the per-record Python work these bodies avoid.
+        """
+        scorer, scaler = (serving.model, serving.scaler) if serving else (None, None)
+        try:
+            if response_type:
+                predictions, probability, risk_levels, stages = score_columns(scorer, scaler, features_matrix)
+                payload = wire_format.encode_columns(response_type, predictions, probability, risk_levels, stages)
+                levels, counts = np.unique(risk_levels, return_counts=True)
+            else:
+                results = score_rows(scorer, scaler, features_matrix)
+                payload = {'results': results}
+                levels, counts = np.unique([result['riskLevel'] for result in results], return_counts=True)
+        except Exception as e:
+            results = [{'error': str(e)}] * len(features_matrix)
+            self.predictions.inc(('error',), len(results))
+            return wire_format.encode_results(response_type, results) if response_type else {'results': results}
+        self.predictions.inc(('model' if scorer else 'fallback',), len(features_matrix))
+        for level, count in zip(levels, counts):
+            self.risk_levels.inc((str(level),), int(count))
+        return payload
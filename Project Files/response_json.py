@@ -0,0 +1,101 @@
+"""
+Fast JSON encoding of prediction responses.
+Most of a /predict response is static: the recommendations depend only on the risk
+level, and each key factor's name and description only on its rule. Those parts are
+encoded once, at import, and a response is assembled by splicing the per-patient
+numbers between them. The output is byte for byte what jsonify writes outside debug
+mode (sorted keys, compact separators, ASCII-escaped strings).
+"""
+
+import json
+import math
+
+from rules import CLINICAL_RULES
+from scoring import RECOMMENDATIONS
+
+
+def dumps(obj):
+    """json.dumps with the settings of Flask's default JSON provider"""
+    return json.dumps(obj, ensure_ascii=True, sort_keys=True, separators=(',', ':')).encode('ascii')
+
+
+def _number(value):
+    # float.__repr__ / int.__repr__ are what json.dumps writes, also for NumPy scalars
+    if isinstance(value, float):
+        return float.__repr__(value).encode('ascii') if math.isfinite(value) else dumps(value)
+    if isinstance(value, int) and not isinstance(value, bool):
+        return int.__repr__(value).encode('ascii')
+    return dumps(value)
+
+
+# Pre-encoded fragments, by risk level and by key factor name
+_RECOMMENDATIONS = {level: dumps(recommendations) for level, recommendations in RECOMMENDATIONS.items()}
+_RISK_LEVELS = {level: dumps(level) for level in RECOMMENDATIONS}
+_FACTORS = {}
+for rule in CLINICAL_RULES:
+    if 'factor' in rule:
+        factor = rule['factor']
+        encoded = dumps({'description': factor['description'], 'factor': factor['factor'], 'impact': 0})
+        _FACTORS[factor['factor'], factor['description']] = encoded[:-len(b'0}')]
+_RESULT_KEYS = {'confidence', 'keyFactors', 'prediction', 'probability', 'recommendations', 'riskLevel', 'stage'}
+_FACTOR_KEYS = {'description', 'factor', 'impact'}
+
+
+def _key_factors(key_factors):
+    parts = []
+    for factor in key_factors:
+        prefix = _FACTORS.get((factor.get('factor'), factor.get('description')))
+        if prefix is None or factor.keys() != _FACTOR_KEYS:
+            return dumps(key_factors)
+        parts.append(prefix + _number(factor['impact']) + b'}')
+    return b'[' + b','.join(parts) + b']'
+
+
+def encode_result(result):
+    """JSON bytes of one response dict, as built by build_result or fallback_prediction"""
+    level = result.get('riskLevel')
+    recommendations = _RECOMMENDATIONS.get(level)
+    # Anything not shaped like a prediction (an error, a changed schema) is encoded in full
+    if (recommendations is None or result.keys() != _RESULT_KEYS
+            or result['recommendations'] is not RECOMMENDATIONS[level]):
+        return dumps(result)
+    confidence, probability = result['confidence'], result['probability']
+    encoded_confidence = _number(confidence)
+    # Model responses report the same number twice
+    encoded_probability = (encoded_confidence if probability == confidence and type(probability) is type(confidence)
+                           else _number(probability))
+    return b''.join((
+        b'{"confidence":', encoded_confidence,
+        b',"keyFactors":', _key_factors(result['keyFactors']),
+        b',"prediction":', _number(result['prediction']),
+        b',"probability":', encoded_probability,
+        b',"recommendations":', recommendations,
+        b',"riskLevel":', _RISK_LEVELS[level],
+        b',"stage":', _number(result['stage']),
+        b'}',
+    ))
+
+
+def encode_results(results):
+    """JSON bytes of a /predict/batch response"""
+    return b'{"results":[' + b','.join(encode_result(result) for result in results) + b']}'
+
+
+if __name__ == "__main__":
+    import timeit
+
+    import numpy as np
+
+    from scoring import build_result, fallback_prediction
+
+    # Compare with the generic encoder on a high-risk model response and a fallback one
+    features = [62, 1, 7.3, 4.1, 490, 60, 68, 7.0, 3.3, 0.89]
+    for label, result in [('model', build_result(np.array([1, 2]), np.array([0.08, 0.92]), features)),
+                          ('fallback', fallback_prediction(features))]:
+        body = encode_result(result)
+        assert body == dumps(result)
+        runs = 20000
+        timings = [('json.dumps', dumps), ('spliced', encode_result)]
+        timings = [(name, min(timeit.repeat(lambda: fn(result), number=runs, repeat=5)) / runs * 1e6)
+                   for name, fn in timings]
+        print(f"{label}: {len(body)} bytes, " + ', '.join(f"{name} {us:.2f} us" for name, us in timings))
@@ -0,0 +1,233 @@
+"""
+Clinical rules behind the fallback prediction and the key factors of a response.
+The rules are declared once in CLINICAL_RULES. evaluate_rules applies them to one
+feature vector in plain Python, for single requests; RuleEngine compiles them into
+NumPy mask and clip operations over an N x 10 feature matrix, for batches. Both
+perform the same float64 operations in the same order, so they give identical risk
+scores and factor impacts. key_factors, on the per-request path, is built from the
+table as one specialized closure per factor rule, skipping the risk-only rules.
+An impact that reaches its cap is reported as the cap itself, e.g. 25 rather than 25.0.
+"""
+
+import numpy as np
+
+# Feature vector positions, in the order of scoring.FEATURE_COLUMNS
+AGE, GENDER, TOTAL_BILIRUBIN, DIRECT_BILIRUBIN, ALKALINE_PHOSPHATASE, ALT, AST, \
+    TOTAL_PROTEINS, ALBUMIN, AG_RATIO = range(10)
+
+# How a rule turns the values that triggered it into a severity:
+#   'constant'  1
+#   'excess'    x / threshold - 1
+#   'ratio'     x / threshold
+#   'deficit'   (threshold - x) / threshold
+# A rule fires when any of its (feature, '>' or '<', threshold) conditions holds; its
+# severity is the largest over all of its conditions. The rule then adds
+# min(severity * weight, cap) to the fallback risk score and, if it has a key factor,
+# reports min(severity * weight, cap) of the factor's own scale as that factor's impact.
+CLINICAL_RULES = [
+    {'when': [(AGE, '>', 50)], 'severity': 'constant', 'risk': (0.15, 0.15)},
+    {'when': [(AGE, '>', 65)], 'severity': 'constant', 'risk': (0.1, 0.1)},
+    {'when': [(TOTAL_BILIRUBIN, '>', 1.2)], 'severity': 'excess', 'risk': (0.3, 0.25),
+     'factor': {'factor': 'Elevated Total Bilirubin', 'impact': (30, 25),
+                'description': 'Indicates potential liver dysfunction and bile processing issues'}},
+    {'when': [(ALT, '>', 56), (AST, '>', 40)], 'severity': 'ratio', 'risk': (0.2, 0.2),
+     'factor': {'factor': 'Elevated Liver Enzymes', 'impact': (20, 20),
+                'description': 'Suggests liver cell damage and inflammation'}},
+    {'when': [(ALBUMIN, '<', 3.5)], 'severity': 'deficit', 'risk': (0.25, 0.2),
+     'factor': {'factor': 'Low Albumin Levels', 'impact': (25, 20),
+                'description': 'Indicates reduced liver protein synthesis capacity'}},
+]
+
+# Key factors reported per response
+MAX_KEY_FACTORS = 3
+
+
+SEVERITY = {
+    'constant': lambda value, threshold: 1,
+    'excess': lambda value, threshold: value / threshold - 1,
+    'ratio': lambda value, threshold: value / threshold,
+    'deficit': lambda value, threshold: (threshold - value) / threshold,
+}
+
+
+def compile_scalar(rules):
+    """Rules as flat tuples, for evaluate_rules"""
+    compiled = []
+    for rule in rules:
+        factor = rule.get('factor')
+        compiled.append((
+            tuple((i, op == '>', t) for i, op, t in rule['when']),
+            SEVERITY[rule['severity']],
+            *rule['risk'],
+            factor and (factor['factor'], *factor['impact'], factor['description']),
+        ))
+    return compiled
+
+
+_SCALAR_RULES = compile_scalar(CLINICAL_RULES)
+
+
+def evaluate_rules(features, rules=None):
+    """Risk score (0-1 scale, before capping) and key factors of one feature vector"""
+    return _evaluate(features, compile_scalar(rules) if rules else _SCALAR_RULES)
+
+
+def _factor_check(rule):
+    """A closure giving one factor rule's key factor for a feature vector, or None
+
+    Rules with a single condition, the common case, get a closure with that
+    comparison written out; the rest loop over their conditions like _evaluate.
+    """
+    factor = rule['factor']
+    name, description = factor['factor'], factor['description']
+    weight, cap = factor['impact']
+    severity_of = SEVERITY[rule['severity']]
+    conditions = tuple((i, op == '>', t) for i, op, t in rule['when'])
+
+    if len(conditions) > 1:
+        first, rest = conditions[0], conditions[1:]
+
+        def check(features):
+            for i, above, t in conditions:
+                if (features[i] > t) if above else (features[i] < t):
+                    break
+            else:
+                return None
+            i, _, t = first
+            severity = severity_of(features[i], t)
+            for i, _, t in rest:
+                severity = max(severity, severity_of(features[i], t))
+            impact = severity * weight
+            return {'factor': name, 'impact': cap if impact >= cap else impact, 'description': description}
+        return check
+
+    ((i, above, t),) = conditions
+    if above:
+        def check(features):
+            x = features[i]
+            if x > t:
+                impact = severity_of(x, t) * weight
+                return {'factor': name, 'impact': cap if impact >= cap else impact, 'description': description}
+    else:
+        def check(features):
+            x = features[i]
+            if x < t:
+                impact = severity_of(x, t) * weight
+                return {'factor': name, 'impact': cap if impact >= cap else impact, 'description': description}
+    return check
+
+
+def compile_key_factors(rules):
+    """A function giving the key factors of one feature vector, built from the rules
+
+    It performs _evaluate's operations for the factor rules only, through one
+    closure per rule (see _factor_check).
+    """
+    checks = [_factor_check(rule) for rule in rules if 'factor' in rule]
+
+    def key_factors(features):
+        factors = []
+        for check in checks:
+            factor = check(features)
+            if factor is not None:
+                factors.append(factor)
+        return factors[:MAX_KEY_FACTORS]
+    return key_factors
+
+
+key_factors = compile_key_factors(CLINICAL_RULES)
+key_factors.__doc__ = "Key factors of one feature vector; skips the rules that only add to the risk score"
+
+
+def _evaluate(features, compiled):
+    risk_score = 0
+    factors = []
+    for conditions, severity_of, weight, cap, factor in compiled:
+        for i, above, t in conditions:
+            if (features[i] > t) if above else (features[i] < t):
+                break
+        else:
+            continue
+        i, _, t = conditions[0]
+        severity = severity_of(features[i], t)
+        for i, _, t in conditions[1:]:
+            severity = max(severity, severity_of(features[i], t))
+        risk_score += min(severity * weight, cap)
+        if factor:
+            name, weight, cap, description = factor
+            impact = severity * weight
+            factors.append({
+                'factor': name,
+                'impact': cap if impact >= cap else impact,
+                'description': description
+            })
+    return risk_score, factors[:MAX_KEY_FACTORS]
+
+
+class RuleEngine:
+    """CLINICAL_RULES compiled for feature matrices"""
+
+    def __init__(self, rules=CLINICAL_RULES):
+        self.rules = rules
+        self.factor_rules = [rule for rule in rules if 'factor' in rule]
+        # Per rule: feature columns, thresholds and comparison directions as arrays
+        self._compiled = [(np.array([i for i, _, _ in rule['when']]),
+                           np.array([t for _, _, t in rule['when']], dtype=np.float64),
+                           np.array([op == '>' for _, op, _ in rule['when']]))
+                          for rule in rules]
+
+    def _severities(self, features_matrix):
+        """(fired, severity) arrays of shape (N, rules)"""
+        n = len(features_matrix)
+        fired = np.zeros((n, len(self.rules)), dtype=bool)
+        severity = np.zeros((n, len(self.rules)))
+        for r, (rule, (columns, thresholds, above)) in enumerate(zip(self.rules, self._compiled)):
+            values = features_matrix[:, columns]
+            fired[:, r] = np.where(above, values > thresholds, values < thresholds).any(axis=1)
+            kind = rule['severity']
+            if kind == 'constant':
+                severity[:, r] = 1
+            elif kind == 'excess':
+                severity[:, r] = (values / thresholds - 1).max(axis=1)
+            elif kind == 'ratio':
+                severity[:, r] = (values / thresholds).max(axis=1)
+            else:
+                severity[:, r] = ((thresholds - values) / thresholds).max(axis=1)
+        return fired, severity
+
+    def evaluate(self, features_matrix):
+        """Risk scores (N,), and factor impacts (N, factor rules) with NaN where a factor did not fire"""
+        features_matrix = np.asarray(features_matrix, dtype=np.float64).reshape(-1, 10)
+        fired, severity = self._severities(features_matrix)
+
+        # Accumulate rule by rule, in the same order as evaluate_rules
+        risk_scores = np.zeros(len(features_matrix))
+        impacts = []
+        for r, rule in enumerate(self.rules):
+            weight, cap = rule['risk']
+            risk_scores += np.where(fired[:, r], np.minimum(severity[:, r] * weight, cap), 0)
+            if 'factor' in rule:
+                weight, cap = rule['factor']['impact']
+                impacts.append(np.where(fired[:, r], np.minimum(severity[:, r] * weight, cap), np.nan))
+        impacts = np.column_stack(impacts) if impacts else np.empty((len(features_matrix), 0))
+        return risk_scores, impacts
+
+    def key_factors(self, impacts):
+        """Per-row key factor lists, as generate_key_factors returns them, from evaluate's impacts"""
+        caps = [rule['factor']['impact'][1] for rule in self.factor_rules]
+        rows = []
+        for row in impacts.tolist():
+            # A capped impact is the cap itself, of the cap's type, as on the single-row path
+            factors = [{'factor': rule['factor']['factor'], 'impact': cap if impact == cap else impact,
+                        'description': rule['factor']['description']}
+                       for rule, cap, impact in zip(self.factor_rules, caps, row) if impact == impact]
+            rows.append(factors[:MAX_KEY_FACTORS])
+        return rows
+
+    def factor_names(self, impacts, separator='; '):
+        """Per-row key factor names joined into one string, e.g. for a CSV column"""
+        names = np.array([rule['factor']['factor'] for rule in self.factor_rules], dtype=object)
+        return np.array([separator.join(names[~np.isnan(row)][:MAX_KEY_FACTORS]) for row in impacts], dtype=object)
+
+
+default_engine = RuleEngine()
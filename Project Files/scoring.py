@@ -0,0 +1,253 @@
+"""
+Scoring logic shared by both Flask apps.
+Turns patient records into feature vectors, derives the prediction, risk level and
+stage from a single probability computation, and builds the API response. The
+rule-based fallback used when no trained model is available lives here as well; its
+clinical rules are declared in rules.py and score whole batches in one call.
+"""
+
+from bisect import bisect_right
+
+import numpy as np
+
+from rules import default_engine, evaluate_rules, key_factors as rule_key_factors
+
+RISK_LEVELS = [('Low', 1), ('Moderate', 2), ('High', 3), ('Critical', 4)]
+
+# Upper bounds of Low, Moderate and High on the model's max class probability (0-1)
+MODEL_RISK_CUTOFFS = (0.3, 0.6, 0.8)
+# Same bounds for the fallback rules, which score on a percentage scale
+FALLBACK_RISK_CUTOFFS = (25, 50, 75)
+
+
+BASE_RECOMMENDATIONS = [
+    'Regular monitoring of liver function tests',
+    'Maintain a healthy diet low in sodium and processed foods',
+    'Avoid alcohol consumption completely',
+    'Stay hydrated and maintain regular exercise'
+]
+
+RISK_SPECIFIC_RECOMMENDATIONS = {
+    'Low': [
+        'Continue current lifestyle and schedule annual check-ups',
+        'Consider hepatitis vaccination if not already vaccinated'
+    ],
+    'Moderate': [
+        'Schedule follow-up appointments every 6 months',
+        'Consider consultation with a hepatologist',
+        'Monitor for symptoms like fatigue, abdominal swelling, or jaundice'
+    ],
+    'High': [
+        'Immediate consultation with a liver specialist required',
+        'Consider advanced imaging studies (CT/MRI)',
+        'Discuss treatment options to slow disease progression'
+    ],
+    'Critical': [
+        'Urgent medical attention required',
+        'Immediate hospitalization may be necessary',
+        'Liver transplant evaluation should be considered'
+    ]
+}
+
+# Full recommendation list per risk level, built once
+RECOMMENDATIONS = {level: BASE_RECOMMENDATIONS + specific
+                   for level, specific in RISK_SPECIFIC_RECOMMENDATIONS.items()}
+
+
+# Dataset columns in the order of the model's feature vector
+FEATURE_COLUMNS = [
+    'Age', 'Gender', 'Total_Bilirubin', 'Direct_Bilirubin',
+    'Alkaline_Phosphatase', 'Alamine_Aminotransferase',
+    'Aspartate_Aminotransferase', 'Total_Proteins', 'Albumin',
+    'A/G_Ratio'
+]
+
+
+def extract_features(data):
+    """Map a JSON patient record onto the feature vector used by the model"""
+    return [
+        float(data.get('age', 0)),
+        1 if data.get('gender') == 'Male' else 0,  # Gender encoding
+        float(data.get('totalBilirubin', 0)),
+        float(data.get('directBilirubin', 0)),
+        float(data.get('alkalinePhosphatase', 0)),
+        float(data.get('alanineAminotransferase', 0)),
+        float(data.get('aspartateAminotransferase', 0)),
+        float(data.get('totalProteins', 0)),
+        float(data.get('albumin', 0)),
+        float(data.get('A/GRatio', 0)),
+       ]
+
+
+def features_from_frame(df):
+    """Feature matrix for a DataFrame in the dataset's column layout
+
+    Mirrors extract_features: Gender is 1 only for 'Male', and a missing value
+    counts as 0, just like a field left out of a JSON request.
+    """
+    features = df[FEATURE_COLUMNS].copy()
+    features['Gender'] = (features['Gender'] == 'Male').astype(np.float64)
+    return features.astype(np.float64).fillna(0).to_numpy()
+
+
+def assess_risk(value, cutoffs):
+    """Map a score onto (risk_level, stage) using ascending cutoffs"""
+    return RISK_LEVELS[bisect_right(cutoffs, value)]
+
+
+def predict_proba(model, scaler, features_matrix):
+    """The one model evaluation per request: normalize, then class probabilities"""
+    if scaler:
+        features_matrix = scaler.transform(features_matrix)
+    return model.predict_proba(features_matrix)
+
+
+def build_result(classes, probability, features, key_factors=None):
+    """Build the API response from one row of class probabilities
+
+    key_factors, if given, are the row's precomputed generate_key_factors result.
+    """
+    # The predicted class is the most probable one, exactly as model.predict would pick
+    best = int(np.argmax(probability))
+    max_prob = probability[best]
+    risk_level, stage = assess_risk(max_prob, MODEL_RISK_CUTOFFS)
+    
+    # Generate recommendations
+    recommendations = generate_recommendations(risk_level, features)
+    
+    # Generate key factors
+    if key_factors is None:
+        key_factors = generate_key_factors(features)
+    
+    return {
+        'prediction': int(classes[best]),
+        'probability': float(max_prob * 100),
+        'riskLevel': risk_level,
+        'stage': stage,
+        'confidence': float(max_prob * 100),
+        'recommendations': recommendations,
+        'keyFactors': key_factors
+    }
+
+
+def assess_batch(classes, probabilities):
+    """Vectorized build_result core: predictions, max probabilities, risk levels and stages"""
+    best = np.argmax(probabilities, axis=1)
+    max_prob = probabilities[np.arange(len(best)), best]
+    levels = np.searchsorted(MODEL_RISK_CUTOFFS, max_prob, side='right')
+    risk_levels = np.array([level for level, _ in RISK_LEVELS], dtype=object)[levels]
+    stages = np.array([stage for _, stage in RISK_LEVELS])[levels]
+    return np.asarray(classes)[best], max_prob, risk_levels, stages
+
+
+def score_rows(model, scaler, rows):
+    """Score a list of feature vectors with one model pass (or one rule-engine pass)"""
+    features_matrix = np.array(rows, dtype=np.float64)
+    if model is None:
+        return fallback_results(rows, features_matrix)
+    probabilities = predict_proba(model, scaler, features_matrix)
+    key_factors = default_engine.key_factors(default_engine.evaluate(features_matrix)[1])
+    return [build_result(model.classes_, probability, features, factors)
+            for features, probability, factors in zip(rows, probabilities, key_factors)]
+
+
+def score_columns(model, scaler, features_matrix):
+    """score_rows without building response dicts: predictions, probabilities (%), risk
+    levels and stages as arrays, for binary responses"""
+    if model is None:
+        return fallback_batch(features_matrix)[:4]
+    predictions, max_prob, risk_levels, stages = assess_batch(
+        model.classes_, predict_proba(model, scaler, features_matrix))
+    return predictions, max_prob * 100, risk_levels, stages
+
+
+def generate_recommendations(risk_level, features):
+    # The shared list for the risk level: response_json relies on it to use the
+    # pre-encoded bytes, so callers must not modify it
+    return RECOMMENDATIONS.get(risk_level, BASE_RECOMMENDATIONS)
+
+
+def generate_key_factors(features):
+    return rule_key_factors(features)  # Top 3 factors
+
+
+def fallback_prediction(features):
+    # Simple rule-based prediction as fallback
+    risk_score, key_factors = evaluate_rules(features)
+    
+    probability = risk_score * 100
+    if probability >= 95:
+        probability = 95
+    
+    risk_level, stage = assess_risk(probability, FALLBACK_RISK_CUTOFFS)
+    
+    return {
+        'prediction': 1 if probability > 50 else 0,
+        'probability': probability,
+        'riskLevel': risk_level,
+        'stage': stage,
+        'confidence': max(85 + np.random.random() * 10, 90),
+        'recommendations': generate_recommendations(risk_level, features),
+        'keyFactors': key_factors
+    }
+
+
+def fallback_batch(features_matrix):
+    """Vectorized fallback_prediction core: predictions, probabilities (%), risk levels, stages
+    and the rule engine's factor impacts"""
+    risk_scores, impacts = default_engine.evaluate(features_matrix)
+    probability = np.minimum(risk_scores * 100, 95)
+    levels = np.searchsorted(FALLBACK_RISK_CUTOFFS, probability, side='right')
+    risk_levels = np.array([level for level, _ in RISK_LEVELS], dtype=object)[levels]
+    stages = np.array([stage for _, stage in RISK_LEVELS])[levels]
+    return (probability > 50).astype(int), probability, risk_levels, stages, impacts
+
+
+def fallback_results(rows, features_matrix=None):
+    """fallback_prediction for many feature vectors, evaluating the rules once for all of them"""
+    if features_matrix is None:
+        features_matrix = np.array(rows, dtype=np.float64)
+    predictions, probability, risk_levels, stages, impacts = fallback_batch(features_matrix)
+    confidence = np.maximum(85 + np.random.random(len(rows)) * 10, 90)
+    return [{
+        'prediction': int(predictions[i]),
+        # 0 (no rule fired) and the 95 cap are ints on the single-row path too
+        'probability': int(probability[i]) if probability[i] in (0, 95) else float(probability[i]),
+        'riskLevel': risk_levels[i],
+        'stage': int(stages[i]),
+        'confidence': float(confidence[i]),
+        'recommendations': generate_recommendations(risk_levels[i], features),
+        'keyFactors': key_factors
+    } for i, (features, key_factors) in enumerate(zip(rows, default_engine.key_factors(impacts)))]
+
+
+if __name__ == "__main__":
+    # Per-request cost of the old two-call path against the single probability pass
+    import pickle
+    import timeit
+    import warnings
+    from forest_engine import CompiledForest
+    warnings.filterwarnings('ignore')
+
+    with open('rf_acc_68.pkl', 'rb') as f:
+        forest = pickle.load(f)
+    with open('normalizer.pkl', 'rb') as f:
+        scaler = pickle.load(f)
+    compiled = CompiledForest.from_sklearn(forest)
+
+    features = [45, 1, 1.2, 0.3, 120, 35, 28, 7.2, 4.1, 1.6]
+    row = scaler.transform(np.array(features).reshape(1, -1))
+
+    for label, clf in [('scikit-learn', forest), ('compiled', compiled)]:
+        def two_calls():
+            clf.predict(row)
+            return clf.predict_proba(row)
+
+        def one_call():
+            return build_result(clf.classes_, clf.predict_proba(row)[0], features)
+
+        runs = 50
+        before = min(timeit.repeat(two_calls, number=runs, repeat=3)) / runs
+        after = min(timeit.repeat(one_call, number=runs, repeat=3)) / runs
+        print(f"{label}: predict + predict_proba {before * 1000:.3f} ms, "
+              f"single pass {after * 1000:.3f} ms ({(1 - after / before) * 100:.0f}% saved)")
@@ -0,0 +1,117 @@
+"""
+Memory accounting for pre-forked serving workers.
+The fused model is memory-mapped read-only, so every process that maps
+rf_fused.forest shares the same physical pages through the page cache. With
+gunicorn's preload_app the master maps it once and forked workers inherit the
+mapping. worker_memory() reports what a process really costs: RSS counts shared
+pages in full, PSS splits them across the processes sharing them.
+"""
+
+import json
+import os
+
+
+def worker_memory():
+    """RSS, PSS and shared/private sizes in kB for the current process (Linux only)"""
+    usage = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    usage[parts[0].rstrip(':')] = int(parts[1])
+    except OSError:
+        return {}
+    return {
+        'rss_kb': usage.get('Rss', 0),
+        'pss_kb': usage.get('Pss', 0),
+        'shared_kb': usage.get('Shared_Clean', 0) + usage.get('Shared_Dirty', 0),
+        'private_kb': usage.get('Private_Clean', 0) + usage.get('Private_Dirty', 0),
+    }
+
+
+def mapping_memory(path):
+    """RSS, PSS and private sizes in kB of the current process's mappings of one file (Linux only)
+
+    Shows whether a memory-mapped model is shared: its pages should be counted
+    as shared clean, with no private copy in any worker.
+    """
+    target = os.path.realpath(path)
+    usage = {'rss_kb': 0, 'pss_kb': 0, 'private_kb': 0}
+    keys = {'Rss': 'rss_kb', 'Pss': 'pss_kb', 'Private_Clean': 'private_kb', 'Private_Dirty': 'private_kb'}
+    try:
+        with open('/proc/self/smaps') as f:
+            inside = False
+            for line in f:
+                parts = line.split()
+                if parts and '-' in parts[0] and ':' not in parts[0]:
+                    # Header line of the next mapping: address range, perms, offset, dev,
+                    # inode, path (which may contain spaces)
+                    fields = line.rstrip('\n').split(None, 5)
+                    inside = len(fields) == 6 and fields[5] == target
+                elif inside and len(parts) == 3 and parts[2] == 'kB' and parts[0].rstrip(':') in keys:
+                    usage[keys[parts[0].rstrip(':')]] += int(parts[1])
+    except OSError:
+        return {}
+    return usage
+
+
+def format_memory(usage):
+    if not usage:
+        return 'memory usage unavailable on this platform'
+    return ', '.join(f"{key[:-3].upper()} {value / 1024:.1f} MB" for key, value in usage.items())
+
+
+def _fork_workers(n_workers, load_in_worker, score, report=worker_memory):
+    """Fork workers like gunicorn does and collect each worker's memory usage"""
+    readers = []
+    for _ in range(n_workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            model = load_in_worker()
+            score(model)
+            os.write(write_fd, json.dumps(report()).encode())
+            os._exit(0)
+        os.close(write_fd)
+        readers.append((pid, read_fd))
+
+    results = []
+    for pid, read_fd in readers:
+        with os.fdopen(read_fd) as f:
+            results.append(json.loads(f.read()))
+        os.waitpid(pid, 0)
+    return results
+
+
+if __name__ == "__main__":
+    # Per-worker memory: every worker unpickling its own forest, against
+    # workers scoring from the model mapped once before forking
+    import pickle
+    import warnings
+    import numpy as np
+    from forest_engine import CompiledForest
+    from model_format import load_fused_model
+    warnings.filterwarnings('ignore')
+
+    n_workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+    rows = np.tile([[45, 1, 1.2, 0.3, 120, 35, 28, 7.2, 4.1, 1.6]], (100, 1))
+
+    def load_pickled():
+        with open('rf_acc_68.pkl', 'rb') as f:
+            return CompiledForest.from_sklearn(pickle.load(f))
+
+    # Import scikit-learn in the parent too so both runs share its code pages
+    import sklearn.ensemble  # noqa: F401
+
+    mapped = load_fused_model()
+    runs = [
+        ('per-worker pickle', _fork_workers(n_workers, load_pickled, lambda m: m.predict_proba(rows))),
+        ('preloaded mmap', _fork_workers(n_workers, lambda: mapped, lambda m: m.predict_proba(rows))),
+    ]
+    for label, usages in runs:
+        for i, usage in enumerate(usages):
+            print(f"{label}, worker {i}: {format_memory(usage)}")
+        total_pss = sum(usage.get('pss_kb', 0) for usage in usages)
+        print(f"{label}: total PSS across {n_workers} workers {total_pss / 1024:.1f} MB")
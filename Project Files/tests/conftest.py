@@ -0,0 +1,15 @@
+"""
+Shared setup for the test suite: run from the project root, where the model
+artifacts and Front end/Data live, with the serving modules and the training
+modules importable.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Back End', 'Training'))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+DATA_PATH = os.path.join('Front end', 'Data', 'liver.csv')
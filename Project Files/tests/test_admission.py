@@ -0,0 +1,127 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+import metrics
+from admission import AdmissionController, Overloaded, request_deadline
+from prediction_service import PredictionService, run
+
+SAMPLE_REQUEST = {'age': 45, 'gender': 'Male', 'totalBilirubin': 1.2, 'albumin': 4.1}
+
+
+def held(max_queue=1):
+    """A controller with its one slot taken"""
+    admission = AdmissionController(1, max_queue=max_queue)
+    admission.acquire(time.monotonic() + 60)
+    return admission
+
+
+def test_client_timeout_shortens_the_deadline_but_never_extends_it():
+    assert request_deadline({'X-Request-Timeout-Ms': '250'}, 1.0, now=100.0) == 100.25
+    assert request_deadline({'X-Request-Timeout-Ms': '5000'}, 1.0, now=100.0) == 101.0
+    assert request_deadline({'X-Request-Timeout-Ms': '-5'}, 1.0, now=100.0) == 100.0
+    assert request_deadline({'X-Request-Timeout-Ms': 'soon'}, 1.0, now=100.0) == 101.0
+
+
+def test_proxy_start_counts_time_queued_before_the_server():
+    now = time.monotonic()
+    start_ms = f"t={(time.time() - 0.4) * 1000:.0f}"
+    assert request_deadline({'X-Request-Start': start_ms}, 1.0, now=now) == pytest.approx(now + 0.6, abs=0.01)
+
+
+def test_expired_client_timeout_is_shed_even_with_free_slots():
+    admission = AdmissionController(4)
+    with pytest.raises(Overloaded) as shed:
+        admission.acquire(request_deadline({'X-Request-Timeout-Ms': '0'}, 1.0))
+    assert shed.value.reason == 'deadline'
+    assert admission.stats()['shed'] == {'queue_full': 0, 'deadline': 1}
+    assert admission.stats()['active'] == 0
+
+
+def test_queued_request_is_shed_when_its_client_timeout_passes():
+    admission = held()
+    deadline = request_deadline({'X-Request-Timeout-Ms': '50'}, 1.0)
+    with pytest.raises(Overloaded, match='deadline'):
+        admission.acquire(deadline)
+    assert time.monotonic() >= deadline
+    assert admission.stats()['queue_depth'] == 0
+    assert admission.stats()['shed']['deadline'] == 1
+
+
+def test_service_answers_an_expired_request_with_503():
+    import app
+    registry = metrics.Registry()
+    service = PredictionService(app.holder, registry, admission=AdmissionController(4), retry_after=3)
+    handler = service.predict('application/json', None, lambda: SAMPLE_REQUEST, None, {'X-Request-Timeout-Ms': '0'})
+    status, body, headers = run(handler)
+    assert status == 503
+    assert 'deadline' in json.loads(body)['error']
+    assert ('Retry-After', '3') in headers
+    assert 'liver_requests_shed_total{reason="deadline",action="rejected"} 1' in registry.render()
+
+
+def test_waiters_are_admitted_in_arrival_order():
+    admission = held(max_queue=3)
+    order = []
+
+    def wait(name):
+        admission.acquire(time.monotonic() + 5)
+        order.append(name)
+        admission.release()
+
+    threads = []
+    for name in 'abc':
+        threads.append(threading.Thread(target=wait, args=(name,)))
+        threads[-1].start()
+        while admission.queue_depth < len(threads):
+            time.sleep(0.001)
+    with pytest.raises(Overloaded, match='queue full'):
+        admission.acquire(time.monotonic() + 5)
+    admission.release()
+    for thread in threads:
+        thread.join()
+    assert order == ['a', 'b', 'c']
+    assert admission.stats()['active'] == 0
+
+
+def test_async_acquire_is_handed_the_slot_released_by_a_thread():
+    admission = held()
+
+    async def main():
+        waiting = asyncio.ensure_future(admission.acquire_async(time.monotonic() + 5))
+        while admission.queue_depth == 0:
+            await asyncio.sleep(0.001)
+        threading.Thread(target=admission.release).start()
+        await waiting
+
+    asyncio.run(main())
+    assert admission.stats()['active'] == 1
+    assert admission.stats()['admitted'] == 2
+
+
+def test_async_acquire_is_shed_at_its_deadline():
+    admission = held()
+    with pytest.raises(Overloaded, match='deadline'):
+        asyncio.run(admission.acquire_async(time.monotonic() + 0.05))
+    assert admission.stats()['queue_depth'] == 0
+    assert admission.stats()['shed']['deadline'] == 1
+
+
+def test_cancelled_async_waiter_leaves_the_queue_without_taking_the_slot():
+    admission = held()
+
+    async def main():
+        waiting = asyncio.ensure_future(admission.acquire_async(time.monotonic() + 5))
+        while admission.queue_depth == 0:
+            await asyncio.sleep(0.001)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+    asyncio.run(main())
+    assert admission.stats()['queue_depth'] == 0
+    admission.release()
+    assert admission.stats()['active'] == 0
@@ -0,0 +1,41 @@
+import threading
+
+import numpy as np
+
+from batching import MicroBatcher
+
+
+def row_sums(matrix):
+    return matrix.sum(axis=1)
+
+
+def test_rows_queued_before_close_are_scored_and_worker_exits():
+    batcher = MicroBatcher(row_sums, max_wait_ms=5, max_batch_size=8)
+    futures = [batcher.submit([i, 1]) for i in range(20)]
+    worker = batcher._worker
+    batcher.close()
+    assert [future.result(timeout=2) for future in futures] == [i + 1 for i in range(20)]
+    worker.join(timeout=2)
+    assert not worker.is_alive()
+
+
+def test_rows_after_close_are_scored_inline_without_a_worker():
+    batcher = MicroBatcher(row_sums, max_wait_ms=1)
+    batcher.score([1, 1])
+    worker = batcher._worker
+    batcher.close()
+    worker.join(timeout=2)
+
+    seen = []
+    batcher.score_fn = lambda matrix: seen.append(threading.current_thread()) or row_sums(matrix)
+    assert batcher.score([2, 3]) == 5
+    assert seen == [threading.current_thread()]
+    assert batcher._worker is worker and not worker.is_alive()
+    assert batcher.stats()['rows'] == 2
+
+
+def test_concurrent_rows_are_batched():
+    batcher = MicroBatcher(row_sums, max_wait_ms=50, max_batch_size=64)
+    futures = [batcher.submit(np.array([i, i])) for i in range(32)]
+    assert [future.result(timeout=2) for future in futures] == [2 * i for i in range(32)]
+    assert batcher.stats()['batches'] < 32
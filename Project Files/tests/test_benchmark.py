@@ -0,0 +1,30 @@
+import json
+
+import benchmark
+
+
+def timing(min_ms):
+    return {'median_ms': min_ms, 'min_ms': min_ms, 'mean_ms': min_ms, 'number': 1, 'repeat': 1}
+
+
+def test_every_registered_stage_has_a_baseline():
+    with open(benchmark.BASELINE_PATH) as f:
+        baseline = json.load(f)['results']
+    names = [entry['name'] for entry in benchmark._registry]
+    assert set(names) - set(baseline) == set()
+    # Stored in registration order, so a re-record gives a readable diff
+    assert list(baseline) == [name for name in names if name in baseline]
+
+
+def test_compare_reports_regressions_and_missing_stages():
+    baseline = {'results': {'serving.a': timing(1.0), 'serving.b': timing(1.0)}}
+    current = {'results': {'serving.a': timing(1.1), 'serving.b': timing(2.0), 'serving.c': timing(1.0)}}
+    assert benchmark.compare(current, baseline, 0.25) == (['serving.b'], ['serving.c'])
+
+
+def test_merge_baseline_keeps_unmeasured_stages_in_registry_order():
+    first, second = (entry['name'] for entry in benchmark._registry[:2])
+    previous = {'results': {second: timing(2.0)}}
+    merged = benchmark.merge_baseline({'timestamp': 'now', 'results': {first: timing(1.0)}}, previous)
+    assert merged['timestamp'] == 'now'
+    assert list(merged['results']) == [first, second]
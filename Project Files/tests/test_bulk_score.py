@@ -0,0 +1,36 @@
+import pandas as pd
+import pytest
+
+from bulk_score import score_file
+from conftest import DATA_PATH
+
+BAD_ROW = 300
+
+
+@pytest.mark.parametrize('bad_value', ['abc', 'inf'])
+def test_bad_row_is_rejected_and_the_rest_is_scored(tmp_path, bad_value):
+    source = pd.read_csv(DATA_PATH)
+    bad = source.astype({'Total_Bilirubin': object})
+    bad.loc[BAD_ROW, 'Total_Bilirubin'] = bad_value
+    bad.to_csv(tmp_path / 'bad.csv', index=False)
+    source.drop(index=BAD_ROW).to_csv(tmp_path / 'clean.csv', index=False)
+
+    rows, rejected, _ = score_file(str(tmp_path / 'bad.csv'), str(tmp_path / 'bad_scored.csv'),
+                                   chunksize=100, workers=1)
+    assert (rows, rejected) == (len(source) - 1, 1)
+    errors = pd.read_csv(tmp_path / 'bad_scored.rejected.csv')
+    assert errors['row'].tolist() == [BAD_ROW]
+    assert 'Total_Bilirubin' in errors['error'][0]
+    assert errors['Age'][0] == source['Age'][BAD_ROW]
+
+    score_file(str(tmp_path / 'clean.csv'), str(tmp_path / 'clean_scored.csv'), chunksize=100, workers=1)
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / 'bad_scored.csv'),
+                                  pd.read_csv(tmp_path / 'clean_scored.csv'))
+
+
+def test_no_rejected_file_without_bad_rows(tmp_path):
+    output = tmp_path / 'scored.csv'
+    (tmp_path / 'scored.rejected.csv').write_text('left by an earlier run\n')
+    rows, rejected, _ = score_file(DATA_PATH, str(output), chunksize=200, workers=1, use_rules=True)
+    assert (rows, rejected) == (len(pd.read_csv(DATA_PATH)), 0)
+    assert not (tmp_path / 'scored.rejected.csv').exists()
@@ -0,0 +1,87 @@
+import inspect
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import LabelEncoder
+
+import dataset
+import model_training
+from conftest import DATA_PATH
+from dataset import CACHE_ENV, FEATURE_COLUMNS, as_float64, load_dataset, read_cache
+from model_training import LiverCirrhosisModelTrainer
+from pipeline_cache import PipelineCache
+
+
+def float64_features():
+    # The CSV as pandas reads it with no dtypes, i.e. float64 lab values
+    df = pd.read_csv(DATA_PATH).dropna()
+    df['Gender'] = LabelEncoder().fit_transform(df['Gender'])
+    return df[FEATURE_COLUMNS].astype(np.float64), df['Dataset']
+
+
+def test_as_float64_gives_back_the_csv_values():
+    values = np.array([0.4, 1.6, 0.89, 7.3, 490.0, 1.2345e-7, np.nan])
+    assert np.array_equal(as_float64(values.astype(np.float32)), values, equal_nan=True)
+
+
+def test_trainer_fits_on_the_same_values_as_a_float64_read(tmp_path, monkeypatch):
+    monkeypatch.setenv(CACHE_ENV, str(tmp_path))
+    trainer = LiverCirrhosisModelTrainer(data_path=DATA_PATH)
+    trainer.load_and_preprocess_data()
+    X, y = float64_features()
+    X_train = X.loc[trainer.X_train.index]
+    assert (trainer.X_train.dtypes == np.float64).all()
+    assert np.array_equal(trainer.X_train.to_numpy(), X_train.to_numpy())
+
+    # So the fitted model and its predictions are those of the float64 pipeline
+    X_test = X.loc[trainer.X_test.index]
+    fitted = [RandomForestClassifier(n_estimators=20, random_state=0).fit(features, y.loc[features.index])
+              for features in (trainer.X_train, X_train)]
+    assert np.array_equal(fitted[0].predict_proba(trainer.X_test), fitted[1].predict_proba(X_test))
+
+
+def test_column_cache_is_kept_out_of_the_data_directory(tmp_path, monkeypatch):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    path = str(data_dir / 'liver.csv')
+    shutil.copy(DATA_PATH, path)
+
+    cache_dir = tmp_path / 'cache'
+    first = load_dataset(path, cache_dir=str(cache_dir))
+    assert os.listdir(data_dir) == ['liver.csv']
+    assert len(os.listdir(cache_dir)) == 1
+    cached = load_dataset(path, cache_dir=str(cache_dir))
+    assert isinstance(cached['Age'].to_numpy().base, np.memmap)
+    pd.testing.assert_frame_equal(cached, first)
+
+    monkeypatch.setenv(CACHE_ENV, str(tmp_path / 'from-env'))
+    load_dataset(path)
+    assert os.listdir(data_dir) == ['liver.csv']
+    assert len(os.listdir(tmp_path / 'from-env')) == 1
+
+
+def test_cache_from_another_version_is_rebuilt(tmp_path, monkeypatch):
+    load_dataset(DATA_PATH, cache_dir=str(tmp_path))
+    assert read_cache(DATA_PATH, str(tmp_path)) is not None
+    monkeypatch.setattr(dataset, 'CACHE_VERSION', dataset.CACHE_VERSION + 1)
+    assert read_cache(DATA_PATH, str(tmp_path)) is None
+
+
+def test_preprocess_key_covers_the_loader(monkeypatch):
+    trainer = LiverCirrhosisModelTrainer(data_path=DATA_PATH)
+    cache = PipelineCache(enabled=False)
+    key = cache.key('preprocess', trainer._preprocess_inputs())
+    assert trainer._preprocess_inputs()['loader_code'] == inspect.getsource(dataset)
+
+    monkeypatch.setattr(model_training, 'CACHE_VERSION', dataset.CACHE_VERSION + 1)
+    assert cache.key('preprocess', trainer._preprocess_inputs()) != key
+    monkeypatch.undo()
+
+    # An edit to dataset.py, such as a dtype change, gives a new key as well
+    source = inspect.getsource(dataset)
+    monkeypatch.setattr(inspect, 'getsource', lambda obj: source.replace("'float32'", "'float64'")
+                        if obj is dataset else source)
+    assert cache.key('preprocess', trainer._preprocess_inputs()) != key
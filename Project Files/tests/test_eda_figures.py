@@ -0,0 +1,34 @@
+import os
+import shutil
+
+import numpy as np
+
+import eda_figures
+from conftest import DATA_PATH
+from dataset import CACHE_ENV, load_dataset
+from eda_figures import render_figures
+from eda_stats import compute_statistics
+
+
+def test_workers_memory_map_the_dataset_instead_of_unpickling_it(tmp_path, monkeypatch):
+    monkeypatch.setenv(CACHE_ENV, str(tmp_path / 'cache'))
+    path = str(tmp_path / 'liver.csv')
+    shutil.copy(DATA_PATH, path)
+    df = load_dataset(path)
+    report = compute_statistics(df)
+
+    monkeypatch.setattr(eda_figures, '_worker_state', {})
+    eda_figures._init_worker(None, report, None, str(tmp_path), ('png',), path)
+    worker_df = eda_figures._worker_state['df']
+    assert isinstance(worker_df['Age'].to_numpy().base, np.memmap)
+    assert worker_df.equals(df)
+
+
+def test_pool_renders_from_the_data_path(tmp_path, monkeypatch):
+    monkeypatch.setenv(CACHE_ENV, str(tmp_path / 'cache'))
+    df = load_dataset(DATA_PATH)
+    names = ['target_distribution', 'box_plots']
+    files = render_figures(df, compute_statistics(df), names, str(tmp_path / 'figures'),
+                           n_jobs=2, data_path=DATA_PATH)
+    assert sorted(files) == sorted(names)
+    assert all(os.path.getsize(paths[0]) > 0 for paths in files.values())
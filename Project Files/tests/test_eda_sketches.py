@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from conftest import DATA_PATH
+from dataset import read_csv
+from eda_sketches import KLLSketch, StreamingEDA, summarize_csv
+
+# The documented bounds: KLL rank error at k=200, and twice that for counts read
+# off the sketch's CDF (a difference of two CDF values)
+RANK_ERROR = 0.0165
+CDF_COUNT_ERROR = 2 * RANK_ERROR
+
+
+def synthetic_labs(n_rows, seed=0):
+    """A lab archive with skewed values, gaps and both classes"""
+    rng = np.random.default_rng(seed)
+    target = rng.integers(1, 3, n_rows)
+    frame = pd.DataFrame({
+        'Age': rng.integers(4, 90, n_rows).astype(float),
+        'Total_Bilirubin': np.round(rng.lognormal(0.2 + 0.6 * (target == 1), 0.9, n_rows), 1),
+        'Alkaline_Phosphatase': np.round(rng.lognormal(5.4, 0.5, n_rows)),
+        'Albumin': np.round(rng.normal(3.2, 0.8, n_rows), 1),
+        'Dataset': target,
+    })
+    frame['Direct_Bilirubin'] = np.round(frame['Total_Bilirubin'] * rng.uniform(0.2, 0.6, n_rows), 1)
+    frame.loc[rng.random(n_rows) < 0.01, 'Albumin'] = np.nan
+    return frame
+
+
+def sketch_in_chunks(frame, chunksize, parts=1):
+    """Sketch the frame in `parts` independent sketches of chunks, then merge them"""
+    sketches = [StreamingEDA() for _ in range(parts)]
+    for i, start in enumerate(range(0, len(frame), chunksize)):
+        sketches[i % parts].update(frame.iloc[start:start + chunksize])
+    merged = sketches[0]
+    for sketch in sketches[1:]:
+        merged.merge(sketch)
+    return merged
+
+
+@pytest.fixture(scope='module')
+def archive():
+    return synthetic_labs(200_000)
+
+
+@pytest.mark.parametrize('parts', [1, 3])
+def test_quantile_rank_error_within_bound(archive, parts):
+    report = sketch_in_chunks(archive, 25_000, parts).report()
+    for column in ['Age', 'Total_Bilirubin', 'Alkaline_Phosphatase', 'Albumin']:
+        values = np.sort(archive[column].dropna().to_numpy())
+        for label, q in [('25%', 0.25), ('50%', 0.5), ('75%', 0.75)]:
+            estimate = report.describe.loc[label, column]
+            # The true ranks the estimate can stand for, ties included
+            low = np.searchsorted(values, estimate, side='left') / len(values)
+            high = np.searchsorted(values, estimate, side='right') / len(values)
+            error = 0.0 if low <= q <= high else min(abs(low - q), abs(high - q))
+            assert error <= RANK_ERROR, (column, label, error)
+
+
+def test_kll_rank_error_on_distinct_values():
+    rng = np.random.default_rng(1)
+    values = rng.lognormal(0, 1, 300_000)
+    sketch = KLLSketch(seed=7)
+    for chunk in np.array_split(values, 30):
+        sketch.update(chunk)
+    qs = np.linspace(0.01, 0.99, 99)
+    ranks = np.searchsorted(np.sort(values), sketch.quantiles(qs)) / len(values)
+    assert np.abs(ranks - qs).max() <= RANK_ERROR
+    # Memory grows with log(n), not n
+    assert sum(len(level) for level in sketch.levels) < 2_000
+
+
+def test_outlier_counts_within_bound(archive):
+    report = sketch_in_chunks(archive, 25_000, parts=2).report()
+    for column, row in report.outliers.iterrows():
+        values = archive[column].dropna()
+        exact = int(((values < row['lower_bound']) | (values > row['upper_bound'])).sum())
+        assert abs(row['outliers'] - exact) <= CDF_COUNT_ERROR * len(values), column
+
+
+def test_moments_and_correlation_are_exact(archive):
+    report = sketch_in_chunks(archive, 30_000, parts=3).report()
+    expected = archive.describe()
+    for label in ['count', 'mean', 'std', 'min', 'max']:
+        np.testing.assert_allclose(report.describe.loc[label, expected.columns], expected.loc[label], rtol=1e-8)
+    corr = archive.corr()
+    np.testing.assert_allclose(report.correlation.loc[corr.index, corr.columns], corr, rtol=1e-8, atol=1e-12)
+
+
+def test_mann_whitney_u_within_reported_bound(archive):
+    tests = sketch_in_chunks(archive, 50_000).report().class_tests
+    for column, row in tests.iterrows():
+        values = archive[[column, 'Dataset']].dropna()
+        first = values.loc[values['Dataset'] == 1, column]
+        second = values.loc[values['Dataset'] == 2, column]
+        exact = stats.mannwhitneyu(first, second).statistic
+        assert abs(row['statistic'] - exact) <= row['u_error_bound'] + 1e-6 * exact, column
+
+
+def test_bundled_dataset_matches_pandas():
+    # Read with the same compact dtypes the chunked reader uses
+    df = read_csv(DATA_PATH)
+    report = summarize_csv(DATA_PATH, chunksize=100).report()
+    assert report.shape == df.shape
+    assert report.missing.to_dict() == df.isnull().sum().to_dict()
+    # The sketches accumulate in float64 whatever the column dtype
+    expected = df.select_dtypes('number').astype('float64').describe()
+    for label in ['count', 'mean', 'std', 'min', 'max']:
+        np.testing.assert_allclose(report.describe.loc[label, expected.columns], expected.loc[label], rtol=1e-8)
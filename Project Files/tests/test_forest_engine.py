@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from conftest import DATA_PATH
+from forest_engine import LEAF, CompiledForest
+
+
+@pytest.fixture(scope='module')
+def fitted():
+    df = pd.read_csv(DATA_PATH).dropna()
+    df['Gender'] = (df['Gender'] == 'Male').astype(int)
+    X = df.drop('Dataset', axis=1).values
+    forest = RandomForestClassifier(n_estimators=25, random_state=0).fit(X, df['Dataset'].values)
+    return forest, CompiledForest.from_sklearn(forest), X
+
+
+def test_matches_scikit_learn(fitted):
+    forest, compiled, X = fitted
+    assert np.array_equal(compiled.predict_proba(X), forest.predict_proba(X))
+    assert np.array_equal(compiled.predict(X), forest.predict(X))
+    assert compiled.n_features_in_ == forest.n_features_in_
+
+
+@pytest.mark.parametrize('bad', [np.nan, np.inf, -np.inf])
+def test_rejects_non_finite_values(fitted, bad):
+    _, compiled, X = fitted
+    row = X[:1].astype(np.float64)
+    row[0, 2] = bad
+    with pytest.raises(ValueError, match='NaN or infinity'):
+        compiled.predict_proba(row)
+    with pytest.raises(ValueError, match='NaN or infinity'):
+        compiled.apply(row)
+
+
+@pytest.mark.parametrize('columns', [9, 11, 20])
+def test_rejects_wrong_column_count(fitted, columns):
+    _, compiled, _ = fitted
+    with pytest.raises(ValueError, match='features'):
+        compiled.predict_proba(np.ones((2, columns)))
+
+
+def test_rejects_three_dimensional_input(fitted):
+    _, compiled, X = fitted
+    with pytest.raises(ValueError, match='2D'):
+        compiled.predict_proba(X[:4].reshape(2, 2, -1))
+
+
+def test_predict_rejects_non_finite_lab_values():
+    import app
+    client = app.app.test_client()
+    body = ('{"age": NaN, "gender": "Male", "totalBilirubin": Infinity, "directBilirubin": 0.3, '
+            '"alkalinePhosphatase": 120, "alanineAminotransferase": 35, "aspartateAminotransferase": 28, '
+            '"totalProteins": 7.2, "albumin": 4.1, "A/GRatio": 1.6}')
+    response = client.post('/predict', data=body, content_type='application/json')
+    assert response.status_code == 400
+    row = np.array([[45, 1, np.nan, 0.3, 120, 35, 28, 7.2, 4.1, 1.6]], dtype='<f4')
+    response = client.post('/predict', data=row.tobytes(), content_type='application/x-float32-matrix')
+    assert response.status_code == 400
+
+
+@pytest.fixture(scope='module')
+def fused():
+    df = pd.read_csv(DATA_PATH).dropna()
+    df['Gender'] = (df['Gender'] == 'Male').astype(int)
+    X = df.drop('Dataset', axis=1).values.astype(np.float64)
+    scaler = StandardScaler().fit(X)
+    forest = RandomForestClassifier(n_estimators=25, random_state=0).fit(scaler.transform(X), df['Dataset'].values)
+    compiled = CompiledForest.from_sklearn(forest)
+    return scaler, forest, compiled.fold_scaler(scaler.mean_, scaler.scale_), X
+
+
+def test_fused_forest_matches_scaler_then_forest(fused):
+    scaler, forest, folded, X = fused
+    assert np.array_equal(folded.predict_proba(X), forest.predict_proba(scaler.transform(X)))
+
+
+def test_fused_forest_matches_at_the_folded_thresholds(fused):
+    scaler, forest, folded, X = fused
+    internal = np.flatnonzero(folded.left != LEAF)
+    internal = internal[np.isfinite(folded.threshold[internal])]
+    features = folded.feature[internal]
+    thresholds = folded.threshold[internal]
+
+    # Each folded threshold and its float64 neighbours, set into a real row
+    rows = np.repeat(X[:1], 3 * len(internal), axis=0)
+    values = np.concatenate([thresholds, np.nextafter(thresholds, -np.inf), np.nextafter(thresholds, np.inf)])
+    rows[np.arange(len(rows)), np.tile(features, 3)] = values
+    assert np.array_equal(folded.predict_proba(rows), forest.predict_proba(scaler.transform(rows)))
@@ -0,0 +1,82 @@
+import metrics
+from metrics import Registry
+
+
+def test_counter_series_are_labelled_and_sorted():
+    registry = Registry()
+    requests = registry.counter('requests_total', 'Requests', ('endpoint', 'outcome'))
+    requests.inc(('predict', 'ok'))
+    requests.inc(('predict', 'ok'), amount=2)
+    requests.inc(('batch', 'error'))
+    assert registry.render() == (
+        '# HELP requests_total Requests\n'
+        '# TYPE requests_total counter\n'
+        'requests_total{endpoint="batch",outcome="error"} 1\n'
+        'requests_total{endpoint="predict",outcome="ok"} 3\n'
+    )
+
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    registry.counter('errors_total', 'Errors', ('message',)).inc(('bad "value" \\ here\nnext',))
+    assert 'errors_total{message="bad \\"value\\" \\\\ here\\nnext"} 1' in registry.render()
+
+
+def test_gauge_without_labels_and_from_a_callback():
+    registry = Registry()
+    depth = registry.gauge('queue_depth', 'Queued requests')
+    depth.inc(amount=3)
+    depth.dec()
+    registry.gauge('cache_entries', 'Entries by kind', ('kind',), fn=lambda: {('hit',): 0.5, ('miss',): 2})
+    registry.gauge('generation', 'Model generation', fn=lambda: 4)
+    lines = registry.render().splitlines()
+    assert 'queue_depth 2' in lines
+    assert '# TYPE queue_depth gauge' in lines
+    assert 'cache_entries{kind="hit"} 0.5' in lines
+    assert 'cache_entries{kind="miss"} 2' in lines
+    assert 'generation 4' in lines
+
+
+def test_histogram_buckets_are_cumulative_with_sum_and_count():
+    registry = Registry()
+    latency = registry.histogram('latency_seconds', 'Latency', ('stage',), buckets=(0.01, 0.1))
+    for value in (0.005, 0.01, 0.05, 2.0):
+        latency.observe(value, ('model',))
+    assert registry.render().splitlines()[2:] == [
+        'latency_seconds_bucket{stage="model",le="0.01"} 2',
+        'latency_seconds_bucket{stage="model",le="0.1"} 3',
+        'latency_seconds_bucket{stage="model",le="+Inf"} 4',
+        'latency_seconds_sum{stage="model"} 2.065',
+        'latency_seconds_count{stage="model"} 4',
+    ]
+
+
+def test_stage_timer_records_one_sample_per_stage():
+    registry = Registry()
+    timer = metrics.StageTimer(registry.histogram('stage_seconds', 'Stages', ('stage',)))
+    timer.lap('parse')
+    timer.lap('model')
+    timer.lap('model')
+    output = registry.render()
+    assert 'stage_seconds_count{stage="parse"} 1' in output
+    assert 'stage_seconds_count{stage="model"} 2' in output
+
+
+def test_metrics_endpoint_reports_requests_by_endpoint_and_outcome():
+    import app
+    client = app.app.test_client()
+    before = client.get('/metrics').get_data(as_text=True)
+    client.post('/predict', data=b'{not json', content_type='application/json')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type == metrics.CONTENT_TYPE
+
+    def count(text, series):
+        for line in text.splitlines():
+            if line.startswith(series + ' '):
+                return float(line.split()[1])
+        return 0.0
+
+    series = 'liver_requests_total{endpoint="predict",outcome="error"}'
+    assert count(response.get_data(as_text=True), series) == count(before, series) + 1
+    assert 'liver_request_duration_seconds_bucket{endpoint="predict",le="+Inf"}' in response.get_data(as_text=True)
@@ -0,0 +1,28 @@
+import numpy as np
+
+from model_format import FUSED_MODEL_PATH, load_forest, save_forest
+
+
+def test_arrays_are_zero_copy_plain_ndarrays():
+    forest = load_forest(FUSED_MODEL_PATH)
+    for name in ('feature', 'threshold', 'left', 'right', 'value', 'roots', 'children'):
+        array = getattr(forest, name)
+        assert type(array) is np.ndarray, name
+        assert not array.flags.owndata, name
+        # Still backed by the file mapping
+        base = array
+        while base.base is not None and not isinstance(base, np.memmap):
+            base = base.base
+        assert isinstance(base, np.memmap), name
+
+
+def test_round_trip(tmp_path):
+    forest = load_forest(FUSED_MODEL_PATH)
+    path = tmp_path / 'copy.forest'
+    save_forest(forest, path, metadata=forest.metadata)
+    copy = load_forest(path)
+    rows = np.array([[45, 1, 1.2, 0.3, 120, 35, 28, 7.2, 4.1, 1.6],
+                     [62, 1, 7.3, 4.1, 490, 60, 68, 7.0, 3.3, 0.89]])
+    assert np.array_equal(copy.predict_proba(rows), forest.predict_proba(rows))
+    assert copy.checksum == forest.checksum
+    assert copy.n_features_in_ == forest.n_features_in_ == 10
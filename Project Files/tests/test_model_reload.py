@@ -0,0 +1,124 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from forest_engine import CompiledForest
+from model_format import FUSED_MODEL_PATH, load_forest, load_model, save_forest
+from model_reload import ModelHolder
+
+TOKEN = 'test-token'
+
+
+@pytest.fixture
+def artifact(tmp_path):
+    path = str(tmp_path / FUSED_MODEL_PATH)
+    shutil.copy(FUSED_MODEL_PATH, path)
+    return path
+
+
+def holder_for(path):
+    missing = os.path.join(os.path.dirname(path), 'missing.pkl')
+    holder = ModelHolder(lambda: load_model(path, missing, missing), paths=(path,))
+    holder.load()
+    return holder
+
+
+def corrupt(path):
+    with open(path, 'rb') as f:
+        data = bytearray(f.read())
+    # Flip a byte in the node arrays, after the header
+    data[-100] ^= 0xFF
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+    os.replace(path + '.tmp', path)
+
+
+def retrain(path):
+    """Write a new artifact to path, standing in for a retrained forest"""
+    forest = load_forest(FUSED_MODEL_PATH)
+    threshold = np.array(forest.threshold)
+    threshold[0] += 1e-9
+    save_forest(CompiledForest(forest.feature, threshold, forest.left, forest.right, forest.value,
+                               forest.roots, forest.classes_, forest.max_depth,
+                               cast_float32=forest.cast_float32, children=forest.children), path)
+
+
+def assert_still_serving(holder, serving):
+    assert holder.get() is serving
+    assert holder.get().generation == 1
+    assert holder.reloads['failed'] == 1
+
+
+def test_reload_with_a_bad_checksum_keeps_the_old_model(artifact):
+    holder = holder_for(artifact)
+    serving = holder.get()
+    corrupt(artifact)
+    with pytest.raises(ValueError, match='checksum'):
+        holder.reload()
+    assert_still_serving(holder, serving)
+    assert 'checksum' in holder.status()['lastError']
+
+
+def test_reload_failing_the_smoke_rows_keeps_the_old_model(artifact):
+    holder = holder_for(artifact)
+    serving = holder.get()
+    model, scaler, _ = holder.loader()
+    # Loads fine, but scores NaN
+    model.value = np.full_like(model.value, np.nan)
+    holder.loader = lambda: (model, scaler, 'nan-model')
+    with pytest.raises(ValueError, match='probability'):
+        holder.reload()
+    assert_still_serving(holder, serving)
+
+
+def test_generation_moves_on_only_when_a_model_is_swapped_in(artifact):
+    holder = holder_for(artifact)
+    assert holder.reload() == 'unchanged'
+    assert holder.get().generation == 1
+    retrain(artifact)
+    assert holder.reload() == 'swapped'
+    assert holder.get().generation == 2
+    corrupt(artifact)
+    with pytest.raises(ValueError):
+        holder.reload()
+    assert holder.get().generation == 2
+
+
+@pytest.mark.parametrize('token, headers', [
+    ('', {}),
+    ('', {'Authorization': 'Bearer '}),
+    (TOKEN, {}),
+    (TOKEN, {'Authorization': 'Bearer wrong'}),
+])
+def test_admin_endpoints_are_404_without_the_token(monkeypatch, token, headers):
+    import app
+    monkeypatch.setattr(app, 'MODEL_ADMIN_TOKEN', token)
+    client = app.app.test_client()
+    assert client.post('/admin/reload', headers=headers).status_code == 404
+    assert client.get('/admin/model', headers=headers).status_code == 404
+
+
+def test_admin_reload_reports_the_outcome_and_keeps_the_old_model_on_failure(monkeypatch, artifact):
+    import app
+    holder = holder_for(artifact)
+    monkeypatch.setattr(app, 'holder', holder)
+    monkeypatch.setattr(app, 'MODEL_ADMIN_TOKEN', TOKEN)
+    client = app.app.test_client()
+    headers = {'Authorization': f'Bearer {TOKEN}'}
+    first = holder.get().version
+
+    corrupt(artifact)
+    response = client.post('/admin/reload', headers=headers)
+    assert response.status_code == 500
+    assert 'checksum' in response.get_json()['error']
+    assert response.get_json()['version'] == first
+
+    retrain(artifact)
+    response = client.post('/admin/reload', headers=headers)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['outcome'], body['previousVersion']) == ('swapped', first)
+    assert body['version'] == holder.get().version != first
+    assert holder.get().generation == 2
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import DATA_PATH
+from out_of_core import OutOfCoreTrainer, ReservoirSample, allocate_trees, group_chunks
+
+
+@pytest.mark.parametrize('n_estimators, n_chunks', [(10, 28), (10, 10), (200, 7), (1, 5), (7, 3)])
+def test_allocate_trees_spreads_exactly_n_estimators(n_estimators, n_chunks):
+    trees = allocate_trees(n_estimators, n_chunks)
+    assert len(trees) == n_chunks
+    assert trees.sum() == n_estimators
+    assert trees.max() - trees.min() <= 1
+
+
+@pytest.fixture(scope='module')
+def long_csv(tmp_path_factory):
+    # The bundled dataset four times over: a file with many chunks
+    path = tmp_path_factory.mktemp('data') / 'liver_x4.csv'
+    pd.concat([pd.read_csv(DATA_PATH)] * 4).to_csv(path, index=False)
+    return path
+
+
+@pytest.mark.parametrize('chunksize, n_estimators', [(20, 10), (100, 10), (1000, 9)])
+def test_forest_size_does_not_grow_with_the_data(long_csv, chunksize, n_estimators):
+    trainer = OutOfCoreTrainer(long_csv, chunksize=chunksize, n_estimators=n_estimators, n_jobs=1)
+    model, scaler = trainer.fit()
+    assert len(model.estimators_) == model.n_estimators == n_estimators
+    assert trainer.report['trees'] == n_estimators
+    proba = model.predict_proba(scaler.transform(np.array([[45, 1, 1.2, 0.3, 120, 35, 28, 7.2, 4.1, 1.6]])))
+    assert proba.shape == (1, 2) and np.isclose(proba.sum(), 1.0)
+
+
+def test_every_training_row_reaches_a_tree_with_more_chunks_than_trees(long_csv):
+    # About 116 chunks for 10 trees: each tree group merges about a dozen chunks
+    trainer = OutOfCoreTrainer(long_csv, chunksize=20, n_estimators=10, n_jobs=1)
+    trainer.fit()
+    report = trainer.report
+    assert report['groups'] == 10
+    assert report['rows_seen'] == report['train_rows']
+    assert report['rows_used'] == report['train_rows']
+
+
+def test_groups_larger_than_max_group_rows_are_sampled_and_reported(long_csv):
+    trainer = OutOfCoreTrainer(long_csv, chunksize=20, n_estimators=4, n_jobs=1, max_group_rows=100)
+    model, _ = trainer.fit()
+    assert len(model.estimators_) == 4
+    assert trainer.report['rows_seen'] == trainer.report['train_rows']
+    assert trainer.report['rows_used'] == 4 * 100
+
+
+def test_group_chunks_covers_every_chunk_with_every_class():
+    chunk_classes = [(1,), (2,), (1, 2), (), (1,), (1,), (2,), (1,)]
+    group_of = group_chunks(chunk_classes, 8, [1, 2])
+    assert len(group_of) == len(chunk_classes)
+    assert (np.diff(group_of) >= 0).all()
+    for group in np.unique(group_of):
+        members = np.flatnonzero(group_of == group)
+        assert set().union(*(chunk_classes[i] for i in members)) == {1, 2}
+
+
+def test_reservoir_keeps_every_row_until_full_then_a_uniform_sample():
+    sample = ReservoirSample(50, np.random.default_rng(0))
+    rows = np.arange(40, dtype=np.float64)
+    sample.add(rows.reshape(-1, 1), rows)
+    assert sorted(sample.arrays()[1]) == list(range(40))
+
+    kept = np.zeros(1000)
+    for seed in range(400):
+        sample = ReservoirSample(100, np.random.default_rng(seed))
+        for start in range(0, 1000, 37):
+            rows = np.arange(start, min(start + 37, 1000), dtype=np.float64)
+            sample.add(rows.reshape(-1, 1), rows)
+        X, y = sample.arrays()
+        assert len(np.unique(y)) == 100 and (X[:, 0] == y).all()
+        kept[y.astype(int)] += 1
+    # Each row is kept with probability 0.1: 40 times in 400 draws, give or take
+    assert abs(kept[:500].mean() - 40) < 2 and abs(kept[500:].mean() - 40) < 2
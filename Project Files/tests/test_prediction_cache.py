@@ -0,0 +1,44 @@
+from model_format import load_model
+from model_reload import ModelHolder, SMOKE_ROWS
+from prediction_cache import PredictionCache
+
+FEATURES = SMOKE_ROWS[0].tolist()
+OTHER = SMOKE_ROWS[1].tolist()
+
+
+def test_requests_on_a_replaced_model_do_not_move_the_cache_back():
+    cache = PredictionCache()
+    cache.get(FEATURES, 1)
+    cache.put(FEATURES, 1, 'old')
+    # The reloaded model's first request
+    assert cache.get(OTHER, 2) is None
+    cache.put(OTHER, 2, 'new')
+    assert len(cache) == 1
+
+    # A request that started on the old model finishes after the reload
+    assert cache.get(FEATURES, 1) is None
+    cache.put(FEATURES, 1, 'old')
+    assert cache.get(OTHER, 2) == 'new'
+    assert len(cache) == 1
+    assert cache.stats()['generation'] == 2
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_new_generation_can_store_before_its_first_lookup():
+    cache = PredictionCache()
+    cache.put(FEATURES, 1, 'old')
+    cache.put(FEATURES, 2, 'new')
+    assert cache.get(FEATURES, 2) == 'new'
+
+
+def test_holder_numbers_every_swap_even_back_to_the_same_artifact():
+    model, scaler, _ = load_model()
+    # A reload to a new artifact, then a rollback to the first one
+    versions = iter(['version-a', 'version-b', 'version-a'])
+    holder = ModelHolder(lambda: (model, scaler, next(versions)), paths=())
+    holder.load()
+    generations = [holder.get().generation]
+    for _ in range(2):
+        assert holder.reload() == 'swapped'
+        generations.append(holder.get().generation)
+    assert generations == [1, 2, 3]
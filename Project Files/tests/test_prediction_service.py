@@ -0,0 +1,132 @@
+import asyncio
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import metrics
+import prediction_service
+from admission import AdmissionController
+from prediction_service import PredictionService, run, run_async
+
+SAMPLE_REQUEST = {
+    'age': 45, 'gender': 'Male', 'totalBilirubin': 1.2, 'directBilirubin': 0.3, 'alkalinePhosphatase': 120,
+    'alanineAminotransferase': 35, 'aspartateAminotransferase': 28, 'totalProteins': 7.2, 'albumin': 4.1,
+    'A/GRatio': 1.6,
+}
+MATRIX = np.array([[45, 1, 1.2, 0.3, 120, 35, 28, 7.2, 4.1, 1.6],
+                   [62, 1, 7.3, 4.1, 490, 60, 68, 7.0, 3.3, 0.89]], dtype='<f4').tobytes()
+
+REQUESTS = [
+    ('/predict', 'application/json', json.dumps(SAMPLE_REQUEST).encode(), None),
+    ('/predict', 'application/json', b'{not json', None),
+    ('/predict', 'text/plain', b'{}', None),
+    ('/predict', 'application/x-float32-matrix', MATRIX[:40], 'application/x-float32-matrix'),
+    ('/predict/batch', 'application/json', json.dumps([SAMPLE_REQUEST, {'age': 'x'}]).encode(), None),
+    ('/predict/batch', 'application/json', b'{"records": 1}', None),
+    ('/predict/batch', 'application/x-float32-matrix', MATRIX, None),
+    ('/predict/batch', 'application/x-float32-matrix', MATRIX, 'application/x-float32-matrix'),
+]
+
+
+def without_confidence(body):
+    # The fallback rules draw a random confidence
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return body
+    for result in data.get('results', [data]) if isinstance(data, dict) else []:
+        result.pop('confidence', None)
+    return data
+
+
+def asgi_post(asgi_app, path, content_type, body, accept, extra_headers=()):
+    headers = [(b'content-type', content_type.encode('latin-1'))]
+    if accept:
+        headers.append((b'accept', accept.encode('latin-1')))
+    headers.extend(extra_headers)
+    scope = {'type': 'http', 'method': 'POST', 'path': path, 'headers': headers, 'query_string': b''}
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi_app(scope, receive, send))
+    return sent[0]['status'], dict(sent[0]['headers']), sent[1]['body']
+
+
+@pytest.mark.parametrize('path, content_type, body, accept', REQUESTS)
+def test_flask_and_asgi_give_the_same_response(path, content_type, body, accept):
+    import app
+    import asgi
+    headers = {'Accept': accept} if accept else {}
+    flask_response = app.app.test_client().post(path, data=body, content_type=content_type, headers=headers)
+    status, asgi_headers, asgi_body = asgi_post(asgi.app, path, content_type, body, accept)
+    assert status == flask_response.status_code
+    assert asgi_headers[b'content-type'].decode() == flask_response.content_type
+    assert without_confidence(asgi_body) == without_confidence(flask_response.data)
+
+
+def test_repeated_header_uses_its_first_value_like_flask():
+    import asgi
+    body = json.dumps(SAMPLE_REQUEST).encode()
+    status, headers, _ = asgi_post(asgi.app, '/predict', 'application/json', body,
+                                   'application/x-float32-matrix', [(b'accept', b'application/json')])
+    assert status == 200
+    assert headers[b'content-type'] == b'application/x-float32-matrix'
+
+
+def test_asgi_handlers_do_their_work_off_the_event_loop(monkeypatch):
+    import asgi
+    threads = []
+
+    def recording(record):
+        threads.append(threading.current_thread())
+        return extract_features(record)
+
+    extract_features = prediction_service.extract_features
+    monkeypatch.setattr(prediction_service, 'extract_features', recording)
+    body = json.dumps([SAMPLE_REQUEST] * 50).encode()
+    status, _, _ = asgi_post(asgi.app, '/predict/batch', 'application/json', body, None)
+    assert status == 200
+    assert len(threads) == 50
+    assert threading.main_thread() not in threads
+
+
+def full_admission():
+    # One slot, taken, and no queue: every request is shed at once
+    admission = AdmissionController(1, max_queue=0)
+    admission.acquire(time.monotonic() + 60)
+    return admission
+
+
+def predict(service, driver):
+    handler = service.predict('application/json', None, lambda: SAMPLE_REQUEST, None, {})
+    if driver == 'async':
+        async def run_in_pool(fn, *args):
+            return fn(*args)
+        return asyncio.run(run_async(handler, run_in_pool))
+    return run(handler)
+
+
+@pytest.mark.parametrize('driver', ['sync', 'async'])
+def test_shed_requests_get_503_or_the_fallback_rules(driver):
+    import app
+    registry = metrics.Registry()
+    service = PredictionService(app.holder, registry, admission=full_admission(), retry_after=7)
+    status, body, headers = predict(service, driver)
+    assert status == 503
+    assert ('Retry-After', '7') in headers
+    assert 'queue full' in json.loads(body)['error']
+
+    service = PredictionService(app.holder, metrics.Registry(), admission=full_admission(), overload_fallback=True)
+    status, body, _ = predict(service, driver)
+    assert status == 200
+    assert json.loads(body)['riskLevel']
+    assert 'liver_requests_shed_total{reason="queue_full",action="rejected"} 1' in registry.render()
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from flask import Flask, jsonify
+
+from response_json import encode_result, encode_results
+from scoring import build_result, fallback_prediction
+
+flask_app = Flask(__name__)
+CLASSES = np.array([1, 2])
+ROWS = [
+    [62, 1, 7.3, 4.1, 490, 60, 68, 7.0, 3.3, 0.89],
+    [45, 1, 1.2, 0.3, 120, 35, 28, 7.2, 4.1, 1.6],
+    [30, 0, 0.7, 0.1, 180, 20, 22, 6.8, 3.5, 1.1],
+]
+
+
+def jsonify_bytes(obj):
+    with flask_app.app_context():
+        return jsonify(obj).get_data()
+
+
+def model_results():
+    rng = np.random.default_rng(0)
+    results = []
+    for row in ROWS:
+        for p in np.concatenate([rng.uniform(size=50), [0.0, 1e-7, 0.5, 1 / 3, 1.0]]):
+            results.append(build_result(CLASSES, np.array([1 - p, p]), row))
+    return results
+
+
+@pytest.mark.parametrize('result', model_results() + [fallback_prediction(row) for row in ROWS])
+def test_response_bytes_are_jsonify_bytes(result):
+    # jsonify ends the body with a newline, which json_response adds
+    assert encode_result(result) + b'\n' == jsonify_bytes(result)
+
+
+def test_batch_response_bytes_are_jsonify_bytes():
+    results = model_results()
+    assert encode_results(results) + b'\n' == jsonify_bytes({'results': results})
+
+
+@pytest.mark.parametrize('value', [1e-05, 2.5e16, float('nan'), True, 'café', None])
+def test_values_outside_the_templates_are_encoded_like_jsonify(value):
+    result = build_result(CLASSES, np.array([0.2, 0.8]), ROWS[0])
+    result['confidence'] = value
+    assert encode_result(result) + b'\n' == jsonify_bytes(result)
+    result['keyFactors'][0]['impact'] = value
+    assert encode_result(result) + b'\n' == jsonify_bytes(result)
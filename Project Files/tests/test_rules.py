@@ -0,0 +1,64 @@
+import json
+
+import numpy as np
+
+from response_json import dumps, encode_result
+from rules import (AGE, ALBUMIN, ALT, AST, CLINICAL_RULES, TOTAL_PROTEINS, _evaluate, compile_key_factors,
+                   compile_scalar, default_engine, key_factors)
+from scoring import fallback_prediction, fallback_results
+
+SCALE = np.array([90, 1, 10, 5, 1000, 200, 200, 9, 6, 2])
+
+
+def random_panels(n, seed=0):
+    features = np.random.default_rng(seed).uniform(size=(n, 10)) * SCALE
+    features[:, 1] = features[:, 1] > 0.5
+    # Bilirubin exactly at the point where its impact reaches the cap
+    features[:n // 10, 2] = 1.2 * (1 + 25 / 30)
+    return features
+
+
+def test_single_row_key_factors_match_the_rule_table_and_the_batch_engine():
+    features = random_panels(20000)
+    factor_rules = [rule for rule in compile_scalar(CLINICAL_RULES) if rule[-1]]
+    batch = default_engine.key_factors(default_engine.evaluate(features)[1])
+    for row, batch_factors in zip(features.tolist(), batch):
+        single = key_factors(row)
+        # Compared as JSON so 25 and 25.0 count as different
+        assert json.dumps(single) == json.dumps(_evaluate(row, factor_rules)[1])
+        assert json.dumps(single) == json.dumps(batch_factors)
+
+
+def test_every_kind_of_factor_rule_matches_the_rule_table():
+    # Each severity with '>' and '<', on one condition and on several
+    rules = [
+        {'when': [(AGE, '<', 30)], 'severity': 'constant', 'risk': (0.1, 0.1),
+         'factor': {'factor': 'Young', 'impact': (5, 5), 'description': 'Age under 30'}},
+        {'when': [(ALT, '<', 20), (AST, '<', 15)], 'severity': 'deficit', 'risk': (0.1, 0.1),
+         'factor': {'factor': 'Low enzymes', 'impact': (40, 12.5), 'description': 'ALT or AST low'}},
+        {'when': [(TOTAL_PROTEINS, '>', 8), (ALBUMIN, '>', 5)], 'severity': 'excess', 'risk': (0.1, 0.1),
+         'factor': {'factor': 'High protein', 'impact': (50, 10), 'description': 'Protein or albumin high'}},
+        *CLINICAL_RULES,
+    ]
+    factor_rules = [rule for rule in compile_scalar(rules) if rule[-1]]
+    compiled = compile_key_factors(rules)
+    for row in random_panels(20000, seed=2).tolist():
+        assert json.dumps(compiled(row)) == json.dumps(_evaluate(row, factor_rules)[1])
+
+
+def test_capped_impacts_are_the_cap_on_both_paths():
+    row = [62, 1, 7.3, 4.1, 490, 60, 68, 7.0, 3.3, 0.89]
+    single = key_factors(row)
+    batch = default_engine.key_factors(default_engine.evaluate(np.array([row]))[1])[0]
+    assert [factor['impact'] for factor in single][:2] == [25, 20]
+    assert all(type(s['impact']) is type(b['impact']) for s, b in zip(single, batch))
+
+
+def test_fallback_results_match_single_row_fallback():
+    features = random_panels(2000, seed=1)
+    rows = features.tolist()
+    for row, result in zip(rows, fallback_results(rows, features)):
+        expected = fallback_prediction(row)
+        for key in ('prediction', 'probability', 'riskLevel', 'stage', 'keyFactors'):
+            assert json.dumps(result[key]) == json.dumps(expected[key])
+        assert encode_result(result) == dumps(result)
@@ -0,0 +1,68 @@
+import os
+
+import numpy as np
+import pytest
+
+from model_format import FUSED_MODEL_PATH, load_forest
+from shared_model import _fork_workers, mapping_memory, worker_memory
+
+pytestmark = pytest.mark.skipif(not os.path.exists('/proc/self/smaps'), reason='needs Linux /proc smaps')
+
+ROWS = np.tile([[45, 1, 1.2, 0.3, 120, 35, 28, 7.2, 4.1, 1.6]], (100, 1))
+N_WORKERS = 4
+
+
+def test_preloaded_model_pages_are_shared_by_forked_workers():
+    mapped = load_forest(FUSED_MODEL_PATH)
+    mapped.predict_proba(ROWS)
+    size_kb = os.path.getsize(FUSED_MODEL_PATH) / 1024
+
+    usages = _fork_workers(N_WORKERS, lambda: mapped, lambda m: m.predict_proba(ROWS),
+                           report=lambda: mapping_memory(FUSED_MODEL_PATH))
+    for usage in usages:
+        # The worker scored from the mapping it inherited...
+        assert usage['rss_kb'] > 0
+        assert usage['rss_kb'] <= size_kb + 4
+        # ...without a private copy of any model page, so it is charged at most
+        # half of what it touches: every page is shared with the master at least
+        assert usage['private_kb'] == 0
+        assert usage['pss_kb'] <= usage['rss_kb'] / 2 + 4
+
+
+def _private_growth(load):
+    """Per worker: private kB added by loading the model and touching every node array"""
+    baseline = {}
+
+    def load_in_worker():
+        baseline.update(worker_memory())
+        model = load()
+        for name in ('feature', 'threshold', 'left', 'right', 'value', 'roots', 'children'):
+            getattr(model, name).sum()
+        return model
+
+    return _fork_workers(N_WORKERS, load_in_worker, lambda m: None,
+                         report=lambda: {'private_kb': worker_memory()['private_kb'] - baseline['private_kb']})
+
+
+def test_mapped_model_costs_workers_no_private_memory():
+    mapped = load_forest(FUSED_MODEL_PATH)
+    size_kb = os.path.getsize(FUSED_MODEL_PATH) / 1024
+
+    def private_copy():
+        # What unpickling does: every worker holds the node arrays on its own heap
+        forest = load_forest(FUSED_MODEL_PATH)
+        for name in ('feature', 'threshold', 'left', 'right', 'value', 'roots', 'children'):
+            setattr(forest, name, np.array(getattr(forest, name)))
+        return forest
+
+    shared = [usage['private_kb'] for usage in _private_growth(lambda: mapped)]
+    copied = [usage['private_kb'] for usage in _private_growth(private_copy)]
+    # Both include the interpreter's own copy-on-write pages after the fork (a few
+    # hundred kB); on top of that only the heap copies pay for the model
+    assert min(copied) - max(shared) >= 0.75 * size_kb
+
+
+def test_worker_memory_reports_shared_and_private_sizes():
+    usage = worker_memory()
+    assert usage['rss_kb'] >= usage['pss_kb'] > 0
+    assert usage['shared_kb'] + usage['private_kb'] == pytest.approx(usage['rss_kb'], abs=4)
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import DATA_PATH
+from scoring import extract_features
+from wire_format import REQUEST_FIELDS, parse_arrow, parse_float32_matrix, restore_float32
+
+
+def json_records():
+    """liver.csv rows as the JSON records clients send"""
+    df = pd.read_csv(DATA_PATH).dropna()
+    records = []
+    for row in df.itertuples(index=False):
+        values = [row.Age, row.Gender, *row[2:10]]
+        records.append(dict(zip(REQUEST_FIELDS, values)))
+    return records
+
+
+def json_matrix(records):
+    return np.array([extract_features(record) for record in records])
+
+
+def arrow_stream(pa, batch):
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def decimals(n, seed=0):
+    """Values with 1 to 6 significant digits across the magnitudes a lab panel uses"""
+    rng = np.random.default_rng(seed)
+    values = rng.uniform(1, 10, n) * 10.0 ** rng.integers(-4, 6, n)
+    digits = rng.integers(1, 7, n)
+    return np.array([float(f"{value:.{d - 1}e}") for value, d in zip(values, digits)])
+
+
+def test_restore_float32_gives_back_six_digit_decimals():
+    values = decimals(100_000)
+    values[::2] *= -1
+    restored = restore_float32(values.astype(np.float32))
+    assert np.array_equal(restored, values)
+
+
+def test_restore_float32_keeps_zero_and_non_finite_values():
+    values = np.array([0.0, -0.0, np.nan, np.inf, -np.inf])
+    assert np.array_equal(restore_float32(values.astype(np.float32)), values, equal_nan=True)
+
+
+def test_float32_matrix_decodes_to_the_json_features():
+    records = json_records()
+    expected = json_matrix(records)
+    assert np.array_equal(parse_float32_matrix(expected.astype('<f4').tobytes()), expected)
+
+
+def test_arrow_stream_decodes_to_the_json_features():
+    pa = pytest.importorskip('pyarrow')
+    records = json_records()
+    columns = {field: [record[field] for record in records] for field in REQUEST_FIELDS}
+    # Gender as strings, half the lab columns as float32 and half as float64
+    arrays = {field: pa.array(values, type=pa.float32() if j % 2 else pa.float64())
+              for j, (field, values) in enumerate(columns.items()) if field != 'gender'}
+    arrays['gender'] = pa.array(columns['gender'], type=pa.string())
+    batch = pa.record_batch(arrays)
+    assert np.array_equal(parse_arrow(arrow_stream(pa, batch)), json_matrix(records))
+
+
+def test_arrow_missing_column_counts_as_zero_like_json():
+    pa = pytest.importorskip('pyarrow')
+    records = [{'age': 45.0, 'gender': 'Female', 'albumin': 4.1}]
+    batch = pa.record_batch({field: pa.array([value]) for field, value in records[0].items()})
+    assert np.array_equal(parse_arrow(arrow_stream(pa, batch)), json_matrix(records))
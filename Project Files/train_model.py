@@ -1,17 +1,22 @@
-import pandas as pd
+import os
+import sys
 import pickle
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler
 
+# The dataset loader is shared with the training scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Back End', 'Training'))
+from dataset import load_dataset
+
 # Load your dataset
-df = pd.read_csv('Data/liver.csv')  # make sure this file path is correct
+df = load_dataset('Data/liver.csv')  # make sure this file path is correct
 
 # Drop missing values
 df.dropna(inplace=True)
 
-# Convert Gender to 0/1
-df['Gender'] = df['Gender'].map({'Female': 0, 'Male': 1})
+# Convert Gender to 0/1 (categories are ordered Female, Male)
+df['Gender'] = df['Gender'].cat.codes
 
 # Features and label
 X = df.drop('Dataset', axis=1)
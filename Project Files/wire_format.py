@@ -0,0 +1,164 @@
+"""
+Binary request and response bodies for high-volume clients.
+Besides JSON, /predict and /predict/batch accept two binary bodies, chosen by the
+request's Content-Type:
+
+    application/x-float32-matrix          packed little-endian float32, N rows of the
+                                          10 features in FEATURE_COLUMNS order
+                                          (gender 1 for male, 0 otherwise)
+    application/vnd.apache.arrow.stream   an Arrow IPC stream with one column per JSON
+                                          field (age, gender, totalBilirubin, ...); a
+                                          missing column counts as 0, as in JSON
+
+Either is turned into an N x 10 float64 matrix with whole-array operations, without
+converting fields one by one. float32 cannot hold most decimals exactly (1.2 becomes
+1.2000000477), which would trip the clinical rules' thresholds, so float32 values
+are restored to their nearest 6-significant-digit decimal: any lab value with up to
+6 significant digits arrives exactly as it would in JSON.
+
+The same two types can be asked for in the Accept header. A float32 response holds
+N rows of (prediction, probability, stage), with NaN for records that could not be
+scored; the risk level is RISK_LEVELS[stage - 1]. An Arrow response has the columns
+prediction, probability, riskLevel and stage. Arrow needs pyarrow, which is only
+imported when an Arrow body is sent or asked for.
+"""
+
+import numpy as np
+
+FLOAT32_MATRIX = 'application/x-float32-matrix'
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+BINARY_TYPES = (FLOAT32_MATRIX, ARROW_STREAM)
+
+# JSON request fields, in the order of the feature vector (see extract_features)
+REQUEST_FIELDS = [
+    'age', 'gender', 'totalBilirubin', 'directBilirubin', 'alkalinePhosphatase',
+    'alanineAminotransferase', 'aspartateAminotransferase', 'totalProteins',
+    'albumin', 'A/GRatio',
+]
+N_FEATURES = len(REQUEST_FIELDS)
+SIGNIFICANT_DIGITS = 6
+
+_FLOAT32 = np.dtype('<f4')
+_POWERS_OF_TEN = 10.0 ** np.arange(-30, 31)
+
+
+def require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+    except ImportError:
+        raise ImportError(f"{ARROW_STREAM} bodies require pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+def is_binary(mimetype):
+    return mimetype in BINARY_TYPES
+
+
+def response_format(accept):
+    """The binary type named in an Accept header, or None for JSON"""
+    if not accept:
+        return None
+    for item in accept.split(','):
+        mimetype = item.split(';', 1)[0].strip().lower()
+        if mimetype in BINARY_TYPES:
+            return mimetype
+    return None
+
+
+def restore_float32(values):
+    """float32 values as float64, rounded to their nearest SIGNIFICANT_DIGITS decimal"""
+    values = np.asarray(values, dtype=np.float64)
+    magnitude = np.abs(values)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        exponent = np.floor(np.log10(magnitude, where=magnitude > 0, out=np.zeros_like(values)))
+    # Decimal places to keep; scaling by an exact power of ten on the right side of
+    # the division makes n / 10**k the correctly rounded float64 of that decimal
+    places = np.clip(SIGNIFICANT_DIGITS - 1 - exponent, -30, 30).astype(np.int64)
+    positive = places >= 0
+    scale = _POWERS_OF_TEN[np.abs(places) + 30]
+    restored = np.where(positive, np.round(values * scale) / scale, np.round(values / scale) * scale)
+    return np.where(np.isfinite(values), restored, values)
+
+
+def parse_float32_matrix(body):
+    if len(body) % (N_FEATURES * _FLOAT32.itemsize):
+        raise ValueError(f"Expected a multiple of {N_FEATURES} float32 values, got {len(body)} bytes")
+    # A view of the request body; the one copy is the float64 conversion
+    return restore_float32(np.frombuffer(body, dtype=_FLOAT32).reshape(-1, N_FEATURES))
+
+
+def parse_arrow(body):
+    pa = require_pyarrow()
+    import pyarrow.compute as pc
+    table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+    matrix = np.zeros((table.num_rows, N_FEATURES))
+    for j, field in enumerate(REQUEST_FIELDS):
+        if field not in table.column_names:
+            continue
+        column = table.column(field)
+        if column.null_count:
+            raise ValueError(f"Column {field} has null values")
+        if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+            # Gender as in JSON: 'Male' is 1, anything else 0
+            matrix[:, j] = pc.equal(column, 'Male').to_numpy()
+        elif pa.types.is_float32(column.type):
+            matrix[:, j] = restore_float32(column.to_numpy())
+        else:
+            matrix[:, j] = column.to_numpy()
+    return matrix
+
+
+def parse_features(mimetype, body):
+    """N x 10 float64 feature matrix of a binary request body"""
+    if mimetype == FLOAT32_MATRIX:
+        return parse_float32_matrix(body)
+    return parse_arrow(body)
+
+
+def single_row(features_matrix):
+    """The feature vector of a one-record body, for /predict"""
+    if len(features_matrix) != 1:
+        raise ValueError(f"Expected one record, got {len(features_matrix)}; use /predict/batch for several")
+    return features_matrix[0].tolist()
+
+
+def _arrow_bytes(pa, batch):
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def encode_columns(mimetype, predictions, probability, risk_levels, stages, missing=None):
+    """Response body of scored columns; returns (body, content type)
+
+    missing optionally marks records that could not be scored: NaN in a float32
+    response, null in an Arrow one.
+    """
+    if mimetype == FLOAT32_MATRIX:
+        matrix = np.column_stack([predictions, probability, stages]).astype(_FLOAT32)
+        if missing is not None:
+            matrix[missing] = np.nan
+        return matrix.tobytes(), FLOAT32_MATRIX
+    pa = require_pyarrow()
+    batch = pa.record_batch({
+        'prediction': pa.array(predictions, type=pa.int64(), mask=missing),
+        'probability': pa.array(probability, type=pa.float64(), mask=missing),
+        'riskLevel': pa.array(risk_levels, type=pa.string(), mask=missing),
+        'stage': pa.array(stages, type=pa.int64(), mask=missing),
+    })
+    return _arrow_bytes(pa, batch), ARROW_STREAM
+
+
+def encode_results(mimetype, results):
+    """encode_columns for response dicts, as /predict and /predict/batch build them"""
+    missing = np.array(['riskLevel' not in result for result in results], dtype=bool)
+    scored = [({'prediction': 0, 'probability': 0.0, 'riskLevel': '', 'stage': 0} if skip else result)
+              for result, skip in zip(results, missing)]
+    return encode_columns(mimetype,
+                          np.array([result['prediction'] for result in scored], dtype=np.int64),
+                          np.array([result['probability'] for result in scored], dtype=np.float64),
+                          np.array([result['riskLevel'] for result in scored], dtype=object),
+                          np.array([result['stage'] for result in scored], dtype=np.int64),
+                          missing if missing.any() else None)